@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Optional, Union
 
 from fastapi import HTTPException
 
@@ -45,6 +45,16 @@ class InvalidConfigError(Exception):
         )
 
 
+class SnapshotFormatError(Exception):
+    def __init__(self, path: str, reason: str) -> None:
+        super().__init__(f"Invalid config snapshot: {path}. {reason}")
+
+
+class RepricingFileError(Exception):
+    def __init__(self, path: str, reason: str) -> None:
+        super().__init__(f"Cannot reprice with file: {path}. {reason}")
+
+
 class InvalidStatusError(Exception):
     def __init__(self, status: str, id: int = None) -> None:
         super().__init__(f"Received invalid status: {status} for Delivery ID: {id}")
@@ -204,3 +214,58 @@ class GridsValuesError(HTTPException):
     ) -> None:
         super().__init__(status_code, detail, headers)
         self.detail = self.detail.format(client_id=client_id, type=type.upper())
+
+
+class GridsCoverageError(HTTPException):
+    def __init__(
+        self,
+        type: str,
+        issue: str,
+        bound: Union[int, float, str],
+        status_code: int = 422,
+        detail: str = "Grids do not tile the {type} space: {issue} at {bound}",
+        headers: Dict[str, str] | None = None,
+    ) -> None:
+        super().__init__(status_code, detail, headers)
+        self.detail = self.detail.format(type=type, issue=issue, bound=bound)
+
+
+class PriceGridNotFoundError(HTTPException):
+    def __init__(
+        self,
+        config_id: int = None,
+        volume: int = None,
+        distance: float = None,
+        status_code: int = 404,
+        detail: str = "Config ID: {config_id} has no grid for Volume: {volume} and Distance: {distance}",
+        headers: Dict[str, str] | None = None,
+    ) -> None:
+        super().__init__(status_code, detail, headers)
+        self.detail = self.detail.format(
+            config_id=config_id, volume=volume, distance=distance
+        )
+
+
+class VolumeRowError(HTTPException):
+    def __init__(
+        self,
+        line: int = None,
+        error: str = None,
+        status_code: int = 422,
+        detail: str = "Invalid volume on line {line}: {error}",
+        headers: Dict[str, str] | None = None,
+    ) -> None:
+        super().__init__(status_code, detail, headers)
+        self.detail = self.detail.format(line=line, error=error)
+
+
+class GridSetConflictError(HTTPException):
+    def __init__(
+        self,
+        content_hash: str = None,
+        status_code: int = 409,
+        detail: str = "Grid set with Content hash: {content_hash} was stored concurrently and could not be read, retry the request",
+        headers: Dict[str, str] | None = None,
+    ) -> None:
+        super().__init__(status_code, detail, headers)
+        self.detail = self.detail.format(content_hash=content_hash)
@@ -3,6 +3,8 @@ from __future__ import annotations
 from datetime import datetime
 
 from __app_configs import (
+    Frequency,
+    Groups,
     PackageSizes,
     PricingImplementationTypes,
     PricingTypes,
@@ -18,11 +20,13 @@ def config_with_volume_grid() -> Config:
         id=1,
         client_id=123,
         valid_from=datetime(2024, 1, 1),
-        valid_to=None,
+        valid_to=datetime(2030, 1, 1),
         pricing_type=PricingTypes.volume.value,
         config_type=PricingImplementationTypes.fee.value,
+        group=Groups.individual.value,
         package_size_option=PackageSizes.list(),
         transport_option=TransportTypes.list(),
+        frequency=Frequency.week.value,
         grids=vol_grids(),
     )
 
@@ -33,11 +37,13 @@ def config_with_peak_grid() -> Config:
         id=2,
         client_id=234,
         valid_from=datetime(2024, 1, 1),
-        valid_to=None,
+        valid_to=datetime(2030, 1, 1),
         pricing_type=PricingTypes.peak.value,
         config_type=PricingImplementationTypes.fee.value,
+        group=Groups.individual.value,
         package_size_option=PackageSizes.list(),
         transport_option=TransportTypes.list(),
+        frequency=Frequency.week.value,
         grids=peak_grids(),
     )
 
@@ -48,11 +54,13 @@ def config_with_discount_grid() -> Config:
         id=3,
         client_id=345,
         valid_from=datetime(2024, 1, 1),
-        valid_to=None,
+        valid_to=datetime(2030, 1, 1),
         pricing_type=PricingTypes.volume.value,
         config_type=PricingImplementationTypes.discount.value,
+        group=Groups.individual.value,
         package_size_option=PackageSizes.list(),
         transport_option=TransportTypes.list(),
+        frequency=Frequency.week.value,
         grids=discount_grids(),
     )
 
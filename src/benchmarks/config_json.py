@@ -0,0 +1,117 @@
+"""
+Cost of producing a config read response: the current path, which builds a ConfigResp
+from the config and grid rows (`to_config`, `to_grid` per row, pydantic validation)
+and lets FastAPI encode it, against serving the bytes cached in `config_json`.
+
+The rows are built in memory, so only the model building and serialisation are
+timed, not the database.
+
+Run from `src`:
+
+    python -m benchmarks.config_json --vol-buckets 10 --dist-buckets 10 --rounds 2000
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+from datetime import datetime
+from time import perf_counter
+from typing import Callable
+
+import numpy as np
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+import database.models  # noqa: F401  registers the tables on Base.metadata
+from __app_configs import Frequency, PricingImplementationTypes, PricingTypes
+from controllers.config_cache import ConfigJsonCache
+from controllers.configs import to_config_resp
+from database.models import ConfigTable, VolumeGridTable
+
+
+def _rows(vol_buckets: int, dist_buckets: int) -> tuple[ConfigTable, list]:
+    config_model = ConfigTable(
+        id=1,
+        account_id=1,
+        valid_from=datetime(2024, 1, 1),
+        valid_to=datetime(2026, 1, 1),
+        pricing_type=PricingTypes.volume.value,
+        config_type=PricingImplementationTypes.fee.value,
+        group="individual",
+        package_size_option="SMALL, MEDIUM, LARGE",
+        transport_option="BIKE, CAR",
+        frequency=Frequency.week.value,
+        version=1,
+    )
+    grid_models = [
+        VolumeGridTable(
+            id=vol * dist_buckets + dist + 1,
+            config_id=1,
+            min_volume_threshold=vol * 10 + 1,
+            max_volume_threshold=(vol + 1) * 10 + 1 if vol < vol_buckets - 1 else None,
+            min_distance_in_unit=dist * 1.0,
+            max_distance_in_unit=(dist + 1) * 1.0 if dist < dist_buckets - 1 else None,
+            pickup_amount=100 + vol,
+            distance_amount_per_unit=50 + dist,
+            dropoff_amount=100 - vol,
+        )
+        for vol in range(vol_buckets)
+        for dist in range(dist_buckets)
+    ]
+    return config_model, grid_models
+
+
+def _time(rounds: int, fn: Callable[[], bytes]) -> dict:
+    timings: list[float] = []
+    for _ in range(rounds):
+        start = perf_counter()
+        fn()
+        timings.append((perf_counter() - start) * 1_000_000)
+    return {
+        "p50_us": round(float(np.percentile(timings, 50)), 2),
+        "p99_us": round(float(np.percentile(timings, 99)), 2),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--vol-buckets", type=int, default=10)
+    parser.add_argument("--dist-buckets", type=int, default=10)
+    parser.add_argument("--rounds", type=int, default=2000)
+    args = parser.parse_args()
+
+    config_model, grid_models = _rows(args.vol_buckets, args.dist_buckets)
+    cache = ConfigJsonCache(max_size=1, max_bytes=2**30)
+
+    def build() -> bytes:
+        config = to_config_resp(
+            config_model.to_config(), [grid.to_grid() for grid in grid_models]
+        )
+        return JSONResponse(jsonable_encoder(config)).body
+
+    def serialize() -> bytes:
+        config = to_config_resp(
+            config_model.to_config(), [grid.to_grid() for grid in grid_models]
+        )
+        return cache.put(config_model.id, config_model.version, config)
+
+    def cached() -> bytes:
+        return cache.get(config_model.id, config_model.version)
+
+    assert json.loads(build()) == json.loads(serialize())
+    results = {
+        "grids": len(grid_models),
+        "bytes": len(cached()),
+        "current": _time(args.rounds, build),
+        "first_read": _time(args.rounds, serialize),
+        "cached": _time(args.rounds, cached),
+    }
+    results["speedup_p50"] = round(
+        results["current"]["p50_us"] / results["cached"]["p50_us"], 1
+    )
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
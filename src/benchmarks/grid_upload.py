@@ -0,0 +1,120 @@
+"""
+Grid upload throughput: per-object ORM adds (`GridReqController.upload_models`)
+against the bulk executemany INSERT of a new grid set (`GridReqController.upload`).
+Every round uploads different amounts, so no upload is deduplicated against an
+existing grid set.
+
+Run from `src`:
+
+    python -m benchmarks.grid_upload --vol-buckets 20 --dist-buckets 30 --rounds 5
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+from datetime import datetime
+from logging import getLogger
+from time import perf_counter
+from typing import Callable, Union
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session, sessionmaker
+
+import database.models  # noqa: F401  registers the tables on Base.metadata
+from __app_configs import PricingImplementationTypes, PricingTypes
+from controllers.grids import GridReqController
+from database.main import Base
+from models.configs import Config
+
+
+def _grids(vol_buckets: int, dist_buckets: int, offset: int) -> list[dict]:
+    grids: list[dict] = []
+    for vol in range(vol_buckets):
+        for dist in range(dist_buckets):
+            grids.append(
+                {
+                    "min_volume_threshold": vol * 10 + 1,
+                    "max_volume_threshold": (
+                        (vol + 1) * 10 + 1 if vol < vol_buckets - 1 else None
+                    ),
+                    "min_distance_in_unit": dist * 1.0,
+                    "max_distance_in_unit": (
+                        (dist + 1) * 1.0 if dist < dist_buckets - 1 else None
+                    ),
+                    "pickup_amount": 100 + vol + offset,
+                    "distance_amount_per_unit": 50,
+                    "dropoff_amount": 100 + dist,
+                }
+            )
+    return grids
+
+
+def _config(vol_buckets: int, dist_buckets: int, offset: int) -> Config:
+    return Config(
+        **{
+            "valid_from": datetime(2024, 1, 1),
+            "valid_to": datetime(2030, 1, 1),
+            "pricing_type": PricingTypes.volume.value,
+            "config_type": PricingImplementationTypes.fee.value,
+            "group": "individual",
+            "package_size_option": ["SMALL"],
+            "transport_option": ["BIKE"],
+            "frequency": "weekly",
+            "grids": _grids(vol_buckets, dist_buckets, offset),
+        }
+    )
+
+
+def _run(
+    session_local: sessionmaker,
+    configs: list[Config],
+    upload: Callable[[GridReqController, Session], Union[int, None]],
+) -> dict:
+    rows = sum(len(config.grids) for config in configs)
+    start = perf_counter()
+    for config_id, config in enumerate(configs, start=1):
+        with session_local() as db:
+            upload(GridReqController(req=config, id=config_id), db)
+            db.commit()
+    seconds = perf_counter() - start
+    return {
+        "rows": rows,
+        "seconds": round(seconds, 4),
+        "rows_per_s": round(rows / seconds),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--db-url", default="sqlite://")
+    parser.add_argument("--vol-buckets", type=int, default=20)
+    parser.add_argument("--dist-buckets", type=int, default=30)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    engine = create_engine(args.db_url)
+    session_local = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    configs = [
+        _config(args.vol_buckets, args.dist_buckets, offset)
+        for offset in range(args.rounds)
+    ]
+    logger = getLogger(__name__)
+
+    results: dict = {"grids_per_config": len(configs[0].grids), "rounds": args.rounds}
+    for name, upload in (
+        ("orm_add", GridReqController.upload_models),
+        ("bulk_insert", lambda controller, db: controller.upload(db, logger)),
+    ):
+        Base.metadata.drop_all(engine)
+        Base.metadata.create_all(engine)
+        results[name] = _run(session_local, configs, upload)
+
+    results["speedup"] = round(
+        results["bulk_insert"]["rows_per_s"] / results["orm_add"]["rows_per_s"], 2
+    )
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+"""
+Latency of the Getter lookups with and without the composite indexes declared in
+`database.models`. Seeds accounts, configs (each with its own grid set of volume
+grids) and daily volumes,
+times every lookup with the indexes dropped, then again after
+`database.migrations.create_missing_indexes`, and prints p50/p99 in ms as JSON.
+
+Run from `src` (defaults seed 100k configs and 900k grids):
+
+    python -m benchmarks.indexes --accounts 10000 --configs 10 --samples 200
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+from datetime import datetime, timedelta
+from logging import getLogger
+from time import perf_counter
+from typing import Callable
+
+import numpy as np
+from sqlalchemy import create_engine, desc, insert, inspect, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from __app_configs import DbIndexes, PricingImplementationTypes, PricingTypes
+from controllers.account_index import client_accounts
+from controllers.configs import ConfigRespController
+from database.main import Base
+from database.migrations import create_missing_indexes
+from database.models import (
+    AccountSequenceTable,
+    AccountTable,
+    ConfigTable,
+    GridSetTable,
+    VolumeGridTable,
+    VolumesTable,
+)
+from models.query_req import DatesReq
+
+START = datetime(2024, 1, 1)
+CONFIG_DAYS = 30
+CHUNK = 50_000
+logger = getLogger(__name__)
+
+
+def _insert(db: Session, table: type, rows: list[dict]) -> None:
+    for start in range(0, len(rows), CHUNK):
+        db.execute(insert(table), rows[start : start + CHUNK])
+
+
+def _seed(session_local: sessionmaker, accounts: int, configs: int, days: int) -> dict:
+    thresholds = ((1, 10), (10, 100), (100, None))
+    distances = ((0.0, 2.5), (2.5, 10.0), (10.0, None))
+    with session_local() as db:
+        _insert(db, AccountSequenceTable, [{"id": i} for i in range(1, accounts + 1)])
+        _insert(
+            db,
+            AccountTable,
+            [
+                {
+                    "account_id": i,
+                    "client_id": i,
+                    "client_group_name": f"client_{i}",
+                    "valid_from": START,
+                    "valid_to": None,
+                }
+                for i in range(1, accounts + 1)
+            ],
+        )
+        config_rows: list[dict] = []
+        grid_set_rows: list[dict] = []
+        grid_rows: list[dict] = []
+        for account_id in range(1, accounts + 1):
+            for position in range(configs):
+                config_id = len(config_rows) + 1
+                config_rows.append(
+                    {
+                        "id": config_id,
+                        "account_id": account_id,
+                        "valid_from": START + timedelta(days=position * CONFIG_DAYS),
+                        "valid_to": START
+                        + timedelta(days=(position + 1) * CONFIG_DAYS),
+                        "pricing_type": PricingTypes.volume.value,
+                        "config_type": PricingImplementationTypes.fee.value,
+                        "group": "individual",
+                        "package_size_option": "SMALL",
+                        "transport_option": "BIKE",
+                        "frequency": "weekly",
+                        "grid_set_id": config_id,
+                    }
+                )
+                grid_set_rows.append(
+                    {
+                        "id": config_id,
+                        "content_hash": f"{config_id:064x}",
+                        "grid_table": VolumeGridTable.__tablename__,
+                        "grids": len(thresholds) * len(distances),
+                    }
+                )
+                for vol_min, vol_max in thresholds:
+                    for dist_min, dist_max in distances:
+                        grid_rows.append(
+                            {
+                                "grid_set_id": config_id,
+                                "min_volume_threshold": vol_min,
+                                "max_volume_threshold": vol_max,
+                                "min_distance_in_unit": dist_min,
+                                "max_distance_in_unit": dist_max,
+                                "pickup_amount": 100,
+                                "distance_amount_per_unit": 50,
+                                "dropoff_amount": 100,
+                            }
+                        )
+        _insert(db, GridSetTable, grid_set_rows)
+        _insert(db, ConfigTable, config_rows)
+        _insert(db, VolumeGridTable, grid_rows)
+        _insert(
+            db,
+            VolumesTable,
+            [
+                {
+                    "account_id": account_id,
+                    "date": START + timedelta(days=day),
+                    "volume": 10,
+                }
+                for account_id in range(1, accounts + 1)
+                for day in range(days)
+            ],
+        )
+        db.commit()
+    return {
+        "accounts": accounts,
+        "configs": len(config_rows),
+        "grids": len(grid_rows),
+        "volumes": accounts * days,
+    }
+
+
+def _lookups(db: Session, accounts: int, configs: int) -> dict[str, Callable]:
+    """One callable per Getter lookup, issuing the same statements as the Getter."""
+
+    def account_by_date(client_id: int, ts: datetime) -> None:
+        # Account resolution is served by `client_accounts`; time the query a client
+        # missing from it costs.
+        client_accounts.load(db, client_id).at(DatesReq(start=ts, end=ts))
+
+    def config_by_date(client_id: int, ts: datetime) -> None:
+        db.execute(
+            select(ConfigTable)
+            .filter(ConfigTable.account_id == client_id)
+            .filter(ConfigTable.valid_from <= ts)
+            .filter(ConfigTable.valid_to > ts)
+            .filter(ConfigTable.deleted_at.is_(None))
+            .order_by(desc(ConfigTable.valid_to))
+            .limit(1)
+        ).scalars().first()
+
+    def config_grids(client_id: int, ts: datetime) -> None:
+        config_id = (client_id - 1) * configs + 1
+        config_model = db.get(ConfigTable, config_id)
+        ConfigRespController(config_id, db, logger).get_config(config_model.to_config())
+
+    def volumes_by_date(client_id: int, ts: datetime) -> None:
+        db.execute(
+            select(VolumesTable)
+            .filter(VolumesTable.account_id == client_id)
+            .filter(VolumesTable.date >= ts)
+            .filter(VolumesTable.date < ts + timedelta(days=7))
+        ).scalars().all()
+
+    return {
+        "account_by_date": account_by_date,
+        "config_by_date": config_by_date,
+        "config_grids": config_grids,
+        "volumes_by_date": volumes_by_date,
+    }
+
+
+def _measure(
+    session_local: sessionmaker, accounts: int, configs: int, samples: list
+) -> dict:
+    results: dict = {}
+    with session_local() as db:
+        for name, lookup in _lookups(db, accounts, configs).items():
+            timings: list[float] = []
+            for client_id, ts in samples:
+                start = perf_counter()
+                lookup(client_id, ts)
+                timings.append((perf_counter() - start) * 1000)
+                db.expunge_all()
+            results[name] = {
+                "p50_ms": round(float(np.percentile(timings, 50)), 3),
+                "p99_ms": round(float(np.percentile(timings, 99)), 3),
+            }
+    return results
+
+
+def _drop_indexes(engine: Engine) -> None:
+    inspector = inspect(engine)
+    for table in Base.metadata.sorted_tables:
+        existing = {index["name"] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name in DbIndexes.list() and index.name in existing:
+                index.drop(engine)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--db-url", default="sqlite://")
+    parser.add_argument("--accounts", type=int, default=10_000)
+    parser.add_argument("--configs", type=int, default=10, help="per account")
+    parser.add_argument("--days", type=int, default=30, help="volumes per account")
+    parser.add_argument("--samples", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    engine = create_engine(args.db_url)
+    session_local = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    _drop_indexes(engine)
+
+    start = perf_counter()
+    results: dict = {
+        "rows": _seed(session_local, args.accounts, args.configs, args.days)
+    }
+    results["seed_s"] = round(perf_counter() - start, 2)
+
+    rng = random.Random(args.seed)
+    window = timedelta(days=args.configs * CONFIG_DAYS)
+    samples = [
+        (rng.randint(1, args.accounts), START + rng.random() * window)
+        for _ in range(args.samples)
+    ]
+    results["before"] = _measure(session_local, args.accounts, args.configs, samples)
+    results["indexes_created"] = create_missing_indexes(engine, logger)
+    results["after"] = _measure(session_local, args.accounts, args.configs, samples)
+    print(json.dumps(results, indent=2, default=str))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,397 @@
+"""
+Latency, throughput and queries per request of every route in the account, configs,
+grids and volumes routers, driven in-process through the ASGI app.
+
+Seeds a local database with accounts, configs built from the `__fixtures` builders
+and daily volumes, then sends `--requests` requests per route and prints (or writes
+to `--out`) p50/p95/p99 latency in ms, requests/s, statements per request and the
+number of requests that logged an error, as JSON. Without `--db-url` a fresh SQLite
+file is created in a temporary directory; any other database must be empty and
+disposable.
+
+Run from `src`:
+
+    python -m benchmarks.routers --clients 300 --requests 200 --out bench.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import tempfile
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from time import perf_counter
+from typing import Callable, Union
+
+import numpy as np
+
+from __app_configs import DbSettings, Groups, Headers, MediaTypes
+from __fixtures.configs import get_all_configs
+from models.configs import Config
+
+
+@dataclass
+class Route:
+    name: str
+    method: str
+    path: Callable[[int], str]
+    params: Union[Callable[[int], dict], None] = None
+    body: Union[Callable[[int], Union[dict, list]], None] = None
+    content: Union[Callable[[int], bytes], None] = None
+    media_type: Union[str, None] = None
+
+
+@dataclass
+class Seed:
+    clients: list[int]
+    accounts: dict[int, int]
+    configs: dict[str, list[int]]
+    scratch_clients: list[int]
+    group_accounts: list[int]
+    new_clients: list[int]
+
+
+class ErrorCounter(logging.Handler):
+    """Routers log and swallow their errors, so they are counted from the log."""
+
+    def __init__(self) -> None:
+        super().__init__(logging.ERROR)
+        self.count = 0
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.count += 1
+
+
+def _configure_db(db_url: Union[str, None]) -> str:
+    """Must run before the service modules are imported, they read the URL on import."""
+    if db_url is None:
+        db_url = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "benchmark.sqlite")
+    os.environ[DbSettings.url.value] = db_url
+    if db_url.startswith("sqlite"):
+        os.environ[DbSettings.async_url.value] = db_url.replace(
+            "sqlite", "sqlite+aiosqlite", 1
+        )
+    return db_url
+
+
+def _group_config(config: Config) -> Config:
+    return config.model_copy(update={"group": Groups.group.value})
+
+
+def _seed(clients: int, scratch: int, requests: int, days: int) -> Seed:
+    from controllers import account_impl, config_impl, volumes_impl
+    from database.main import SessionLocal
+    from database.models import AccountTable, ConfigTable
+    from models.account import AccountBaseReq
+    from models.volume import AcctVol
+    from utils.logger import logger
+
+    fixtures = get_all_configs()
+    all_clients = list(range(1, clients + scratch + 1))
+    with SessionLocal() as db:
+        for client_id in all_clients:
+            config_impl.Setter(logger, db).create_ind_config(
+                fixtures[client_id % len(fixtures)], client_id
+            )
+
+        group_clients = range(clients + scratch + 1, clients + 2 * scratch + 1)
+        for client_id in group_clients:
+            account_impl.Setter(
+                logger,
+                db,
+                AccountBaseReq(
+                    client_ids=[client_id],
+                    client_group_name=f"Benchmark group {client_id}",
+                    valid_from=datetime.now(),
+                    valid_to=None,
+                ),
+            ).create_account()
+
+        accounts = {
+            account.client_id: account.account_id
+            for account in db.query(AccountTable).all()
+        }
+        configs: dict[str, list[int]] = {}
+        for config in db.query(ConfigTable).all():
+            configs.setdefault(config.pricing_type + config.config_type, []).append(
+                config.id
+            )
+
+        start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        volumes_impl.Setter(logger, db).ingest(
+            [
+                AcctVol(
+                    account_id=accounts[client_id],
+                    date=start - timedelta(days=day),
+                    volume=client_id % 50 + 1,
+                )
+                for client_id in all_clients
+                for day in range(days)
+            ]
+        )
+
+    new_start = clients + 2 * scratch + 1
+    return Seed(
+        clients=all_clients[:clients],
+        accounts=accounts,
+        configs=configs,
+        scratch_clients=all_clients[clients:],
+        group_accounts=[accounts[client_id] for client_id in group_clients],
+        new_clients=list(range(new_start, new_start + requests)),
+    )
+
+
+def _routes(seed: Seed, rng: random.Random) -> list[Route]:
+    from __app_configs import PricingImplementationTypes, PricingTypes
+
+    fixtures = get_all_configs()
+    at = datetime.now() + timedelta(days=2)
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+
+    def client(_: int) -> int:
+        return rng.choice(seed.clients)
+
+    def account(_: int) -> int:
+        return seed.accounts[client(0)]
+
+    def config_id(pricing_type: str, config_type: str) -> Callable[[int], int]:
+        ids = seed.configs[pricing_type + config_type]
+        return lambda _: rng.choice(ids)
+
+    def scratch_client(i: int) -> int:
+        return seed.scratch_clients[i % len(seed.scratch_clients)]
+
+    def scratch(i: int) -> int:
+        return seed.accounts[scratch_client(i)]
+
+    volume_id = config_id(
+        PricingTypes.volume.value, PricingImplementationTypes.fee.value
+    )
+    peak_id = config_id(PricingTypes.peak.value, PricingImplementationTypes.fee.value)
+    discount_id = config_id(
+        PricingTypes.volume.value, PricingImplementationTypes.discount.value
+    )
+    dates = {"start": at.isoformat(), "end": (at + timedelta(hours=1)).isoformat()}
+
+    return [
+        Route(
+            "GET /accounts/client_id/all/{id}",
+            "GET",
+            lambda i: f"/accounts/client_id/all/{client(i)}",
+        ),
+        Route("GET /accounts/all/{id}", "GET", lambda i: f"/accounts/all/{account(i)}"),
+        Route(
+            "GET /configs/dates/{client_id}",
+            "GET",
+            lambda i: f"/configs/dates/{client(i)}",
+            params=lambda i: dates,
+        ),
+        Route(
+            "GET /configs/all/{client_id}",
+            "GET",
+            lambda i: f"/configs/all/{client(i)}",
+        ),
+        Route(
+            "GET /grids/volume/{id}", "GET", lambda i: f"/grids/volume/{volume_id(i)}"
+        ),
+        Route("GET /grids/peak/{id}", "GET", lambda i: f"/grids/peak/{peak_id(i)}"),
+        Route(
+            "GET /grids/discount/{id}",
+            "GET",
+            lambda i: f"/grids/discount/{discount_id(i)}",
+        ),
+        Route(
+            "GET /volumes/dates/{id}",
+            "GET",
+            lambda i: f"/volumes/dates/{account(i)}",
+            params=lambda i: {
+                "start": (today - timedelta(days=7)).isoformat(),
+                "end": today.isoformat(),
+            },
+        ),
+        Route(
+            "GET /volumes/rollup/{id}",
+            "GET",
+            lambda i: f"/volumes/rollup/{account(i)}",
+            params=lambda i: {"frequency": "monthly", "date": today.isoformat()},
+        ),
+        Route(
+            "POST /accounts/",
+            "POST",
+            lambda i: "/accounts/",
+            body=lambda i: {
+                "client_ids": [seed.new_clients[i] + len(seed.new_clients)],
+                "client_group_name": "Benchmark",
+                "valid_from": at.isoformat(),
+                "valid_to": None,
+            },
+        ),
+        Route(
+            "POST /configs/individual/{id}",
+            "POST",
+            lambda i: f"/configs/individual/{seed.new_clients[i]}",
+            body=lambda i: fixtures[i % len(fixtures)].model_dump(mode="json"),
+        ),
+        Route(
+            "POST /configs/group/{id}",
+            "POST",
+            lambda i: f"/configs/group/{seed.group_accounts[i % len(seed.group_accounts)]}",
+            body=lambda i: _group_config(fixtures[i % len(fixtures)]).model_dump(
+                mode="json"
+            ),
+        ),
+        Route(
+            "PUT /configs/{id}",
+            "PUT",
+            lambda i: f"/configs/{scratch(i)}",
+            body=lambda i: {
+                key: value
+                for key, value in fixtures[scratch_client(i) % len(fixtures)]
+                .model_dump(mode="json")
+                .items()
+                if key != "grids"
+            },
+        ),
+        Route(
+            "POST /volumes/",
+            "POST",
+            lambda i: "/volumes/",
+            body=lambda i: [
+                {
+                    "account_id": account(i),
+                    "date": (today - timedelta(days=day)).isoformat(),
+                    "volume": rng.randint(1, 100),
+                }
+                for day in range(7)
+            ],
+        ),
+        Route(
+            "POST /volumes/upload",
+            "POST",
+            lambda i: "/volumes/upload",
+            content=lambda i: (
+                "account_id,date,volume\n"
+                + "".join(
+                    f"{account(i)},{(today - timedelta(days=day)).isoformat()},"
+                    f"{rng.randint(1, 100)}\n"
+                    for day in range(30)
+                )
+            ).encode(),
+            media_type=MediaTypes.csv.value,
+        ),
+        Route(
+            "PUT /configs/delete/last/{id}",
+            "PUT",
+            lambda i: f"/configs/delete/last/{scratch(i)}",
+        ),
+        Route(
+            "PUT /configs/delete/all/{id}",
+            "PUT",
+            lambda i: f"/configs/delete/all/{scratch(i)}",
+        ),
+        Route(
+            "PUT /accounts/delete{id}",
+            "PUT",
+            lambda i: f"/accounts/delete{scratch(i)}",
+        ),
+    ]
+
+
+def _summary(latencies: list[float], queries: list[int], seconds: float) -> dict:
+    return {
+        "requests": len(latencies),
+        "p50_ms": round(float(np.percentile(latencies, 50)), 3),
+        "p95_ms": round(float(np.percentile(latencies, 95)), 3),
+        "p99_ms": round(float(np.percentile(latencies, 99)), 3),
+        "throughput_rps": round(len(latencies) / seconds, 1),
+        "queries_per_request": round(float(np.mean(queries)), 2),
+        "max_queries": int(max(queries)),
+    }
+
+
+async def _drive(routes: list[Route], requests: int, warmup: int) -> dict:
+    import httpx
+
+    from server.main import app
+    from utils.logger import logger
+
+    errors = ErrorCounter()
+    logger.addHandler(errors)
+    results: dict = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench"
+    ) as client:
+        for route in routes:
+            latencies: list[float] = []
+            queries: list[int] = []
+            start = perf_counter()
+            for i in range(requests):
+                if i == warmup:
+                    errors.count = 0
+                    start = perf_counter()
+                kwargs: dict = {}
+                if route.params is not None:
+                    kwargs["params"] = route.params(i)
+                if route.body is not None:
+                    kwargs["json"] = route.body(i)
+                if route.content is not None:
+                    kwargs["content"] = route.content(i)
+                    kwargs["headers"] = {Headers.content_type.value: route.media_type}
+
+                request_start = perf_counter()
+                response = await client.request(route.method, route.path(i), **kwargs)
+                if i >= warmup:
+                    latencies.append((perf_counter() - request_start) * 1000)
+                    queries.append(int(response.headers[Headers.query_count.value]))
+            results[route.name] = _summary(latencies, queries, perf_counter() - start)
+            results[route.name]["errors"] = errors.count
+    logger.removeHandler(errors)
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--db-url", default=None)
+    parser.add_argument("--clients", type=int, default=300)
+    parser.add_argument("--requests", type=int, default=200, help="per route")
+    parser.add_argument("--warmup", type=int, default=10, help="not measured")
+    parser.add_argument("--days", type=int, default=60, help="volumes per account")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default=None)
+    args = parser.parse_args()
+
+    db_url = _configure_db(args.db_url)
+    from utils.logger import logger
+
+    logger.setLevel(logging.WARNING)
+    import server.main  # noqa: F401  creates the tables
+
+    seed_start = perf_counter()
+    seed = _seed(args.clients, args.requests, args.requests, args.days)
+    seed_seconds = perf_counter() - seed_start
+
+    routes = _routes(seed, random.Random(args.seed))
+    results = {
+        "db": db_url.split("://")[0],
+        "clients": args.clients,
+        "requests_per_route": args.requests,
+        "warmup": args.warmup,
+        "seed_s": round(seed_seconds, 2),
+        "routes": asyncio.run(_drive(routes, args.requests, args.warmup)),
+    }
+
+    output = json.dumps(results, indent=2)
+    if args.out is not None:
+        with open(args.out, "w") as file:
+            file.write(output)
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
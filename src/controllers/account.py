@@ -2,12 +2,13 @@ from datetime import datetime, timedelta
 from logging import Logger
 from typing import Union
 
-from sqlalchemy import desc
-
 from __app_configs import AppVars, LogMsg
 from __exceptions import AccountNotFoundError, MultipleAccountsError
-from database.main import db_dependency
-from database.models import AccountSequenceTable, AccountTable
+from controllers.account_ids import account_id_allocator
+from controllers.account_index import ClientAccounts, client_accounts
+from controllers.config_cache import active_configs
+from database.main import async_db_dependency, db_dependency
+from database.models import AccountTable
 from models.account import Account, AccountBaseReq, AccountResp
 from models.query_req import DatesReq
 
@@ -20,6 +21,44 @@ def _client_ids(accounts: list[AccountTable]) -> list[int]:
     return list(set([account.client_id for account in accounts]))
 
 
+def get_existing_accounts(
+    db: db_dependency, client_ids: list[int]
+) -> dict[int, AccountTable]:
+    """
+    Live account rows of the given client IDs, fetched with a single `client_id IN`
+    query. Each client maps to its row with the earliest `valid_to`.
+    """
+    if len(client_ids) == 0:
+        return {}
+
+    accounts: dict[int, AccountTable] = {}
+    for account in (
+        db.query(AccountTable)
+        .filter(AccountTable.client_id.in_(set(client_ids)))
+        .filter(AccountTable.deleted_at.is_(None))
+        .order_by(AccountTable.valid_to)
+    ):
+        accounts.setdefault(account.client_id, account)
+    return accounts
+
+
+def refresh_client_accounts(db: db_dependency, logger: Logger) -> None:
+    """
+    Applies the account rows other processes inserted or deleted to `client_accounts`
+    and drops the `active_configs` entries resolved from them, at most once every
+    `client_accounts.check_s` seconds. Called before reads served from either.
+    """
+    for account_id in client_accounts.refresh(db, logger):
+        active_configs.invalidate_account(account_id)
+
+
+async def refresh_client_accounts_async(
+    db: async_db_dependency, logger: Logger
+) -> None:
+    for account_id in await client_accounts.refresh_async(db, logger):
+        active_configs.invalidate_account(account_id)
+
+
 class AccountReqController:
     req: AccountBaseReq
     logger: Logger
@@ -34,22 +73,17 @@ class AccountReqController:
         return list(set([client_id for client_id in self.req.client_ids]))
 
     def _add_account_id(self) -> int:
-        account_seq_model = AccountSequenceTable()
-        self.db.add(account_seq_model)
-        self.db.commit()
-        account_seq = (
-            self.db.query(AccountSequenceTable)
-            .filter(AccountSequenceTable.id)
-            .order_by(desc(AccountSequenceTable.id))
-            .first()
-        )
-        self.logger.info(
-            LogMsg.acct_seq_created.value.format(account_id=account_seq.id)
-        )
-        return account_seq.id
-
-    def format(self) -> list[Account]:
-        account_id: int = self._add_account_id()
+        account_id = account_id_allocator.allocate(self.db, self.logger)[0]
+        self.logger.info(LogMsg.acct_seq_created.value.format(account_id=account_id))
+        return account_id
+
+    def format(self, account_id: Union[int, None] = None) -> list[Account]:
+        """
+        Account rows of the request, one per unique client ID. A new account ID is
+        allocated unless one reserved by the caller is given.
+        """
+        if account_id is None:
+            account_id = self._add_account_id()
         formatted_requests: list[Account] = []
         for id in self._get_unique_client_ids():
             formatted_requests.append(
@@ -65,14 +99,9 @@ class AccountReqController:
         return formatted_requests
 
     def check_if_exists(self) -> Union[Account, None]:
+        accounts = get_existing_accounts(self.db, self.req.client_ids)
         for client_id in self.req.client_ids:
-            account = (
-                self.db.query(AccountTable)
-                .filter(AccountTable.client_id == client_id)
-                .filter(AccountTable.deleted_at.is_(None))
-                .order_by(AccountTable.valid_to)
-                .first()
-            )
+            account = accounts.get(client_id)
             if account is not None:
                 self.logger.warn(
                     LogMsg.client_id_exists_in_account.value.format(
@@ -111,6 +140,8 @@ class AccountDeleteController:
             self.db.add(model)
 
         self.db.commit()
+        client_accounts.remove_account(self.account_id, _client_ids(accounts))
+        active_configs.invalidate_account(self.account_id)
         self.logger.info(
             LogMsg.account_deleted.value.format(
                 account_id=_account_ids(accounts),
@@ -158,39 +189,55 @@ class AccountRespController:
 
 class ClientAccountController:
     client_id: int
-    db: db_dependency
+    db: Union[db_dependency, async_db_dependency]
     logger: Logger
 
-    def __init__(self, client_id: int, db: db_dependency, logger: Logger) -> None:
+    def __init__(
+        self,
+        client_id: int,
+        db: Union[db_dependency, async_db_dependency],
+        logger: Logger,
+    ) -> None:
         self.client_id: int = client_id
-        self.db: db_dependency = db
+        self.db: Union[db_dependency, async_db_dependency] = db
         self.logger: Logger = logger
 
-    def get_account_from_dates(self, dates_req: DatesReq) -> Union[Account, None]:
-        account = self.get_account()
-        if account is None:
-            raise AccountNotFoundError()
+    def _client_accounts(self) -> Union[ClientAccounts, None]:
+        refresh_client_accounts(self.db, self.logger)
+        indexed = client_accounts.get(self.client_id)
+        return (
+            indexed
+            if indexed is not None
+            else client_accounts.load(self.db, self.client_id)
+        )
 
-        account: AccountTable = (
-            self.db.query(AccountTable)
-            .filter(AccountTable.deleted_at.is_(None))
-            .filter(AccountTable.account_id == account.account_id)
-            .filter(AccountTable.valid_from <= dates_req.start)
-            .filter(
-                (AccountTable.valid_to > dates_req.end)
-                | (AccountTable.valid_to.is_(None))
-            )
-            .order_by(desc(AccountTable.valid_to))
-            .first()
+    async def _client_accounts_async(self) -> Union[ClientAccounts, None]:
+        await refresh_client_accounts_async(self.db, self.logger)
+        indexed = client_accounts.get(self.client_id)
+        return (
+            indexed
+            if indexed is not None
+            else await client_accounts.load_async(self.db, self.client_id)
         )
-        return account.to_account() if account is not None else None
+
+    def get_account_from_dates(self, dates_req: DatesReq) -> Union[Account, None]:
+        indexed = self._client_accounts()
+        if indexed is None:
+            raise AccountNotFoundError()
+        return indexed.at(dates_req)
 
     def get_account(self) -> Union[Account, None]:
-        account = (
-            self.db.query(AccountTable)
-            .filter(AccountTable.client_id == self.client_id)
-            .filter(AccountTable.deleted_at.is_(None))
-            .order_by(desc(AccountTable.valid_to))
-            .first()
-        )
-        return account if account is not None else None
+        indexed = self._client_accounts()
+        return indexed.latest() if indexed is not None else None
+
+    async def get_account_from_dates_async(
+        self, dates_req: DatesReq
+    ) -> Union[Account, None]:
+        indexed = await self._client_accounts_async()
+        if indexed is None:
+            raise AccountNotFoundError()
+        return indexed.at(dates_req)
+
+    async def get_account_async(self) -> Union[Account, None]:
+        indexed = await self._client_accounts_async()
+        return indexed.latest() if indexed is not None else None
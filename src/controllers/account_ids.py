@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+from collections import deque
+from logging import Logger
+from threading import Lock
+from uuid import uuid4
+
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+
+from __app_configs import Defaults, LogMsg
+from database.models import AccountSequenceTable
+
+
+class AccountIdAllocator:
+    """
+    Hands out account IDs from blocks reserved in AccountSequenceTable, hi/lo style.
+    Account IDs reference the sequence rows, so a block is reserved by inserting its
+    rows in one multi-row INSERT tagged with a random token and reading the IDs the
+    database gave them back. The reservation commits on its own connection, so the IDs
+    stay taken even if the caller rolls back, and workers never share a block. IDs a
+    process reserved but did not use are left as gaps.
+    """
+
+    block_size: int
+
+    def __init__(self, block_size: int) -> None:
+        self.block_size = block_size
+        self._blocks: dict[str, deque[int]] = {}
+        self._lock = Lock()
+
+    def _reserve(self, db: Session, size: int, logger: Logger) -> list[int]:
+        token = uuid4().hex
+        with db.get_bind().connect() as connection:
+            connection.execute(insert(AccountSequenceTable), [{"block": token}] * size)
+            account_ids = (
+                connection.execute(
+                    select(AccountSequenceTable.id)
+                    .filter(AccountSequenceTable.block == token)
+                    .order_by(AccountSequenceTable.id)
+                )
+                .scalars()
+                .all()
+            )
+            connection.commit()
+
+        logger.info(
+            LogMsg.acct_ids_reserved.value.format(
+                count=len(account_ids), first=account_ids[0], last=account_ids[-1]
+            )
+        )
+        return account_ids
+
+    def allocate(self, db: Session, logger: Logger, count: int = 1) -> list[int]:
+        """
+        `count` unused account IDs, reserving a new block from the database only when
+        the block of this process runs out.
+
+        :param db: session whose database the IDs are reserved in
+        :type db: Session
+        :param count: number of IDs needed
+        :type count: int
+        :return: the account IDs, ascending within a block
+        """
+        with self._lock:
+            block = self._blocks.setdefault(str(db.get_bind().url), deque())
+            if len(block) < count:
+                block.extend(
+                    self._reserve(db, max(self.block_size, count - len(block)), logger)
+                )
+            return [block.popleft() for _ in range(count)]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._blocks.clear()
+
+
+account_id_allocator = AccountIdAllocator(block_size=Defaults.account_id_block.value)
@@ -1,6 +1,6 @@
 from logging import Logger
 
-from sqlalchemy import desc
+from sqlalchemy import desc, insert, select
 
 from __app_configs import LogMsg
 from __exceptions import AccountNotFoundError, ClientIdMappedToAccountError
@@ -8,34 +8,45 @@ from controllers.account import (
     AccountReqController,
     AccountRespController,
     ClientAccountController,
+    get_existing_accounts,
 )
-from database.main import db_dependency
+from controllers.account_ids import account_id_allocator
+from controllers.account_index import client_accounts
+from database.main import async_db_dependency, db_dependency
 from database.models import AccountTable
-from models.account import Account, AccountBaseReq, AccountResp
+from models.account import (
+    Account,
+    AccountBaseReq,
+    AccountBulkResp,
+    AccountBulkResult,
+    AccountResp,
+)
 
 
 class Getter:
     logger: Logger
-    db: db_dependency
+    db: async_db_dependency
 
-    def __init__(self, logger: Logger, db: db_dependency) -> None:
+    def __init__(self, logger: Logger, db: async_db_dependency) -> None:
         self.logger: Logger = logger
-        self.db: db_dependency = db
+        self.db: async_db_dependency = db
 
-    def all_accounts_by_client_id(self, client_id: int) -> AccountResp:
-        account = ClientAccountController(client_id, self.db, self.logger).get_account()
+    async def all_accounts_by_client_id(self, client_id: int) -> AccountResp:
+        account = await ClientAccountController(
+            client_id, self.db, self.logger
+        ).get_account_async()
 
         if account is None:
             self.logger.warn(LogMsg.no_account.value.format(client_id=client_id))
             raise AccountNotFoundError()
 
-        account_models: list[AccountTable] = (
-            self.db.query(AccountTable)
+        result = await self.db.execute(
+            select(AccountTable)
             .filter(AccountTable.account_id == account.account_id)
             .filter(AccountTable.deleted_at.is_(None))
             .order_by(desc(AccountTable.valid_to))
-            .all()
         )
+        account_models: list[AccountTable] = result.scalars().all()
 
         if len(account_models) == 0:
             self.logger.warn(LogMsg.no_account.value.format(client_id=client_id))
@@ -43,13 +54,13 @@ class Getter:
 
         return AccountRespController(account_models).format()
 
-    def all_accounts_by_id(self, id: int) -> AccountResp:
-        account_models: list[AccountTable] = (
-            self.db.query(AccountTable)
+    async def all_accounts_by_id(self, id: int) -> AccountResp:
+        result = await self.db.execute(
+            select(AccountTable)
             .filter(AccountTable.account_id == id)
             .order_by(desc(AccountTable.valid_to))
-            .all()
         )
+        account_models: list[AccountTable] = result.scalars().all()
 
         if len(account_models) == 0:
             raise AccountNotFoundError()
@@ -75,7 +86,7 @@ class Setter:
     def _get_client_ids_from_req(self, requests: list[Account]) -> list[int]:
         return [id.client_id for id in requests]
 
-    def create_account(self, return_account: bool = False):
+    def create_account(self, return_account: bool = False, commit: bool = True):
         req_controller = AccountReqController(self.account_req, self.logger, self.db)
         account = req_controller.check_if_exists()
         if account is not None:
@@ -84,10 +95,15 @@ class Setter:
             )
 
         valid_requests = req_controller.format()
-        for req in valid_requests:
-            account_model = AccountTable(**req.model_dump())
-            self.db.add(account_model)
-        self.db.commit()
+        if len(valid_requests) > 0:
+            self.db.execute(
+                insert(AccountTable), [req.model_dump() for req in valid_requests]
+            )
+        if commit:
+            self.db.commit()
+            client_accounts.add(valid_requests)
+        else:
+            self.db.flush()
 
         self.logger.info(
             LogMsg.account_created.value.format(
@@ -97,3 +113,102 @@ class Setter:
         )
         if return_account:
             return valid_requests[0]
+
+
+class BulkSetter:
+    logger: Logger
+    db: db_dependency
+
+    def __init__(self, logger: Logger, db: db_dependency) -> None:
+        self.logger: Logger = logger
+        self.db: db_dependency = db
+
+    def create_accounts(self, account_reqs: list[AccountBaseReq]) -> AccountBulkResp:
+        """
+        Creates many accounts in one transaction. The client IDs of every request are
+        checked with a single `client_id IN (...)` query, the account IDs of the accepted
+        requests are allocated together and all the account rows are written with one
+        executemany INSERT. A request is rejected, without failing
+        the others, when one of its client IDs is already mapped to a live account or
+        to an account created earlier in the same batch.
+
+        :param account_reqs: accounts to create, each with its client IDs
+        :type account_reqs: list[AccountBaseReq]
+        :return: the number of created and rejected accounts, and per request the new
+        account ID or the reason it was rejected
+        """
+        existing = get_existing_accounts(
+            self.db,
+            [client_id for req in account_reqs for client_id in req.client_ids],
+        )
+        accepted: list[bool] = []
+        seen: set[int] = set(existing)
+        for account_req in account_reqs:
+            accepted.append(seen.isdisjoint(account_req.client_ids))
+            if accepted[-1]:
+                seen.update(account_req.client_ids)
+        new_ids = iter(
+            account_id_allocator.allocate(self.db, self.logger, sum(accepted))
+            if any(accepted)
+            else []
+        )
+
+        claimed: dict[int, int] = {}
+        results: list[AccountBulkResult] = []
+        accounts: list[Account] = []
+        for account_req, is_accepted in zip(account_reqs, accepted):
+            conflict = next(
+                (
+                    (
+                        (client_id, existing[client_id].account_id)
+                        if client_id in existing
+                        else (client_id, claimed[client_id])
+                    )
+                    for client_id in account_req.client_ids
+                    if client_id in existing or client_id in claimed
+                ),
+                None,
+            )
+            if not is_accepted:
+                client_id, account_id = conflict
+                results.append(
+                    AccountBulkResult(
+                        client_ids=account_req.client_ids,
+                        error=ClientIdMappedToAccountError(
+                            client_id=client_id, account_ids=account_id
+                        ).detail,
+                    )
+                )
+                continue
+
+            account_id = next(new_ids)
+            valid_requests = AccountReqController(
+                account_req, self.logger, self.db
+            ).format(account_id)
+            accounts.extend(valid_requests)
+            for client_id in account_req.client_ids:
+                claimed[client_id] = account_id
+            results.append(
+                AccountBulkResult(
+                    client_ids=account_req.client_ids, account_id=account_id
+                )
+            )
+
+        if len(accounts) > 0:
+            self.db.execute(
+                insert(AccountTable), [account.model_dump() for account in accounts]
+            )
+        self.db.commit()
+        client_accounts.add(accounts)
+
+        resp = AccountBulkResp(
+            created=sum(1 for result in results if result.error is None),
+            failed=sum(1 for result in results if result.error is not None),
+            results=results,
+        )
+        self.logger.info(
+            LogMsg.accounts_bulk_created.value.format(
+                created=resp.created, failed=resp.failed, clients=len(accounts)
+            )
+        )
+        return resp
@@ -0,0 +1,299 @@
+from __future__ import annotations
+
+from bisect import bisect_right
+from datetime import datetime
+from logging import Logger
+from threading import Lock
+from time import monotonic
+from typing import Union
+
+from sqlalchemy import Select, func, or_, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from __app_configs import Defaults, LogMsg
+from database.main import async_db_dependency, db_dependency
+from database.models import AccountTable
+from models.account import Account
+from models.query_req import DatesReq
+
+
+def _end(account: Account) -> datetime:
+    return account.valid_to if account.valid_to is not None else datetime.max
+
+
+class ClientAccounts:
+    """
+    Live account windows of one client, sorted by (valid_from, valid_to). An open
+    `valid_to` sorts last, as the account never ends.
+    """
+
+    client_id: int
+    accounts: list[Account]
+    valid_from: list[datetime]
+    loaded_at: float
+
+    def __init__(
+        self,
+        client_id: int,
+        accounts: list[Account],
+        loaded_at: Union[float, None] = None,
+    ) -> None:
+        self.client_id = client_id
+        self.accounts = sorted(
+            accounts, key=lambda account: (account.valid_from, _end(account))
+        )
+        self.valid_from = [account.valid_from for account in self.accounts]
+        self.loaded_at = loaded_at if loaded_at is not None else monotonic()
+
+    def __len__(self) -> int:
+        return len(self.accounts)
+
+    def latest(self) -> Union[Account, None]:
+        """Account of the window ending last, the account the client resolves to."""
+        return max(self.accounts, key=_end, default=None)
+
+    def at(self, dates_req: DatesReq) -> Union[Account, None]:
+        """Account covering the whole of `dates_req`, the one ending last if several."""
+        found: Union[Account, None] = None
+        for account in self.accounts[: bisect_right(self.valid_from, dates_req.start)]:
+            if _end(account) > dates_req.end and (
+                found is None or _end(account) > _end(found)
+            ):
+                found = account
+        return found
+
+
+class ClientAccountIndex:
+    """
+    Client ID keyed ClientAccounts of every live account row, built at startup and
+    kept current by the account writes of this process, so resolving the account of
+    a client is a dict lookup and a bisect. A client missing from the index, e.g.
+    created by another worker or in a transaction its caller commits, is loaded on
+    its first read.
+
+    Account rows only change by being inserted or soft deleted, so at most every
+    `check_s` seconds `refresh` reads the rows inserted or deleted since the last
+    check, by any process, and drops their clients, which are then reloaded on their
+    next read. Clients are also reloaded once their entry is older than `ttl`, for
+    rows committed out of ID order.
+    """
+
+    check_s: float
+    ttl: float
+
+    def __init__(self, check_s: float, ttl: float) -> None:
+        self.check_s = check_s
+        self.ttl = ttl
+        self._clients: dict[int, ClientAccounts] = {}
+        self._lock = Lock()
+        self._max_id = 0
+        self._max_deleted_at: Union[datetime, None] = None
+        self._checked = monotonic()
+
+    @staticmethod
+    def _stmt() -> Select:
+        return select(AccountTable).filter(AccountTable.deleted_at.is_(None))
+
+    @staticmethod
+    def _watermark_stmt() -> Select:
+        return select(func.max(AccountTable.id), func.max(AccountTable.deleted_at))
+
+    def _changes_stmt(self) -> Select:
+        deleted = (
+            AccountTable.deleted_at > self._max_deleted_at
+            if self._max_deleted_at is not None
+            else AccountTable.deleted_at.is_not(None)
+        )
+        return select(
+            AccountTable.id,
+            AccountTable.client_id,
+            AccountTable.account_id,
+            AccountTable.deleted_at,
+        ).filter(or_(AccountTable.id > self._max_id, deleted))
+
+    def _set_watermark(
+        self, max_id: Union[int, None], max_deleted_at: Union[datetime, None]
+    ) -> None:
+        if max_id is not None and max_id > self._max_id:
+            self._max_id = max_id
+        if max_deleted_at is not None and (
+            self._max_deleted_at is None or max_deleted_at > self._max_deleted_at
+        ):
+            self._max_deleted_at = max_deleted_at
+
+    def _due(self) -> bool:
+        """Claims the next change check when `check_s` has passed since the last one."""
+        with self._lock:
+            if monotonic() - self._checked < self.check_s:
+                return False
+            self._checked = monotonic()
+            return True
+
+    def _drop_changed(self, rows: list, logger: Union[Logger, None]) -> set[int]:
+        client_ids = {client_id for _, client_id, _, _ in rows}
+        with self._lock:
+            for id, _, _, deleted_at in rows:
+                self._set_watermark(id, deleted_at)
+            for client_id in client_ids:
+                self._clients.pop(client_id, None)
+        if logger is not None and len(client_ids) > 0:
+            logger.debug(
+                LogMsg.account_index_refreshed.value.format(clients=len(client_ids))
+            )
+        return {account_id for _, _, account_id, _ in rows}
+
+    def _put(
+        self, client_id: int, accounts: list[Account]
+    ) -> Union[ClientAccounts, None]:
+        with self._lock:
+            if len(accounts) == 0:
+                self._clients.pop(client_id, None)
+                return None
+            self._clients[client_id] = ClientAccounts(client_id, accounts)
+            return self._clients[client_id]
+
+    def build(self, bind: Engine, logger: Logger) -> int:
+        """
+        Loads every live account row, replacing the index.
+
+        :param bind: engine of the database the accounts are read from
+        :type bind: Engine
+        :return: number of indexed client IDs
+        """
+        clients: dict[int, list[Account]] = {}
+        with Session(bind) as db:
+            max_id, max_deleted_at = db.execute(self._watermark_stmt()).one()
+            for account in db.execute(self._stmt()).scalars():
+                clients.setdefault(account.client_id, []).append(account.to_account())
+
+        with self._lock:
+            self._clients = {
+                client_id: ClientAccounts(client_id, accounts)
+                for client_id, accounts in clients.items()
+            }
+            self._max_id = 0
+            self._max_deleted_at = None
+            self._set_watermark(max_id, max_deleted_at)
+            self._checked = monotonic()
+        logger.info(
+            LogMsg.account_index_built.value.format(
+                clients=len(clients),
+                accounts=len(
+                    {
+                        account.account_id
+                        for rows in clients.values()
+                        for account in rows
+                    }
+                ),
+            )
+        )
+        return len(clients)
+
+    def get(self, client_id: int) -> Union[ClientAccounts, None]:
+        """Indexed accounts of the client, None when not indexed or older than `ttl`."""
+        indexed = self._clients.get(client_id)
+        if indexed is None or monotonic() - indexed.loaded_at > self.ttl:
+            return None
+        return indexed
+
+    def refresh(
+        self, db: db_dependency, logger: Union[Logger, None] = None
+    ) -> set[int]:
+        """
+        Drops the clients whose account rows were inserted or deleted since the last
+        check, at most one indexed query every `check_s` seconds.
+
+        :return: account IDs of the changed rows, for the caches keyed by account
+        """
+        if not self._due():
+            return set()
+        return self._drop_changed(db.execute(self._changes_stmt()).all(), logger)
+
+    async def refresh_async(
+        self, db: async_db_dependency, logger: Union[Logger, None] = None
+    ) -> set[int]:
+        if not self._due():
+            return set()
+        result = await db.execute(self._changes_stmt())
+        return self._drop_changed(result.all(), logger)
+
+    def load(self, db: db_dependency, client_id: int) -> Union[ClientAccounts, None]:
+        accounts = (
+            db.execute(self._stmt().filter(AccountTable.client_id == client_id))
+            .scalars()
+            .all()
+        )
+        return self._put(client_id, [account.to_account() for account in accounts])
+
+    async def load_async(
+        self, db: async_db_dependency, client_id: int
+    ) -> Union[ClientAccounts, None]:
+        result = await db.execute(
+            self._stmt().filter(AccountTable.client_id == client_id)
+        )
+        return self._put(
+            client_id, [account.to_account() for account in result.scalars().all()]
+        )
+
+    async def load_many_async(
+        self, db: async_db_dependency, client_ids: list[int]
+    ) -> dict[int, Union[ClientAccounts, None]]:
+        """Loads the accounts of several clients with a single `client_id IN` query."""
+        if len(client_ids) == 0:
+            return {}
+
+        clients: dict[int, list[Account]] = {client_id: [] for client_id in client_ids}
+        result = await db.execute(
+            self._stmt().filter(AccountTable.client_id.in_(set(client_ids)))
+        )
+        for account in result.scalars().all():
+            clients[account.client_id].append(account.to_account())
+        return {
+            client_id: self._put(client_id, accounts)
+            for client_id, accounts in clients.items()
+        }
+
+    def add(self, accounts: list[Account]) -> None:
+        """Indexes committed account rows next to the windows already indexed."""
+        clients: dict[int, list[Account]] = {}
+        for account in accounts:
+            clients.setdefault(account.client_id, []).append(account)
+
+        with self._lock:
+            for client_id, new_accounts in clients.items():
+                indexed = self._clients.get(client_id)
+                if indexed is None:
+                    self._clients[client_id] = ClientAccounts(client_id, new_accounts)
+                    continue
+                self._clients[client_id] = ClientAccounts(
+                    client_id, indexed.accounts + new_accounts, indexed.loaded_at
+                )
+
+    def remove_account(self, account_id: int, client_ids: list[int]) -> None:
+        """Drops the windows of a deleted account from its clients."""
+        with self._lock:
+            for client_id in client_ids:
+                indexed = self._clients.get(client_id)
+                if indexed is None:
+                    continue
+                accounts = [
+                    account
+                    for account in indexed.accounts
+                    if account.account_id != account_id
+                ]
+                if len(accounts) > 0:
+                    self._clients[client_id] = ClientAccounts(
+                        client_id, accounts, indexed.loaded_at
+                    )
+                else:
+                    del self._clients[client_id]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._clients.clear()
+
+
+client_accounts = ClientAccountIndex(
+    check_s=Defaults.account_index_check_s.value, ttl=Defaults.config_cache_ttl.value
+)
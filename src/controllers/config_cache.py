@@ -0,0 +1,177 @@
+from __future__ import annotations
+
+from threading import RLock
+from typing import Union
+
+from __app_configs import AppVars, Defaults
+from controllers.pricing import PriceIndex
+from models.account import Account
+from models.cache import CacheStats
+from models.configs import ConfigResp
+from models.query_req import DatesReq
+from utils.cache import LRUCache
+
+
+class ActiveConfigEntry:
+    """Resolved client_id -> account -> active config, with its compiled price index."""
+
+    account: Account
+    config_id: int
+    config: ConfigResp
+    grid_set_id: Union[int, None]
+    price_index: Union[PriceIndex, None]
+
+    def __init__(
+        self,
+        account: Account,
+        config_id: int,
+        config: ConfigResp,
+        grid_set_id: Union[int, None] = None,
+    ) -> None:
+        self.account = account
+        self.config_id = config_id
+        self.config = config
+        self.grid_set_id = grid_set_id
+        self.price_index = None
+
+    def covers(self, dates_req: DatesReq) -> bool:
+        return (
+            self.account.valid_from <= dates_req.start
+            and (self.account.valid_to is None or self.account.valid_to > dates_req.end)
+            and self.config.valid_from <= dates_req.start
+            and self.config.valid_to > dates_req.end
+        )
+
+
+class ActiveConfigCache:
+    """
+    Client ID keyed cache of ActiveConfigEntry. Entries are indexed by account ID as
+    well so writes, which only know the account, can invalidate every mapped client.
+    The account index is pruned as entries are evicted or expire, so it only holds
+    the clients still cached.
+    """
+
+    cache: LRUCache
+
+    def __init__(self, max_size: int, ttl: float) -> None:
+        self.cache = LRUCache("active_configs", max_size, ttl, on_evict=self._prune)
+        self._clients: dict[int, set[int]] = {}
+        self._generation = 0
+        # Reentrant, as entries evicted by the `cache.put` in `put` are pruned under it.
+        self._lock = RLock()
+
+    def _prune(self, client_id: int, entry: ActiveConfigEntry) -> None:
+        with self._lock:
+            # Cached again since it expired, its account still has to be invalidated.
+            if client_id in self.cache:
+                return
+            client_ids = self._clients.get(entry.account.account_id)
+            if client_ids is None:
+                return
+            client_ids.discard(client_id)
+            if len(client_ids) == 0:
+                del self._clients[entry.account.account_id]
+
+    def generation(self) -> int:
+        """
+        Read before resolving an entry from the database and pass it to `put`, so an
+        entry read before a concurrent write is not cached after its invalidation.
+        """
+        return self._generation
+
+    def get(
+        self, client_id: int, dates_req: DatesReq
+    ) -> Union[ActiveConfigEntry, None]:
+        return self.cache.get(client_id, lambda entry: entry.covers(dates_req))
+
+    def put(
+        self,
+        client_id: int,
+        account: Account,
+        config_id: int,
+        config: ConfigResp,
+        generation: int,
+        grid_set_id: Union[int, None] = None,
+    ) -> ActiveConfigEntry:
+        entry = ActiveConfigEntry(account, config_id, config, grid_set_id)
+        with self._lock:
+            if generation != self._generation:
+                return entry
+            self._clients.setdefault(account.account_id, set()).add(client_id)
+            return self.cache.put(client_id, entry)
+
+    def invalidate_account(self, account_id: int) -> None:
+        with self._lock:
+            self._generation += 1
+            for client_id in self._clients.pop(account_id, set()):
+                self.cache.invalidate(client_id)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._clients.clear()
+            self.cache.clear()
+
+    def stats(self) -> CacheStats:
+        return self.cache.stats()
+
+
+active_configs = ActiveConfigCache(
+    max_size=Defaults.config_cache_size.value, ttl=Defaults.config_cache_ttl.value
+)
+
+
+class ConfigJsonCache:
+    """
+    Config ID keyed cache of the serialized ConfigResp JSON, with the config version it
+    was built from. A config only changes through a write that bumps its version, so
+    the bytes are reused until then and returned as the response body as they are.
+    Bounded by entry count and by total bytes.
+    """
+
+    cache: LRUCache
+
+    def __init__(self, max_size: int, max_bytes: int) -> None:
+        self.cache = LRUCache(
+            "config_json",
+            max_size,
+            max_bytes=max_bytes,
+            sizeof=lambda item: len(item[1]),
+        )
+
+    def get(
+        self, config_id: int, version: Union[int, None] = None
+    ) -> Union[bytes, None]:
+        """JSON of the config, only if it was built from `version` when one is given."""
+        item = self.cache.get(
+            config_id, lambda item: version is None or item[0] == version
+        )
+        return item[1] if item is not None else None
+
+    def put(
+        self, config_id: int, version: Union[int, None], config: ConfigResp
+    ) -> bytes:
+        body = config.model_dump_json().encode()
+        self.cache.put(config_id, (version, body))
+        return body
+
+    def invalidate(self, config_id: int) -> None:
+        self.cache.invalidate(config_id)
+
+    def clear(self) -> None:
+        self.cache.clear()
+
+    def stats(self) -> CacheStats:
+        return self.cache.stats()
+
+
+def elements_json(bodies: list[bytes]) -> bytes:
+    """`return_elements` of already serialized elements."""
+    head = f'{{"{AppVars.elements.value}":{len(bodies)},"{AppVars.data.value}":['
+    return head.encode() + b",".join(bodies) + b"]}"
+
+
+config_json = ConfigJsonCache(
+    max_size=Defaults.config_cache_size.value,
+    max_bytes=Defaults.config_json_cache_bytes.value,
+)
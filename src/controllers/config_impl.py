@@ -1,9 +1,10 @@
 from datetime import datetime
 from logging import Logger
+from typing import Union
 
-from sqlalchemy import desc
+from sqlalchemy import case, desc, insert, select, update
 
-from __app_configs import Defaults, Groups, LogMsg, return_elements
+from __app_configs import Defaults, GridFields, Groups, LogMsg
 from __exceptions import (
     AccountNotFoundError,
     ConfigGroupError,
@@ -11,51 +12,89 @@ from __exceptions import (
     MissingGridsError,
 )
 from controllers import account_impl
-from controllers.account import ClientAccountController
+from controllers.account import (
+    AccountReqController,
+    ClientAccountController,
+    refresh_client_accounts_async,
+)
+from controllers.account_ids import account_id_allocator
+from controllers.account_index import client_accounts
+from controllers.config_cache import active_configs, config_json, elements_json
+from controllers.config_windows import config_windows
 from controllers.configs import (
+    ConfigBulkRespController,
     ConfigModelController,
     ConfigReqController,
     ConfigRespController,
+    to_config_resp,
 )
 from controllers.grids import GridReqController
-from database.main import db_dependency
-from database.models import ConfigTable
+from database.main import QueryCounter, async_db_dependency, db_dependency
+from database.models import AccountTable, ConfigTable
 from models.account import Account, AccountBaseReq
-from models.configs import BaseConfig, Config, ConfigReq, ConfigResp
+from models.configs import (
+    BaseConfig,
+    BaseConfigResp,
+    Config,
+    ConfigReq,
+    ConfigResp,
+    ConfigRolloutReq,
+    ConfigRolloutResp,
+    ConfigRolloutResult,
+)
 from models.query_req import DatesReq
+from utils.etags import etag_of
 
 
 class Getter:
     logger: Logger
-    db: db_dependency
+    db: async_db_dependency
 
-    def __init__(self, logger: Logger, db: db_dependency) -> None:
+    def __init__(self, logger: Logger, db: async_db_dependency) -> None:
         self.logger: Logger = logger
-        self.db: db_dependency = db
+        self.db: async_db_dependency = db
 
-    def _get_account(self, client_id: int, dates_req: DatesReq = None) -> Account:
+    async def _get_account(self, client_id: int, dates_req: DatesReq = None) -> Account:
         account_controller = ClientAccountController(
             client_id=client_id, db=self.db, logger=self.logger
         )
         return (
-            account_controller.get_account_from_dates(dates_req)
+            await account_controller.get_account_from_dates_async(dates_req)
             if dates_req is not None
-            else account_controller.get_account()
+            else await account_controller.get_account_async()
         )
 
     def _missing_account(self, account_id: int) -> None:
         self.logger.info(LogMsg.account_not_found.value.format(account_id=account_id))
         raise AccountNotFoundError(account_id=account_id)
 
-    def _get_config_resp(self, config_model: ConfigTable) -> ConfigResp:
-        return ConfigRespController(config_model.id, self.db, self.logger).get_config(
-            config_model.to_config()
+    async def _get_config_resp(self, config_model: ConfigTable) -> ConfigResp:
+        return await ConfigRespController(
+            config_model.id, self.db, self.logger
+        ).get_config_async(config_model.to_config())
+
+    async def _get_list_configs(
+        self, config_models: list[ConfigTable]
+    ) -> list[ConfigResp]:
+        with QueryCounter() as counter:
+            configs = await ConfigBulkRespController(
+                config_models, self.db, self.logger
+            ).get_configs_async()
+        self.logger.debug(
+            LogMsg.configs_loaded.value.format(
+                configs=len(configs),
+                account_id=self._get_account_ids(config_models),
+                queries=counter.count,
+            )
         )
+        return configs
 
-    def _get_list_configs(self, config_models: list[ConfigTable]) -> list[Config]:
-        return [self._get_config_resp(model) for model in config_models]
+    def _get_account_ids(self, config_models: list[ConfigTable]) -> list[int]:
+        return list(set([model.account_id for model in config_models]))
 
-    def config_by_client_id_date(self, dates_req: DatesReq, client_id: int) -> None:
+    async def config_by_client_id_date(
+        self, dates_req: DatesReq, client_id: int
+    ) -> bytes:
         """
         This function retrieves configuration data based on client ID and dates requested.
 
@@ -66,25 +105,57 @@ class Getter:
         to be retrieved based on the specified dates
         :type client_id: int
         :return: The function `config_by_client_id_date` is returning the result of the
-        `_get_list_configs` method called with the `config_model` as an argument.
-        This return a complete Client Configuration with Grids (ConfigResp object)
+        `_get_config_resp` method called with the `config_model` as an argument.
+        This return a complete Client Configuration with Grids (ConfigResp object), serialized
+        to JSON once per config version and served from `config_json` afterwards
         """
-        account = self._get_account(client_id, dates_req)
-        config_model: ConfigTable = (
-            self.db.query(ConfigTable)
-            .filter(ConfigTable.account_id == account.account_id)
-            .filter(ConfigTable.valid_from <= dates_req.start)
-            .filter(ConfigTable.valid_to > dates_req.end)
-            .filter(ConfigTable.deleted_at.is_(None))
-            .order_by(desc(ConfigTable.valid_to))
-            .first()
+        await refresh_client_accounts_async(self.db, self.logger)
+        entry = active_configs.get(client_id, dates_req)
+        if entry is not None:
+            body = config_json.get(entry.config_id)
+            if body is not None:
+                return body
+            return config_json.put(entry.config_id, None, entry.config)
+
+        generation = active_configs.generation()
+        account = await self._get_account(client_id, dates_req)
+        config_model = await config_windows.active_async(
+            self.db, account.account_id, dates_req
         )
         if config_model is None:
             self._missing_account(client_id)
 
-        return self._get_list_configs(config_model)
+        config = await self._get_config_resp(config_model)
+        active_configs.put(client_id, account, config_model.id, config, generation)
+        return config_json.put(config_model.id, config_model.version, config)
 
-    def all_config_by_client_id(self, client_id: int) -> None:
+    async def _get_live_configs(self, client_id: int) -> list[ConfigTable]:
+        account = await self._get_account(client_id)
+        result = await self.db.execute(
+            select(ConfigTable)
+            .filter(ConfigTable.account_id == account.account_id)
+            .filter(ConfigTable.deleted_at.is_(None))
+        )
+        return result.scalars().all()
+
+    async def all_configs_etag(self, client_id: int) -> tuple[str, list[ConfigTable]]:
+        """
+        ETag of `all_config_by_client_id`, from the IDs and versions of the live configs
+        of the client's account. Grids are only written together with a new config, so
+        the grid tables are not read. The config rows are returned to build the
+        response from when the ETag does not match.
+
+        :param client_id: client whose account configs are read
+        :type client_id: int
+        :return: the ETag and the live config rows
+        """
+        config_models = await self._get_live_configs(client_id)
+        etag = etag_of(sorted((model.id, model.version) for model in config_models))
+        return etag, config_models
+
+    async def all_config_by_client_id(
+        self, client_id: int, config_models: list[ConfigTable] = None
+    ) -> bytes:
         """
         This function retrieves all configuration data associated with a specific client ID and returns
         it with additional processing.
@@ -98,21 +169,27 @@ class Getter:
         information, fetches the configuration models from the database based on the account ID, filters
         out any deleted configurations, and then processes the obtained configuration models to include
         grids. Finally, it returns the elements resulting from this processing using the
-        `return_elements` function.
+        `return_elements` function. Config rows already read by `all_configs_etag` can be
+        passed as `config_models`. Configs already in `config_json` at their current version
+        are not rebuilt; the grids of the others are fetched together.
         This return a list of complete Client Configurations with Grids (list[ConfigResp] object)
+        serialized to JSON
         """
-        account = self._get_account(client_id)
-        config_models: list[ConfigTable] = (
-            self.db.query(ConfigTable)
-            .filter(ConfigTable.account_id == account.account_id)
-            .filter(ConfigTable.deleted_at.is_(None))
-            .all()
-        )
+        if config_models is None:
+            config_models = await self._get_live_configs(client_id)
         if len(config_models) == 0:
             self._missing_account(client_id)
 
-        configs_with_grids = self._get_list_configs(config_models)
-        return return_elements(configs_with_grids)
+        bodies = {
+            model.id: config_json.get(model.id, model.version)
+            for model in config_models
+        }
+        missing = [model for model in config_models if bodies[model.id] is None]
+        if len(missing) > 0:
+            configs_with_grids = await self._get_list_configs(missing)
+            for model, config in zip(missing, configs_with_grids):
+                bodies[model.id] = config_json.put(model.id, model.version, config)
+        return elements_json([bodies[model.id] for model in config_models])
 
 
 class Setter:
@@ -133,6 +210,11 @@ class Setter:
         self.logger.warn(LogMsg.account_not_found.value.format(account_id=account_id))
         raise AccountNotFoundError(account_id=account_id)
 
+    def _invalidate(self, account_id: int) -> None:
+        active_configs.invalidate_account(account_id)
+        config_windows.invalidate(account_id)
+        self.logger.debug(LogMsg.cache_invalidated.value.format(account_id=account_id))
+
     def _create_account_req(self, client_id: int) -> AccountBaseReq:
         return AccountBaseReq(
             client_ids=[client_id],
@@ -141,17 +223,14 @@ class Setter:
             ),
         )
 
-    def _expire(
-        self, req_controller: ConfigReqController, valid_req: ConfigReq, account_id: int
-    ) -> None:
+    def _expire(self, valid_req: ConfigReq, account_id: int) -> None:
         """
         The `_expire` function checks for existing configurations associated with an account, expires
         them based on validity dates, and raises an error if the configuration group does not match the
-        valid request group.
+        valid request group. Expired models are only added to the session; the caller commits them
+        together with the new config. The overlapping configs are found by bisecting the account's
+        validity windows, freshly loaded with a column-only query, and only those rows are fetched.
 
-        :param req_controller: The `req_controller` parameter is an instance of the
-        `ConfigReqController` class, which is used to handle configuration requests
-        :type req_controller: ConfigReqController
         :param valid_req: `valid_req` is an instance of `ConfigReq` class representing a valid
         configuration request
         :type valid_req: ConfigReq
@@ -160,23 +239,28 @@ class Setter:
         expiration of configuration models needs to be checked and processed
         :type account_id: int
         """
-        if req_controller.check_if_exists(self.db, account_id):
-            models_to_expire: list[ConfigTable] = (
-                self.db.query(ConfigTable)
-                .filter(ConfigTable.account_id == account_id)
-                .order_by(ConfigTable.valid_to)
-                .all()
-            )
-            for model in models_to_expire:
-                if model.group != valid_req.group:
-                    raise ConfigGroupError(
-                        account_id=model.account_id,
-                        req_group=valid_req.group,
-                        existing_group=model.group,
-                    )
-                if model.valid_to < valid_req.valid_from:
-                    continue
-                ConfigModelController(model).expire(valid_req, self.db, self.logger)
+        windows = config_windows.load(self.db, account_id)
+        for group in windows.groups:
+            if group != valid_req.group:
+                raise ConfigGroupError(
+                    account_id=account_id,
+                    req_group=valid_req.group,
+                    existing_group=group,
+                )
+
+        config_ids = windows.overlapping(valid_req.valid_from)
+        if len(config_ids) == 0:
+            return
+
+        models_to_expire: list[ConfigTable] = (
+            self.db.query(ConfigTable)
+            .filter(ConfigTable.id.in_(config_ids))
+            .order_by(ConfigTable.valid_to)
+            .all()
+        )
+        for model in models_to_expire:
+            ConfigModelController(model).expire(valid_req, self.db, self.logger)
+            config_json.invalidate(model.id)
 
     def _check_account(
         self, req: Config, client_id: int, req_controller: ConfigReqController
@@ -205,33 +289,41 @@ class Setter:
             account_req = self._create_account_req(client_id)
             account: Account = account_impl.Setter(
                 logger=self.logger, db=self.db, account_req=account_req
-            ).create_account(return_account=True)
+            ).create_account(return_account=True, commit=False)
         req_controller: ConfigReqController = ConfigReqController(req)
         valid_req: ConfigReq = req_controller.format(account.account_id)
-        self._expire(req_controller, valid_req, account.account_id)
+        self._expire(valid_req, account.account_id)
 
         return valid_req
 
-    def _upload_config(self, valid_req: ConfigReq) -> int:
+    def _upload_config(self, valid_req: ConfigReq) -> ConfigTable:
         config_model = ConfigTable(**valid_req.model_dump())
         self.db.add(config_model)
-        self.db.commit()
+        self.db.flush()
         self.logger.info(
             LogMsg.config_created.value.format(
                 config_id=config_model.id, account_id=config_model.account_id
             )
         )
-        last_config = self.db.query(ConfigTable).order_by(desc(ConfigTable.id)).first()
-        return last_config.id
+        return config_model
 
-    def _upload_grids(self, req: Config, config_id: int, valid_req: ConfigReq) -> None:
-        GridReqController(req=req, id=config_id).upload(self.db)
-        self.db.commit()
+    def _upload_grids(
+        self, req: Config, config_model: ConfigTable, valid_req: ConfigReq
+    ) -> ConfigResp:
+        """
+        Uploads the grids of the config and returns the ConfigResp reads will build for
+        it, with the grids in the order they were inserted in.
+        """
+        grid_controller = GridReqController(req=req, id=config_model.id)
+        config_model.grid_set_id = grid_controller.upload(self.db, self.logger)
         self.logger.info(
             LogMsg.grids_created.value.format(
-                config_id=config_id, account_id=valid_req.account_id
+                config_id=config_model.id, account_id=valid_req.account_id
             )
         )
+        return to_config_resp(
+            config_model.to_config(), grid_controller._order_grids(req.grids)
+        )
 
     def _update_config(self, updated_model: ConfigTable) -> None:
         self.db.add(updated_model)
@@ -278,8 +370,12 @@ class Setter:
 
         req_controller: ConfigReqController = ConfigReqController(req)
         valid_req: ConfigReq = self._check_account(req, client_id, req_controller)
-        last_config_id = self._upload_config(valid_req)
-        self._upload_grids(req, last_config_id, valid_req)
+        config_model = self._upload_config(valid_req)
+        config_id, version = config_model.id, config_model.version
+        config = self._upload_grids(req, config_model, valid_req)
+        self.db.commit()
+        self._invalidate(valid_req.account_id)
+        config_json.put(config_id, version, config)
 
     def create_group_config(self, req: Config, account_id: int) -> None:
         """
@@ -302,11 +398,292 @@ class Setter:
 
         req_controller: ConfigReqController = ConfigReqController(req)
         valid_req: ConfigReq = req_controller.format(account_id)
-        if req_controller.check_if_exists(self.db, account_id):
-            self._expire(req_controller, valid_req, account_id)
+        self._expire(valid_req, account_id)
 
-        last_config = self._upload_config(valid_req)
-        self._upload_grids(req, last_config, valid_req)
+        config_model = self._upload_config(valid_req)
+        config_id, version = config_model.id, config_model.version
+        config = self._upload_grids(req, config_model, valid_req)
+        self.db.commit()
+        self._invalidate(account_id)
+        config_json.put(config_id, version, config)
+
+    def _rollout_targets(
+        self, ids: list[int], individual: bool
+    ) -> dict[int, Union[int, None]]:
+        """
+        Account of every rollout target, resolved with one query. Client IDs resolve
+        to their latest account, as in `ClientAccountController.get_account`, and map
+        to None when the client has no account yet. Account IDs without a live
+        account row are left out.
+        """
+        if not individual:
+            live = set(
+                self.db.execute(
+                    select(AccountTable.account_id)
+                    .filter(AccountTable.account_id.in_(ids))
+                    .filter(AccountTable.deleted_at.is_(None))
+                    .distinct()
+                ).scalars()
+            )
+            return {account_id: account_id for account_id in ids if account_id in live}
+
+        latest: dict[int, tuple[datetime, int]] = {}
+        for client_id, account_id, valid_to in self.db.execute(
+            select(
+                AccountTable.client_id, AccountTable.account_id, AccountTable.valid_to
+            )
+            .filter(AccountTable.client_id.in_(ids))
+            .filter(AccountTable.deleted_at.is_(None))
+        ):
+            valid_to = valid_to if valid_to is not None else datetime.max
+            if client_id not in latest or valid_to > latest[client_id][0]:
+                latest[client_id] = (valid_to, account_id)
+        return {
+            client_id: latest[client_id][1] if client_id in latest else None
+            for client_id in ids
+        }
+
+    def _rollout_chunk(
+        self,
+        req: Config,
+        grid_set_id: int,
+        config: ConfigResp,
+        units: list[tuple[Union[int, None], list[int]]],
+    ) -> tuple[dict[int, ConfigRolloutResult], int]:
+        """
+        Rolls the config out to one chunk of accounts in a single transaction: the
+        missing individual accounts are created, the overlapping configs expired with
+        one UPDATE, and the configs, all referencing the same grid set, inserted with
+        one executemany INSERT. The new config IDs are read back by account and
+        validity window, which after the expiry only the new configs match. Returns
+        the result of every target and the number of expired configs.
+        """
+        accounts: list[Account] = []
+        missing = [targets[0] for account_id, targets in units if account_id is None]
+        new_ids = iter(
+            account_id_allocator.allocate(self.db, self.logger, len(missing))
+            if len(missing) > 0
+            else []
+        )
+        targets_by_account: dict[int, list[int]] = {}
+        for account_id, targets in units:
+            if account_id is None:
+                account_id = next(new_ids)
+                accounts.extend(
+                    AccountReqController(
+                        self._create_account_req(targets[0]), self.logger, self.db
+                    ).format(account_id)
+                )
+            targets_by_account[account_id] = targets
+        if len(accounts) > 0:
+            self.db.execute(
+                insert(AccountTable), [account.model_dump() for account in accounts]
+            )
+
+        conflicts: dict[int, str] = {}
+        overlapping: list[tuple[int, int]] = []
+        for config_id, account_id, valid_to, group in self.db.execute(
+            select(
+                ConfigTable.id,
+                ConfigTable.account_id,
+                ConfigTable.valid_to,
+                ConfigTable.group,
+            )
+            .filter(ConfigTable.account_id.in_(targets_by_account))
+            .filter(ConfigTable.deleted_at.is_(None))
+        ):
+            if group != req.group:
+                conflicts.setdefault(
+                    account_id,
+                    ConfigGroupError(
+                        account_id=account_id,
+                        req_group=req.group,
+                        existing_group=group,
+                    ).detail,
+                )
+            elif valid_to >= req.valid_from:
+                overlapping.append((account_id, config_id))
+
+        expired = [
+            config_id
+            for account_id, config_id in overlapping
+            if account_id not in conflicts
+        ]
+        if len(expired) > 0:
+            self.db.execute(
+                update(ConfigTable)
+                .where(ConfigTable.id.in_(expired))
+                .values(
+                    valid_to=req.valid_from,
+                    valid_from=case(
+                        (ConfigTable.valid_from >= req.valid_from, req.valid_from),
+                        else_=ConfigTable.valid_from,
+                    ),
+                    version=ConfigTable.version + 1,
+                    updated_at=datetime.now(),
+                )
+                .execution_options(synchronize_session=False)
+            )
+
+        account_ids = [
+            account_id
+            for account_id in targets_by_account
+            if account_id not in conflicts
+        ]
+        created: dict[int, tuple[int, int]] = {}
+        if len(account_ids) > 0:
+            req_controller = ConfigReqController(req)
+            self.db.execute(
+                insert(ConfigTable),
+                [
+                    {
+                        **req_controller.format(account_id).model_dump(),
+                        GridFields.grid_set_id.value: grid_set_id,
+                    }
+                    for account_id in account_ids
+                ],
+            )
+            for account_id, config_id, version in self.db.execute(
+                select(ConfigTable.account_id, ConfigTable.id, ConfigTable.version)
+                .filter(ConfigTable.account_id.in_(account_ids))
+                .filter(ConfigTable.deleted_at.is_(None))
+                .filter(ConfigTable.valid_from == req.valid_from)
+                .filter(ConfigTable.valid_to == req.valid_to)
+                .order_by(ConfigTable.id)
+            ):
+                created[account_id] = (config_id, version)
+        self.db.commit()
+
+        client_accounts.add(accounts)
+        for account_id in targets_by_account:
+            self._invalidate(account_id)
+        for config_id in expired:
+            config_json.invalidate(config_id)
+        for account_id, (config_id, version) in created.items():
+            config_json.put(
+                config_id, version, config.model_copy(update={"account_id": account_id})
+            )
+        self.logger.info(
+            LogMsg.config_rollout_chunk.value.format(
+                configs=len(created),
+                grid_set_id=grid_set_id,
+                expired=len(expired),
+                accounts=len(accounts),
+            )
+        )
+
+        results: dict[int, ConfigRolloutResult] = {}
+        for account_id, targets in targets_by_account.items():
+            for target in targets:
+                results[target] = (
+                    ConfigRolloutResult(
+                        id=target, account_id=account_id, error=conflicts[account_id]
+                    )
+                    if account_id in conflicts
+                    else ConfigRolloutResult(
+                        id=target,
+                        account_id=account_id,
+                        config_id=created[account_id][0],
+                    )
+                )
+        return results, len(expired)
+
+    def rollout_config(self, rollout_req: ConfigRolloutReq) -> ConfigRolloutResp:
+        """
+        Pushes one config to many accounts, e.g. a new rate card. The config and its
+        grids are validated once and the targets resolved with one query, then the
+        accounts are written in chunks of `Defaults.config_rollout_chunk`, each in its
+        own transaction, all referencing one grid set. A failing target, or chunk, is
+        reported without failing the others.
+
+        :param rollout_req: the config and its targets, client IDs for an individual
+        config and account IDs for a group config
+        :type rollout_req: ConfigRolloutReq
+        :return: the number of created, expired and failed configs, and per target its
+        account and new config ID or the reason it failed
+        """
+        req = rollout_req.config
+        if len(req.grids) == 0:
+            raise MissingGridsError()
+
+        # The grids belong to a grid set shared by every target, not to a config, and
+        # the set is committed first so that every chunk can reference it.
+        grid_controller = GridReqController(req=req, id=0)
+        grid_set_id = grid_controller.upload(self.db, self.logger)
+        self.db.commit()
+        config = to_config_resp(
+            BaseConfigResp(account_id=1, **req.model_dump(exclude={"grids"})),
+            grid_controller._order_grids(req.grids),
+        )
+
+        ids = list(dict.fromkeys(rollout_req.ids))
+        individual = req.group != Groups.group.value
+        accounts = self._rollout_targets(ids, individual)
+
+        results: dict[int, ConfigRolloutResult] = {
+            account_id: ConfigRolloutResult(
+                id=account_id,
+                error=AccountNotFoundError(account_id=account_id).detail,
+            )
+            for account_id in ids
+            if account_id not in accounts
+        }
+        # Clients sharing an account get one config; clients without an account
+        # each get a new one.
+        units: list[tuple[Union[int, None], list[int]]] = []
+        targets_by_account: dict[int, list[int]] = {}
+        for target, account_id in accounts.items():
+            if account_id is None:
+                units.append((None, [target]))
+            elif account_id in targets_by_account:
+                targets_by_account[account_id].append(target)
+            else:
+                targets_by_account[account_id] = [target]
+                units.append((account_id, targets_by_account[account_id]))
+
+        expired = 0
+        chunk_size = Defaults.config_rollout_chunk.value
+        for start in range(0, len(units), chunk_size):
+            chunk = units[start : start + chunk_size]
+            try:
+                chunk_results, chunk_expired = self._rollout_chunk(
+                    req, grid_set_id, config, chunk
+                )
+                expired += chunk_expired
+            except Exception as err:
+                self.db.rollback()
+                self.logger.error(err)
+                chunk_results = {
+                    target: ConfigRolloutResult(
+                        id=target, account_id=account_id, error=str(err)
+                    )
+                    for account_id, targets in chunk
+                    for target in targets
+                }
+            results.update(chunk_results)
+
+        resp = ConfigRolloutResp(
+            created=len(
+                {
+                    result.config_id
+                    for result in results.values()
+                    if result.config_id is not None
+                }
+            ),
+            expired=expired,
+            failed=sum(1 for result in results.values() if result.error is not None),
+            results=[results[target] for target in ids],
+        )
+        self.logger.info(
+            LogMsg.config_rollout_done.value.format(
+                targets=len(ids),
+                group=req.group,
+                created=resp.created,
+                expired=resp.expired,
+                failed=resp.failed,
+            )
+        )
+        return resp
 
     def update_last_config(self, req: BaseConfig, account_id: int) -> None:
         """
@@ -339,6 +716,8 @@ class Setter:
         config_resp_cont.check_grids(updated_model)
 
         self._update_config(updated_model)
+        self._invalidate(account_id)
+        config_json.invalidate(updated_model.id)
 
     def delete_all(self, account_id: int) -> None:
         """
@@ -356,9 +735,12 @@ class Setter:
 
         for model in models_to_delete:
             model.deleted_at = datetime.now()
-            self.db.add(model)
+            self.db.add(ConfigModelController(model).touch())
 
         self.db.commit()
+        self._invalidate(account_id)
+        for config_id in self._get_config_ids(models_to_delete):
+            config_json.invalidate(config_id)
         self.logger.info(
             LogMsg.config_deleted.value.format(
                 config_id=self._get_config_ids(models_to_delete),
@@ -381,8 +763,10 @@ class Setter:
             raise AccountNotFoundError()
 
         model_to_delete.deleted_at = datetime.now()
-        self.db.add(model_to_delete)
+        self.db.add(ConfigModelController(model_to_delete).touch())
         self.db.commit()
+        self._invalidate(account_id)
+        config_json.invalidate(model_to_delete.id)
         self.logger.info(
             LogMsg.config_deleted.value.format(
                 config_id=model_to_delete.id, account_id=model_to_delete.account_id
@@ -0,0 +1,176 @@
+from __future__ import annotations
+
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+from typing import Union
+
+from sqlalchemy import Select, select
+from sqlalchemy.orm import Session
+
+from __app_configs import Defaults
+from database.main import async_db_dependency
+from database.models import ConfigTable
+from models.cache import CacheStats
+from models.query_req import DatesReq
+from utils.cache import LRUCache
+
+
+class ConfigWindows:
+    """
+    Validity windows of the live configs of one account, sorted by (valid_from,
+    valid_to). Creating a config expires the ones it overlaps, so the windows of an
+    account are disjoint and `valid_to` is sorted as well: point-in-time lookups and
+    overlap detection are a bisect. Accounts with overlapping legacy windows fall back
+    to a scan.
+    """
+
+    account_id: int
+    config_ids: list[int]
+    valid_from: list[datetime]
+    valid_to: list[datetime]
+    groups: list[str]
+    disjoint: bool
+
+    def __init__(self, account_id: int, rows: list[tuple]) -> None:
+        rows = sorted(rows, key=lambda row: (row[1], row[2]))
+        self.account_id = account_id
+        self.config_ids = [row[0] for row in rows]
+        self.valid_from = [row[1] for row in rows]
+        self.valid_to = [row[2] for row in rows]
+        self.groups = [row[3] for row in rows]
+        self.disjoint = all(
+            valid_to <= next_from
+            for valid_to, next_from in zip(self.valid_to, self.valid_from[1:])
+        )
+
+    def __len__(self) -> int:
+        return len(self.config_ids)
+
+    def active(self, dates_req: DatesReq) -> Union[int, None]:
+        """
+        Config covering the whole of `dates_req`, the one ending last when legacy
+        windows overlap, as `ORDER BY valid_to DESC LIMIT 1` would pick.
+        """
+        position = bisect_right(self.valid_from, dates_req.start) - 1
+        if self.disjoint:
+            if position >= 0 and self.valid_to[position] > dates_req.end:
+                return self.config_ids[position]
+            return None
+
+        found, valid_to = None, None
+        for candidate in range(position + 1):
+            if self.valid_to[candidate] > dates_req.end and (
+                valid_to is None or self.valid_to[candidate] > valid_to
+            ):
+                found, valid_to = self.config_ids[candidate], self.valid_to[candidate]
+        return found
+
+    def overlapping(self, valid_from: datetime) -> list[int]:
+        """Configs still valid at `valid_from`, i.e. the ones a new config expires."""
+        if self.disjoint:
+            return self.config_ids[bisect_left(self.valid_to, valid_from) :]
+        return [
+            config_id
+            for config_id, valid_to in zip(self.config_ids, self.valid_to)
+            if valid_to >= valid_from
+        ]
+
+
+class ConfigWindowIndex:
+    """
+    Account ID keyed cache of ConfigWindows, loaded with a single column query. Reads
+    verify the config they resolve against its row and reload the windows when it
+    no longer matches, so a write made by another process is picked up on the next
+    read. Writes in this process invalidate the account.
+    """
+
+    cache: LRUCache
+
+    def __init__(self, max_size: int, ttl: float) -> None:
+        self.cache = LRUCache("config_windows", max_size, ttl)
+
+    @staticmethod
+    def _stmt(account_id: int) -> Select:
+        return (
+            select(
+                ConfigTable.id,
+                ConfigTable.valid_from,
+                ConfigTable.valid_to,
+                ConfigTable.group,
+            )
+            .filter(ConfigTable.account_id == account_id)
+            .filter(ConfigTable.deleted_at.is_(None))
+        )
+
+    @staticmethod
+    def _covers(config_model: Union[ConfigTable, None], dates_req: DatesReq) -> bool:
+        return (
+            config_model is not None
+            and config_model.deleted_at is None
+            and config_model.valid_from <= dates_req.start
+            and config_model.valid_to > dates_req.end
+        )
+
+    def load(self, db: Session, account_id: int) -> ConfigWindows:
+        windows = ConfigWindows(account_id, db.execute(self._stmt(account_id)).all())
+        return self.cache.put(account_id, windows)
+
+    async def load_async(
+        self, db: async_db_dependency, account_id: int
+    ) -> tuple[ConfigWindows, dict[int, ConfigTable]]:
+        """Loads the live config rows of the account, returned by ID with the windows."""
+        result = await db.execute(
+            select(ConfigTable)
+            .filter(ConfigTable.account_id == account_id)
+            .filter(ConfigTable.deleted_at.is_(None))
+        )
+        config_models = {model.id: model for model in result.scalars().all()}
+        windows = ConfigWindows(
+            account_id,
+            [
+                (model.id, model.valid_from, model.valid_to, model.group)
+                for model in config_models.values()
+            ],
+        )
+        return self.cache.put(account_id, windows), config_models
+
+    async def active_async(
+        self, db: async_db_dependency, account_id: int, dates_req: DatesReq
+    ) -> Union[ConfigTable, None]:
+        """
+        Config of `account_id` active over `dates_req`, resolved from the cached
+        windows and fetched by primary key. On a miss, or when the row no longer
+        matches its window, the windows are reloaded with the live rows.
+
+        :param db: session the config row is read with
+        :type db: async_db_dependency
+        :param account_id: account the config belongs to
+        :type account_id: int
+        :param dates_req: period the config must cover
+        :type dates_req: DatesReq
+        :return: the active config, None if the account has none for the period
+        """
+        windows = self.cache.get(account_id)
+        if windows is not None:
+            config_id = windows.active(dates_req)
+            if config_id is not None:
+                config_model = await db.get(ConfigTable, config_id)
+                if self._covers(config_model, dates_req):
+                    return config_model
+
+        windows, config_models = await self.load_async(db, account_id)
+        return config_models.get(windows.active(dates_req))
+
+    def invalidate(self, account_id: int) -> None:
+        self.cache.invalidate(account_id)
+
+    def clear(self) -> None:
+        self.cache.clear()
+
+    def stats(self) -> CacheStats:
+        return self.cache.stats()
+
+
+config_windows = ConfigWindowIndex(
+    max_size=Defaults.config_cache_size.value, ttl=Defaults.config_cache_ttl.value
+)
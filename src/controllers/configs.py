@@ -1,13 +1,16 @@
+from datetime import datetime
 from logging import Logger
 from typing import Union
 
+from sqlalchemy import Select, func, literal, select, union_all
+
 from __app_configs import Deliminator, LogMsg, PricingImplementationTypes, PricingTypes
 from __exceptions import (
     ClientIdConfigError,
     ConfigGroupError,
     UnsupportedConfigAfterUpdateError,
 )
-from database.main import db_dependency
+from database.main import async_db_dependency, db_dependency
 from database.models import (
     ConfigTable,
     DiscountGridTable,
@@ -18,6 +21,45 @@ from models.configs import BaseConfig, BaseConfigResp, ConfigReq, ConfigResp
 from models.grids import DiscountGrid, PeakOffPeakGrid, VolumeGrid
 
 
+def get_grid_table(
+    config_type: str, pricing_type: str
+) -> Union[type[VolumeGridTable], type[PeakGridTable], type[DiscountGridTable], None]:
+    if (
+        config_type == PricingImplementationTypes.discount.value
+        and pricing_type == PricingTypes.volume.value
+    ):
+        return DiscountGridTable
+    elif (
+        config_type == PricingImplementationTypes.fee.value
+        and pricing_type == PricingTypes.peak.value
+    ):
+        return PeakGridTable
+    elif (
+        config_type == PricingImplementationTypes.fee.value
+        and pricing_type == PricingTypes.volume.value
+    ):
+        return VolumeGridTable
+
+
+def to_config_resp(
+    config_model: BaseConfigResp,
+    grids: Union[list[VolumeGrid], list[PeakOffPeakGrid], list[DiscountGrid]],
+) -> ConfigResp:
+    return ConfigResp(
+        account_id=config_model.account_id,
+        valid_from=config_model.valid_from,
+        valid_to=config_model.valid_to,
+        pricing_type=config_model.pricing_type,
+        config_type=config_model.config_type,
+        group=config_model.group,
+        package_size_option=config_model.package_size_option,
+        transport_option=config_model.transport_option,
+        frequency=config_model.frequency,
+        deleted_at=config_model.deleted_at,
+        grids=grids,
+    )
+
+
 class ConfigReqController:
     config_req: BaseConfig
 
@@ -59,6 +101,15 @@ class ConfigModelController:
     def __init__(self, config_model: ConfigTable) -> None:
         self.config_model: ConfigTable = config_model
 
+    def touch(self) -> ConfigTable:
+        """
+        Bumps the config version read by the ETags of config and grid reads. The
+        increment is a SQL expression, so concurrent writers never reuse a version.
+        """
+        self.config_model.version = ConfigTable.version + 1
+        self.config_model.updated_at = datetime.now()
+        return self.config_model
+
     def update(self, config_req: ConfigReq) -> ConfigTable:
         updated_config: ConfigTable = self.config_model
         if updated_config.account_id != config_req.account_id:
@@ -79,7 +130,7 @@ class ConfigModelController:
         updated_config.transport_option = config_req.transport_option
         updated_config.frequency = config_req.frequency
 
-        return updated_config
+        return self.touch()
 
     def expire(self, config_req: ConfigReq, db: db_dependency, logger: Logger) -> None:
         config_to_expire: ConfigTable = self.config_model
@@ -92,8 +143,7 @@ class ConfigModelController:
         if config_to_expire.valid_from >= config_to_expire.valid_to:
             config_to_expire.valid_from = config_to_expire.valid_to
 
-        db.add(config_to_expire)
-        db.commit()
+        db.add(self.touch())
         logger.info(
             LogMsg.config_expired.value.format(
                 config_id=config_to_expire.id,
@@ -106,84 +156,75 @@ class ConfigModelController:
 
 class ConfigRespController:
     config_id: int
-    db: db_dependency
+    db: Union[db_dependency, async_db_dependency]
     logger: Logger
 
-    def __init__(self, config_id: int, db: db_dependency, logger: Logger) -> None:
+    def __init__(
+        self,
+        config_id: int,
+        db: Union[db_dependency, async_db_dependency],
+        logger: Logger,
+    ) -> None:
         self.config_id = config_id
         self.db = db
         self.logger = logger
 
+    def _grids_stmt(self, table: type) -> Select:
+        """Grids of the config's grid set, in the order they were inserted in."""
+        return (
+            select(table)
+            .join(ConfigTable, ConfigTable.grid_set_id == table.grid_set_id)
+            .filter(ConfigTable.id == self.config_id)
+            .order_by(table.id)
+        )
+
     def _get_volume_grids(self) -> list[VolumeGrid]:
         return [
             grid.to_grid()
-            for grid in (
-                self.db.query(VolumeGridTable)
-                .filter(VolumeGridTable.config_id == self.config_id)
-                .all()
-            )
+            for grid in self.db.execute(self._grids_stmt(VolumeGridTable)).scalars()
         ]
 
     def _get_peak_grids(self) -> list[PeakOffPeakGrid]:
         return [
             grid.to_grid()
-            for grid in (
-                self.db.query(PeakGridTable)
-                .filter(PeakGridTable.config_id == self.config_id)
-                .all()
-            )
+            for grid in self.db.execute(self._grids_stmt(PeakGridTable)).scalars()
         ]
 
     def _get_discounts_grids(self) -> list[DiscountGrid]:
         return [
             grid.to_grid()
-            for grid in (
-                self.db.query(DiscountGridTable)
-                .filter(DiscountGridTable.config_id == self.config_id)
-                .all()
-            )
+            for grid in self.db.execute(self._grids_stmt(DiscountGridTable)).scalars()
         ]
 
-    def check_grids(self, config_model: Union[ConfigReq, ConfigTable]) -> None:
-        if (
-            config_model.config_type == PricingImplementationTypes.discount.value
-            and config_model.pricing_type == PricingTypes.volume.value
-            and (len(self._get_peak_grids()) > 0 or len(self._get_volume_grids()) > 0)
-        ):
-            self.logger.warn(
-                LogMsg.unsupported_config_grid.format(
-                    grid=config_model.pricing_type.upper(),
-                    config=config_model.config_type.upper(),
+    def _count_grids(self) -> dict[str, int]:
+        """Counts the grids of the config in every grid table with a single query."""
+        counts = union_all(
+            *[
+                select(
+                    literal(table.__tablename__).label("grid_table"),
+                    func.count(table.id).label("grids"),
                 )
-            )
-            raise UnsupportedConfigAfterUpdateError(
-                config_model.pricing_type, config_model.config_type
-            )
-
-        elif (
-            config_model.config_type == PricingImplementationTypes.fee.value
-            and config_model.pricing_type == PricingTypes.peak.value
-            and (
-                len(self._get_discounts_grids()) > 0
-                or len(self._get_volume_grids()) > 0
-            )
-        ):
-            self.logger.warn(
-                LogMsg.unsupported_config_grid.format(
-                    grid=config_model.pricing_type.upper(),
-                    config=config_model.config_type.upper(),
+                .join_from(
+                    table, ConfigTable, ConfigTable.grid_set_id == table.grid_set_id
                 )
-            )
-            raise UnsupportedConfigAfterUpdateError(
-                config_model.pricing_type, config_model.config_type
-            )
+                .where(ConfigTable.id == self.config_id)
+                for table in (VolumeGridTable, PeakGridTable, DiscountGridTable)
+            ]
+        )
+        return {row.grid_table: row.grids for row in self.db.execute(counts)}
 
-        elif (
-            config_model.config_type == PricingImplementationTypes.fee.value
-            and config_model.pricing_type == PricingTypes.volume.value
-            and (
-                len(self._get_discounts_grids()) > 0 or len(self._get_peak_grids()) > 0
-            )
+    def check_grids(self, config_model: Union[ConfigReq, ConfigTable]) -> None:
+        expected_table = get_grid_table(
+            config_model.config_type, config_model.pricing_type
+        )
+        if expected_table is None:
+            return
+
+        grids_count = self._count_grids()
+        if any(
+            count > 0
+            for table, count in grids_count.items()
+            if table != expected_table.__tablename__
         ):
             self.logger.warn(
                 LogMsg.unsupported_config_grid.format(
@@ -214,16 +255,74 @@ class ConfigRespController:
         ):
             grids = self._get_volume_grids()
 
-        return ConfigResp(
-            account_id=config_model.account_id,
-            valid_from=config_model.valid_from,
-            valid_to=config_model.valid_to,
-            pricing_type=config_model.pricing_type,
-            config_type=config_model.config_type,
-            group=config_model.group,
-            package_size_option=config_model.package_size_option,
-            transport_option=config_model.transport_option,
-            frequency=config_model.frequency,
-            deleted_at=config_model.deleted_at,
-            grids=grids,
+        return to_config_resp(config_model, grids)
+
+    async def get_config_async(self, config_model: BaseConfigResp) -> ConfigResp:
+        table = get_grid_table(config_model.config_type, config_model.pricing_type)
+        result = await self.db.execute(self._grids_stmt(table))
+        return to_config_resp(
+            config_model, [grid.to_grid() for grid in result.scalars().all()]
         )
+
+
+class ConfigBulkRespController:
+    """
+    Builds the ConfigResp list for many configs at once. Grids are fetched with one
+    `grid_set_id IN (...)` query per grid table instead of one query per config, and
+    once per grid set however many of the configs share it.
+    """
+
+    config_models: list[ConfigTable]
+    db: Union[db_dependency, async_db_dependency]
+    logger: Logger
+
+    def __init__(
+        self,
+        config_models: list[ConfigTable],
+        db: Union[db_dependency, async_db_dependency],
+        logger: Logger,
+    ) -> None:
+        self.config_models = config_models
+        self.db = db
+        self.logger = logger
+
+    def _grids_stmts(self) -> list[Select]:
+        grid_set_ids: dict[type, set[int]] = {}
+        for model in self.config_models:
+            table = get_grid_table(model.config_type, model.pricing_type)
+            if table is not None and model.grid_set_id is not None:
+                grid_set_ids.setdefault(table, set()).add(model.grid_set_id)
+
+        return [
+            select(table).filter(table.grid_set_id.in_(ids)).order_by(table.id)
+            for table, ids in grid_set_ids.items()
+        ]
+
+    def _to_configs(self, grid_models: list) -> list[ConfigResp]:
+        grids: dict[tuple[str, int], list] = {}
+        for grid in grid_models:
+            grids.setdefault((grid.__tablename__, grid.grid_set_id), []).append(
+                grid.to_grid()
+            )
+
+        configs: list[ConfigResp] = []
+        for model in self.config_models:
+            table = get_grid_table(model.config_type, model.pricing_type)
+            key = (
+                table.__tablename__ if table is not None else None,
+                model.grid_set_id,
+            )
+            configs.append(to_config_resp(model.to_config(), grids.get(key, [])))
+        return configs
+
+    def get_configs(self) -> list[ConfigResp]:
+        grid_models = []
+        for stmt in self._grids_stmts():
+            grid_models.extend(self.db.execute(stmt).scalars().all())
+        return self._to_configs(grid_models)
+
+    async def get_configs_async(self) -> list[ConfigResp]:
+        grid_models = []
+        for stmt in self._grids_stmts():
+            grid_models.extend((await self.db.execute(stmt)).scalars().all())
+        return self._to_configs(grid_models)
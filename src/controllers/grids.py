@@ -1,32 +1,44 @@
 from __future__ import annotations
 
+from hashlib import sha256
 from logging import Logger
 from typing import Union
 
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+
 from __app_configs import (
+    Defaults,
     Deliminator,
-    GridsValidationTypes,
+    GridFields,
     LogMsg,
     PricingImplementationTypes,
     PricingTypes,
 )
-from __exceptions import ConfigGridValidationError, GridsValuesError
+from __exceptions import ConfigGridValidationError, GridSetConflictError
+from controllers.configs import ConfigModelController, get_grid_table
+from controllers.pricing import GridCoverage
 from database.main import db_dependency
 from database.models import (
     ConfigTable,
     DiscountGridTable,
+    GridSetTable,
     PeakGridTable,
     VolumeGridTable,
 )
-from models.configs import Config
+from models.cache import CacheStats
+from models.configs import Config, ConfigResp
 from models.grids import (
     DiscountGrid,
     DiscountGridReq,
+    GridColumns,
     PeakGridReq,
     PeakOffPeakGrid,
     VolumeGrid,
     VolumeGridReq,
 )
+from utils.cache import LRUCache
+from utils.etags import etag_of
 
 
 class VolGridReqController:
@@ -90,12 +102,20 @@ class DiscGridReqController:
 
 
 class GridReqController:
+    """
+    Validates and persists the grids of a config. Grids must tile the volume x
+    distance space (and not overlap in peak hours); the validated `coverage` is kept
+    so callers can build a PriceIndex from it without compiling the grids again.
+    """
+
     req: Config
     id: int
+    coverage: Union[GridCoverage, None]
 
     def __init__(self, req: Config, id: int) -> GridReqController:
         self.req = req
         self.id = id
+        self.coverage = None
 
     def _order_grids(
         self, grids: Union[list[VolumeGrid], list[PeakOffPeakGrid], list[DiscountGrid]]
@@ -109,24 +129,7 @@ class GridReqController:
         self, grids: Union[list[VolumeGrid], list[PeakOffPeakGrid], list[DiscountGrid]]
     ) -> Union[list[VolumeGrid], list[PeakOffPeakGrid], list[DiscountGrid]]:
         ordered_grids = self._order_grids(grids)
-
-        vol_min: int = len(set([grid.min_volume_threshold for grid in ordered_grids]))
-        vol_max: int = len(set([grid.max_volume_threshold for grid in ordered_grids]))
-
-        if vol_max != vol_min:
-            raise GridsValuesError(type=GridsValidationTypes.vol.value)
-
-        dist_min: int = len(set([grid.min_distance_in_unit for grid in ordered_grids]))
-        dist_max: int = len(set([grid.max_distance_in_unit for grid in ordered_grids]))
-
-        if dist_max != dist_min:
-            raise GridsValuesError(type=GridsValidationTypes.dist.value)
-
-        expected_grids_len: int = vol_min * dist_min
-
-        if expected_grids_len != len(ordered_grids):
-            raise GridsValuesError(type=GridsValidationTypes.totals.value)
-
+        self.coverage = GridCoverage.from_grids(ordered_grids, self.req.pricing_type)
         return ordered_grids
 
     def _get_grid_req(
@@ -169,10 +172,62 @@ class GridReqController:
         grids = self._get_grid_req(self.req.grids)
         return self._validate_grids(grids)
 
-    def upload(self, db: db_dependency) -> None:
+    def _validate_columns(self, columns: GridColumns) -> None:
+        self.coverage = GridCoverage(columns.columns, self.req.pricing_type)
+
+    def _to_rows(self, columns: GridColumns) -> list[dict]:
+        rows = sorted(
+            columns.rows(),
+            key=lambda row: (row["min_volume_threshold"], row["min_distance_in_unit"]),
+        )
+        config_id = GridFields.config_id.value
+        weekdays = GridFields.weekday_option.value
+        comma = Deliminator.comma.value
+        for row in rows:
+            row[config_id] = self.id
+            if weekdays in row:
+                row[weekdays] = comma.join(map(str, row[weekdays]))
+        return rows
+
+    def rows(self) -> tuple[type, list[dict]]:
+        """
+        Validated grid rows of the config and the grid table they go to. The grid set
+        is checked column-wise in one pass and the rows are built straight from the
+        columns, instead of one `*GridReq` model per grid.
+
+        :return: the grid table and its rows, ordered as reads return them
+        """
+        table = get_grid_table(self.req.config_type, self.req.pricing_type)
+        if table is None:
+            raise ConfigGridValidationError(
+                pricing=self.req.pricing_type, config=self.req.config_type
+            )
+
+        columns = GridColumns.from_grids(self.req.grids, type(self.req.grids[0]))
+        if not columns.is_valid():
+            return table, [grid.model_dump() for grid in self._format()]
+
+        self._validate_columns(columns)
+        return table, self._to_rows(columns)
+
+    def upload(self, db: db_dependency, logger: Logger) -> int:
+        """
+        Stores the config grids as a grid set, deduplicated by content: when a set
+        with the same grids exists it is reused and nothing is inserted, otherwise the
+        rows are written with a single executemany INSERT.
+
+        :param db: session the INSERTs are executed on; the caller commits
+        :type db: db_dependency
+        :return: ID of the grid set the config references
+        """
+        table, rows = self.rows()
+        return GridSetController(db, logger).get_or_create(table, rows)
+
+    def upload_models(self, db: db_dependency) -> None:
         """
         This function uploads different types of grid data to a database based on their respective
-        types.
+        types, adding one ORM object per grid. Kept as the per-row reference path for
+        `benchmarks.grid_upload`; `upload` is the bulk path used by the service.
 
         :param db: The `db` parameter in the `upload` method is of type `db_dependency`, which is likely
         a dependency representing a database connection or session that is used to interact with the
@@ -193,8 +248,114 @@ class GridReqController:
                 db.add(grid_model)
 
 
+def grid_content_hash(table: type, rows: list[dict]) -> str:
+    """
+    SHA-256 of the grid table and the grid values, in row order, each value cast to
+    its column type, so the same grids hash the same however they were sent.
+    """
+    keys = (
+        GridFields.id.value,
+        GridFields.config_id.value,
+        GridFields.grid_set_id.value,
+    )
+    columns = [column for column in table.__table__.columns if column.name not in keys]
+    digest = sha256(table.__tablename__.encode())
+    for row in rows:
+        values = tuple(
+            (
+                column.type.python_type(row[column.name])
+                if row.get(column.name) is not None
+                else None
+            )
+            for column in columns
+        )
+        digest.update(repr(values).encode())
+    return digest.hexdigest()
+
+
+class GridSetController:
+    """
+    Content-addressed grid sets. Configs with the same grids, e.g. one rate card
+    rolled out to many accounts, reference one GridSetTable row and one copy of the
+    grid rows, so the grid tables grow with the distinct rate cards.
+    """
+
+    db: db_dependency
+    logger: Logger
+
+    def __init__(self, db: db_dependency, logger: Logger) -> None:
+        self.db = db
+        self.logger = logger
+
+    def _find(self, content_hash: str, lock: bool = False) -> Union[int, None]:
+        stmt = select(GridSetTable.id).filter(GridSetTable.content_hash == content_hash)
+        if lock:
+            stmt = stmt.with_for_update()
+        return self.db.execute(stmt).scalar()
+
+    def get_or_create(self, table: type, rows: list[dict]) -> int:
+        """
+        ID of the grid set holding `rows`, created with its grid rows if no set has
+        the same content yet.
+
+        :param table: grid table the rows go to
+        :type table: type
+        :param rows: validated grid rows, ordered as reads return them
+        :type rows: list[dict]
+        :return: the grid set ID
+        """
+        content_hash = grid_content_hash(table, rows)
+        grid_set_id = self._find(content_hash)
+        if grid_set_id is None:
+            try:
+                with self.db.begin_nested():
+                    grid_set = GridSetTable(
+                        content_hash=content_hash,
+                        grid_table=table.__tablename__,
+                        grids=len(rows),
+                    )
+                    self.db.add(grid_set)
+                    self.db.flush()
+                    # NULLs are rendered, as the grid columns have no defaults, so
+                    # open bounds do not split the executemany.
+                    self.db.execute(
+                        insert(table).execution_options(render_nulls=True),
+                        [
+                            {
+                                **row,
+                                GridFields.config_id.value: None,
+                                GridFields.grid_set_id.value: grid_set.id,
+                            }
+                            for row in rows
+                        ],
+                    )
+                self.logger.info(
+                    LogMsg.grid_set_created.value.format(
+                        grid_set_id=grid_set.id,
+                        grids=len(rows),
+                        table=table.__tablename__,
+                    )
+                )
+                return grid_set.id
+            except IntegrityError:
+                # Stored by a concurrent writer since `_find`. A locking read sees the
+                # committed row, where a plain one would reuse the snapshot of the
+                # first `_find` under REPEATABLE READ.
+                grid_set_id = self._find(content_hash, lock=True)
+                if grid_set_id is None:
+                    raise GridSetConflictError(content_hash=content_hash)
+
+        self.logger.debug(
+            LogMsg.grid_set_reused.value.format(
+                grid_set_id=grid_set_id, grids=len(rows)
+            )
+        )
+        return grid_set_id
+
+
 class GridDeleteController:
     db: db_dependency
+    config_model: ConfigTable
     config_id: int
     config_type: str
     pricing_type: str
@@ -203,6 +364,7 @@ class GridDeleteController:
     def __init__(
         self, config_model: ConfigTable, db: db_dependency, logger: Logger
     ) -> GridDeleteController:
+        self.config_model = config_model
         self.config_id = config_model.id
         self.config_type = config_model.config_type
         self.pricing_type = config_model.pricing_type
@@ -210,35 +372,97 @@ class GridDeleteController:
         self.logger = logger
 
     def _log(self) -> None:
+        # Deleted grids change what the grid reads return, so the ETags move on.
+        self.db.add(ConfigModelController(self.config_model).touch())
         self.logger.info(LogMsg.grids_deleted.value.format(config_id=self.config_id))
 
     def delete(self) -> None:
-        if (
-            self.config_type == PricingImplementationTypes.discount.value
-            and self.pricing_type == PricingTypes.volume.value
-        ):
-            self.db.query(DiscountGridTable).filter(
-                DiscountGridTable.config_id == self.config_id
-            ).delete()
-            self._log()
-        elif (
-            self.config_type == PricingImplementationTypes.fee.value
-            and self.pricing_type == PricingTypes.volume.value
-        ):
-            self.db.query(VolumeGridTable).filter(
-                VolumeGridTable.config_id == self.config_id
-            ).delete()
-            self._log()
-        elif (
-            self.config_type == PricingImplementationTypes.fee.value
-            and self.pricing_type == PricingTypes.peak.value
-        ):
-            self.db.query(PeakGridTable).filter(
-                PeakGridTable.config_id == self.config_id
-            ).delete()
-            self._log()
-        else:
+        if get_grid_table(self.config_type, self.pricing_type) is None:
             raise ConfigGridValidationError(
                 pricing=self.pricing_type,
                 config=self.config_type,
             )
+
+        # Grid sets are shared with other configs, so the config lets go of its set
+        # instead of deleting the rows.
+        self.config_model.grid_set_id = None
+        self._log()
+
+
+class GridETagController:
+    """
+    ETags of grid reads by grid ID, from the grid set holding the grid. Grid sets are
+    never changed once written, so the grid ID -> grid set ID mapping is cached once a
+    grid has been read, and later conditional reads are answered without a query.
+    """
+
+    cache: LRUCache
+
+    def __init__(self, max_size: int) -> None:
+        self.cache = LRUCache("grid_sets", max_size)
+
+    def etag(self, table: type, id: int) -> Union[str, None]:
+        """ETag of grid `id` of `table`, None when the grid has not been read yet."""
+        grid_set_id = self.cache.get((table.__tablename__, id))
+        if grid_set_id is None:
+            return None
+        return etag_of(table.__tablename__, id, grid_set_id)
+
+    def put(
+        self,
+        table: type,
+        id: int,
+        grid_models: list[Union[VolumeGridTable, PeakGridTable, DiscountGridTable]],
+    ) -> Union[str, None]:
+        """Remembers the grid set of the grid just read and returns its ETag."""
+        if len(grid_models) == 0 or grid_models[0].grid_set_id is None:
+            return None
+        grid_set_id = self.cache.put(
+            (table.__tablename__, id), grid_models[0].grid_set_id
+        )
+        return etag_of(table.__tablename__, id, grid_set_id)
+
+    def stats(self) -> CacheStats:
+        return self.cache.stats()
+
+
+grid_etags = GridETagController(max_size=Defaults.config_cache_size.value)
+
+
+class GridCoverageCache:
+    """
+    Grid set keyed cache of validated GridCoverage, with the GridIndex compiled from
+    it. Grid sets never change, so every config sharing a set prices from one index
+    and entries never go stale.
+    """
+
+    cache: LRUCache
+
+    def __init__(self, max_size: int) -> None:
+        self.cache = LRUCache("grid_coverages", max_size)
+
+    def coverage(
+        self, grid_set_id: Union[int, None], config: ConfigResp
+    ) -> GridCoverage:
+        """
+        Coverage of the grids of `config`, validated once per grid set. Raises
+        GridsCoverageError, uncached, when the grids do not tile the pricing space.
+        """
+        if grid_set_id is None:
+            return GridCoverage.from_grids(config.grids, config.pricing_type)
+
+        coverage = self.cache.get(grid_set_id)
+        if coverage is None:
+            coverage = self.cache.put(
+                grid_set_id, GridCoverage.from_grids(config.grids, config.pricing_type)
+            )
+        return coverage
+
+    def clear(self) -> None:
+        self.cache.clear()
+
+    def stats(self) -> CacheStats:
+        return self.cache.stats()
+
+
+grid_coverages = GridCoverageCache(max_size=Defaults.config_cache_size.value)
@@ -0,0 +1,478 @@
+from __future__ import annotations
+
+from array import array
+from bisect import bisect_right
+from datetime import datetime
+from math import inf
+from typing import Sequence, Union
+
+import numpy as np
+
+from __app_configs import (
+    GridAmountFields,
+    GridsCoverageIssues,
+    GridsValidationTypes,
+    PricingTypes,
+)
+from __exceptions import GridsCoverageError
+from models.configs import ConfigResp
+from models.grids import DiscountGrid, PeakOffPeakGrid, VolumeGrid
+from models.pricing import PriceResp
+
+_THRESHOLD_FIELDS = (
+    "min_volume_threshold",
+    "max_volume_threshold",
+    "min_distance_in_unit",
+    "max_distance_in_unit",
+)
+_PEAK_FIELDS = ("weekday_option", "hour_start", "hour_end")
+
+
+def _upper(threshold: Union[int, float, None]) -> float:
+    return inf if threshold is None else threshold
+
+
+def _sweep(lowers: list[float], uppers: list[float], type: str) -> None:
+    """
+    Walks sorted bucket lower bounds and checks that every bucket ends exactly where
+    the next one starts. Only the last bucket may be open-ended (upper bound inf).
+    """
+    for position in range(len(lowers) - 1):
+        upper, next_lower = uppers[position], lowers[position + 1]
+        if upper < next_lower:
+            raise GridsCoverageError(
+                type=type, issue=GridsCoverageIssues.gap.value, bound=upper
+            )
+        if upper > next_lower:
+            raise GridsCoverageError(
+                type=type, issue=GridsCoverageIssues.overlap.value, bound=next_lower
+            )
+
+
+def _grid_columns(
+    grids: Union[list[VolumeGrid], list[PeakOffPeakGrid], list[DiscountGrid]],
+    fields: Sequence[str],
+) -> dict[str, list]:
+    return {
+        field: [getattr(grid, field, None) for grid in grids]
+        for field in fields
+        if grids and hasattr(grids[0], field)
+    }
+
+
+class GridIndex:
+    """
+    Sorted, array-backed 2-D bucket index (volume thresholds x distance thresholds)
+    compiled from a set of grids. A (volume, distance) lookup is a pair of binary
+    searches over the lower bounds followed by a check against the cell upper bounds.
+    Empty cells keep an upper bound of -inf so they never match.
+    """
+
+    vol_bounds: Sequence[float]
+    dist_bounds: Sequence[float]
+    vol_limits: Sequence[float]
+    dist_limits: Sequence[float]
+    amounts: dict[str, Sequence[int]]
+
+    def __init__(
+        self, grids: Union[list[VolumeGrid], list[PeakOffPeakGrid], list[DiscountGrid]]
+    ) -> None:
+        self.vol_bounds = array(
+            "d", sorted(set(grid.min_volume_threshold for grid in grids))
+        )
+        self.dist_bounds = array(
+            "d", sorted(set(grid.min_distance_in_unit for grid in grids))
+        )
+        size: int = len(self.vol_bounds) * len(self.dist_bounds)
+        self.vol_limits = array("d", [-inf]) * size
+        self.dist_limits = array("d", [-inf]) * size
+        self.amounts = {
+            field: array("q", [0]) * size for field in GridAmountFields.list()
+        }
+
+        for grid in grids:
+            position = self._position(
+                grid.min_volume_threshold, grid.min_distance_in_unit
+            )
+            self.vol_limits[position] = _upper(grid.max_volume_threshold)
+            self.dist_limits[position] = _upper(grid.max_distance_in_unit)
+            for field, column in self.amounts.items():
+                column[position] = getattr(grid, field, 0)
+
+    @classmethod
+    def from_tiling(cls, tiling: GridTiling, columns: dict[str, list]) -> GridIndex:
+        """
+        Builds the index straight from a validated tiling: bounds and limits are the
+        swept bucket edges and the amount columns are laid out in the tiling order,
+        without a binary search per grid.
+        """
+        return cls.from_buffers(
+            vol_bounds=array("d", tiling.vol_bounds),
+            dist_bounds=array("d", tiling.dist_bounds),
+            vol_limits=array(
+                "d",
+                [limit for limit in tiling.vol_limits for _ in tiling.dist_bounds],
+            ),
+            dist_limits=array("d", tiling.dist_limits * len(tiling.vol_bounds)),
+            amounts={
+                field: (
+                    array("q", [columns[field][cell] for cell in tiling.order])
+                    if field in columns
+                    else array("q", [0]) * len(tiling.order)
+                )
+                for field in GridAmountFields.list()
+            },
+        )
+
+    @classmethod
+    def from_buffers(
+        cls,
+        vol_bounds: Sequence[float],
+        dist_bounds: Sequence[float],
+        vol_limits: Sequence[float],
+        dist_limits: Sequence[float],
+        amounts: dict[str, Sequence[int]],
+    ) -> GridIndex:
+        """
+        Wraps already laid out index arrays. Any buffer of float64 bounds / limits and
+        int64 amounts works, e.g. `memoryview`s over a memory-mapped snapshot.
+        """
+        index = cls.__new__(cls)
+        index.vol_bounds = vol_bounds
+        index.dist_bounds = dist_bounds
+        index.vol_limits = vol_limits
+        index.dist_limits = dist_limits
+        index.amounts = amounts
+        return index
+
+    def _position(self, volume: float, distance: float) -> int:
+        vol_bucket: int = bisect_right(self.vol_bounds, volume) - 1
+        dist_bucket: int = bisect_right(self.dist_bounds, distance) - 1
+        if vol_bucket < 0 or dist_bucket < 0:
+            return -1
+        return vol_bucket * len(self.dist_bounds) + dist_bucket
+
+    def lookup(self, volume: int, distance: float) -> Union[int, None]:
+        position = self._position(volume, distance)
+        if (
+            position < 0
+            or volume >= self.vol_limits[position]
+            or distance >= self.dist_limits[position]
+        ):
+            return None
+        return position
+
+    def lookup_many(self, volumes: np.ndarray, distances: np.ndarray) -> np.ndarray:
+        """
+        Vectorized `lookup` over NumPy views of the index arrays (no copies).
+        Returns the cell position for every row, -1 where no grid matches.
+        """
+        vol_bucket = (
+            np.searchsorted(np.frombuffer(self.vol_bounds), volumes, side="right") - 1
+        )
+        dist_bucket = (
+            np.searchsorted(np.frombuffer(self.dist_bounds), distances, side="right")
+            - 1
+        )
+        found = (vol_bucket >= 0) & (dist_bucket >= 0)
+        positions = np.where(found, vol_bucket * len(self.dist_bounds) + dist_bucket, 0)
+        found &= volumes < np.frombuffer(self.vol_limits)[positions]
+        found &= distances < np.frombuffer(self.dist_limits)[positions]
+        return np.where(found, positions, -1)
+
+    def column(self, field: str) -> np.ndarray:
+        return np.frombuffer(self.amounts[field], dtype=np.int64)
+
+    def price_resp(
+        self,
+        position: int,
+        client_id: int,
+        account_id: int,
+        pricing_type: str,
+        config_type: str,
+        distance: float,
+    ) -> PriceResp:
+        return PriceResp(
+            client_id=client_id,
+            account_id=account_id,
+            pricing_type=pricing_type,
+            config_type=config_type,
+            pickup_amount=self.amounts[GridAmountFields.pickup.value][position],
+            distance_amount=self.amounts[GridAmountFields.distance.value][position]
+            * distance,
+            dropoff_amount=self.amounts[GridAmountFields.dropoff.value][position],
+            discount_amount=self.amounts[GridAmountFields.discount.value][position],
+        )
+
+
+class PeakVariant:
+    weekdays: frozenset[int]
+    hour_start: int
+    hour_end: int
+    index: GridIndex
+
+    def __init__(
+        self, weekdays: frozenset[int], hour_start: int, hour_end: int, index: GridIndex
+    ) -> None:
+        self.weekdays = weekdays
+        self.hour_start = hour_start
+        self.hour_end = hour_end
+        self.index = index
+
+    def matches(self, timestamp: datetime) -> bool:
+        return (
+            timestamp.weekday() in self.weekdays
+            and self.hour_start <= timestamp.hour < self.hour_end
+        )
+
+    def matches_many(self, weekdays: np.ndarray, hours: np.ndarray) -> np.ndarray:
+        return (
+            np.isin(weekdays, list(self.weekdays))
+            & (hours >= self.hour_start)
+            & (hours < self.hour_end)
+        )
+
+
+class GridTiling:
+    """
+    Sweep-line check that a set of grids partitions the volume x distance space into
+    a dense product of buckets: cells are sorted by (min volume, min distance), each
+    volume row is swept along the distance axis and then the rows are swept along
+    the volume axis. Every cell must start where its neighbour ends, cells of a row
+    must share the same volume upper bound, and every row must be split at the same
+    distance thresholds. A `None` upper bound is only allowed on the last bucket.
+    `order` holds the cell positions in row-major order of the resulting buckets.
+    """
+
+    vol_bounds: list[float]
+    dist_bounds: list[float]
+    vol_limits: list[float]
+    dist_limits: list[float]
+    order: list[int]
+
+    def __init__(self, columns: dict[str, list]) -> None:
+        min_vols, max_vols, min_dists, max_dists = (
+            columns[field] for field in _THRESHOLD_FIELDS
+        )
+        self.order = sorted(
+            range(len(min_vols)), key=lambda cell: (min_vols[cell], min_dists[cell])
+        )
+        self.vol_bounds = []
+        self.vol_limits = []
+        self.dist_bounds = []
+        self.dist_limits = []
+
+        row_start: int = 0
+        while row_start < len(self.order):
+            volume = min_vols[self.order[row_start]]
+            row_end: int = row_start
+            while row_end < len(self.order) and min_vols[self.order[row_end]] == volume:
+                row_end += 1
+            row = self.order[row_start:row_end]
+
+            limit = _upper(max_vols[row[0]])
+            if any(_upper(max_vols[cell]) != limit for cell in row):
+                raise GridsCoverageError(
+                    type=GridsValidationTypes.vol.value,
+                    issue=GridsCoverageIssues.overlap.value,
+                    bound=volume,
+                )
+
+            lowers = [min_dists[cell] for cell in row]
+            uppers = [_upper(max_dists[cell]) for cell in row]
+            _sweep(lowers, uppers, GridsValidationTypes.dist.value)
+            if not self.vol_bounds:
+                self.dist_bounds, self.dist_limits = lowers, uppers
+            elif lowers != self.dist_bounds or uppers != self.dist_limits:
+                raise GridsCoverageError(
+                    type=GridsValidationTypes.dist.value,
+                    issue=GridsCoverageIssues.misaligned.value,
+                    bound=volume,
+                )
+
+            self.vol_bounds.append(volume)
+            self.vol_limits.append(limit)
+            row_start = row_end
+
+        _sweep(self.vol_bounds, self.vol_limits, GridsValidationTypes.vol.value)
+
+
+class GridCoverage:
+    """
+    Validated coverage of a config's grids, kept as the lookup structure a PriceIndex
+    is built from. Volume and discount configs are one GridTiling; peak-off-peak
+    configs are one GridTiling per (weekdays, hours) variant, and no two variants
+    may cover the same weekday hour. Hours outside every variant are left unpriced.
+    A config without grids, e.g. detached from its grid set, gets an empty coverage
+    that prices nothing.
+    """
+
+    index: Union[GridIndex, None]
+    variants: list[PeakVariant]
+
+    def __init__(self, columns: dict[str, list], pricing_type: str) -> None:
+        self.index = None
+        self.variants = []
+
+        if not any(columns.values()):
+            return
+        if pricing_type != PricingTypes.peak.value:
+            self.index = GridIndex.from_tiling(GridTiling(columns), columns)
+            return
+
+        groups: dict[tuple, list[int]] = {}
+        for cell, (weekdays, hour_start, hour_end) in enumerate(
+            zip(*(columns[field] for field in _PEAK_FIELDS))
+        ):
+            key = (frozenset(weekdays), hour_start, hour_end)
+            groups.setdefault(key, []).append(cell)
+
+        for (weekdays, hour_start, hour_end), cells in groups.items():
+            variant_columns = {
+                field: [values[cell] for cell in cells]
+                for field, values in columns.items()
+            }
+            index = GridIndex.from_tiling(GridTiling(variant_columns), variant_columns)
+            self.variants.append(PeakVariant(weekdays, hour_start, hour_end, index))
+        self._sweep_hours()
+
+    @classmethod
+    def from_grids(
+        cls,
+        grids: Union[list[VolumeGrid], list[PeakOffPeakGrid], list[DiscountGrid]],
+        pricing_type: str,
+    ) -> GridCoverage:
+        fields = _THRESHOLD_FIELDS + _PEAK_FIELDS + tuple(GridAmountFields.list())
+        return cls(_grid_columns(grids, fields), pricing_type)
+
+    def _sweep_hours(self) -> None:
+        for day in range(7):
+            hours = sorted(
+                (variant.hour_start, variant.hour_end)
+                for variant in self.variants
+                if day in variant.weekdays
+            )
+            for (_, hour_end), (next_start, _) in zip(hours, hours[1:]):
+                if hour_end > next_start:
+                    raise GridsCoverageError(
+                        type=GridsValidationTypes.hours.value,
+                        issue=GridsCoverageIssues.overlap.value,
+                        bound=f"day {day}, hour {next_start}",
+                    )
+
+
+class PriceIndex:
+    """
+    Compiled pricing data for a single config. Volume and discount configs hold one
+    GridIndex; peak-off-peak configs hold one GridIndex per (weekdays, hours) variant.
+    Reuses the indexes of a validated GridCoverage when one is given.
+    """
+
+    config_id: int
+    config: ConfigResp
+    index: Union[GridIndex, None]
+    variants: list[PeakVariant]
+
+    def __init__(
+        self,
+        config_id: int,
+        config: ConfigResp,
+        coverage: Union[GridCoverage, None] = None,
+    ) -> None:
+        self.config_id = config_id
+        self.config = config
+        self.index = None
+        self.variants = []
+
+        if coverage is not None:
+            self.index = coverage.index
+            self.variants = coverage.variants
+        elif config.pricing_type == PricingTypes.peak.value:
+            self.variants = self._compile_variants(config.grids)
+        else:
+            self.index = GridIndex(config.grids)
+
+    @staticmethod
+    def _compile_variants(grids: list[PeakOffPeakGrid]) -> list[PeakVariant]:
+        groups: dict[tuple, list[PeakOffPeakGrid]] = {}
+        for grid in grids:
+            key = (frozenset(grid.weekday_option), grid.hour_start, grid.hour_end)
+            groups.setdefault(key, []).append(grid)
+
+        return [
+            PeakVariant(weekdays, hour_start, hour_end, GridIndex(variant_grids))
+            for (weekdays, hour_start, hour_end), variant_grids in groups.items()
+        ]
+
+    def _get_index(self, timestamp: datetime) -> Union[GridIndex, None]:
+        if self.index is not None:
+            return self.index
+        for variant in self.variants:
+            if variant.matches(timestamp):
+                return variant.index
+        return None
+
+    def buckets(self) -> tuple[int, int]:
+        index = self.index
+        if index is None and len(self.variants) > 0:
+            index = self.variants[0].index
+        if index is None:
+            return 0, 0
+        return len(index.vol_bounds), len(index.dist_bounds)
+
+    def price(
+        self, client_id: int, volume: int, distance: float, timestamp: datetime
+    ) -> Union[PriceResp, None]:
+        index = self._get_index(timestamp)
+        position = index.lookup(volume, distance) if index is not None else None
+        if position is None:
+            return None
+
+        return index.price_resp(
+            position,
+            client_id=client_id,
+            account_id=self.config.account_id,
+            pricing_type=self.config.pricing_type,
+            config_type=self.config.config_type,
+            distance=distance,
+        )
+
+    def price_many(
+        self,
+        volumes: np.ndarray,
+        distances: np.ndarray,
+        weekdays: np.ndarray,
+        hours: np.ndarray,
+    ) -> tuple[np.ndarray, dict[str, np.ndarray]]:
+        """
+        Vectorized `price` for a batch of deliveries priced against this config.
+        Returns a mask of the rows that matched a grid and the amount columns
+        (`distance_amount_per_unit` already multiplied by the distance).
+        """
+        found = np.zeros(len(volumes), dtype=bool)
+        amounts = {
+            field: np.zeros(len(volumes), dtype=np.int64)
+            for field in GridAmountFields.list()
+        }
+
+        if self.index is not None:
+            variants = [(self.index, np.ones(len(volumes), dtype=bool))]
+        else:
+            variants = [
+                (variant.index, variant.matches_many(weekdays, hours))
+                for variant in self.variants
+            ]
+
+        for index, mask in variants:
+            mask &= ~found
+            rows = np.flatnonzero(mask)
+            positions = index.lookup_many(volumes[rows], distances[rows])
+            hit = positions >= 0
+            rows, positions = rows[hit], positions[hit]
+            found[rows] = True
+            for field, column in amounts.items():
+                column[rows] = index.column(field)[positions]
+
+        distance_amounts = amounts.pop(GridAmountFields.distance.value) * distances
+        amounts[GridAmountFields.distance.value] = distance_amounts
+        return found, amounts
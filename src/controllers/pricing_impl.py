@@ -0,0 +1,420 @@
+from datetime import datetime
+from logging import Logger
+from typing import Iterator, Union
+
+import numpy as np
+from fastapi import HTTPException
+from sqlalchemy import select
+
+from __app_configs import Defaults, GridAmountFields, LogMsg
+from __exceptions import (
+    AccountNotFoundError,
+    GridsCoverageError,
+    PriceGridNotFoundError,
+)
+from controllers.account import (
+    ClientAccountController,
+    refresh_client_accounts_async,
+)
+from controllers.account_index import ClientAccounts, client_accounts
+from controllers.config_cache import ActiveConfigEntry, active_configs
+from controllers.config_windows import config_windows
+from controllers.configs import ConfigBulkRespController, ConfigRespController
+from controllers.grids import grid_coverages
+from controllers.pricing import PriceIndex
+from controllers.snapshot import shared_snapshot
+from database.main import async_db_dependency
+from database.models import ConfigTable
+from models.configs import ConfigResp
+from models.pricing import DeliveryPriceReq, DeliveryPriceResp, PriceReq, PriceResp
+from models.query_req import DatesReq
+
+
+def _to_datetime64(timestamps: list[Union[datetime, None]]) -> np.ndarray:
+    return np.array(
+        [datetime.max if ts is None else ts for ts in timestamps],
+        dtype="datetime64[us]",
+    )
+
+
+def _covering(
+    valid_from: np.ndarray, valid_to: np.ndarray, timestamps: np.ndarray
+) -> np.ndarray:
+    """Position of the window covering each timestamp, -1 where none does."""
+    if len(valid_from) == 0:
+        return np.full(len(timestamps), -1)
+    positions = np.searchsorted(valid_from, timestamps, side="right") - 1
+    covered = (positions >= 0) & (timestamps < valid_to[np.maximum(positions, 0)])
+    return np.where(covered, positions, -1)
+
+
+def _account_ids(indexed: ClientAccounts, timestamps: np.ndarray) -> np.ndarray:
+    """Account ID of the window covering each timestamp, 0 where none does."""
+    positions = _covering(
+        _to_datetime64(indexed.valid_from),
+        _to_datetime64([account.valid_to for account in indexed.accounts]),
+        timestamps,
+    )
+    account_ids = np.array(
+        [account.account_id for account in indexed.accounts] + [0], dtype=np.int64
+    )
+    return account_ids[positions]
+
+
+# Account ID of every delivery of a client group (0 where no account window covers
+# it), and the configs of each of those accounts ordered by `valid_from`.
+ResolvedGroup = tuple[np.ndarray, dict[int, list[PriceIndex]]]
+
+
+class Getter:
+    logger: Logger
+    db: async_db_dependency
+
+    def __init__(self, logger: Logger, db: async_db_dependency) -> None:
+        self.logger: Logger = logger
+        self.db: async_db_dependency = db
+
+    def _missing_account(self, client_id: int) -> None:
+        self.logger.info(LogMsg.no_account.value.format(client_id=client_id))
+        raise AccountNotFoundError(account_id=client_id)
+
+    async def _get_entry(self, price_req: PriceReq) -> ActiveConfigEntry:
+        dates_req = DatesReq(start=price_req.timestamp, end=price_req.timestamp)
+        await refresh_client_accounts_async(self.db, self.logger)
+        entry = active_configs.get(price_req.client_id, dates_req)
+        if entry is not None:
+            return entry
+
+        generation = active_configs.generation()
+        account = await ClientAccountController(
+            client_id=price_req.client_id, db=self.db, logger=self.logger
+        ).get_account_from_dates_async(dates_req)
+        if account is None:
+            self._missing_account(price_req.client_id)
+
+        config_model = await config_windows.active_async(
+            self.db, account.account_id, dates_req
+        )
+        if config_model is None:
+            self._missing_account(price_req.client_id)
+
+        config_resp = await ConfigRespController(
+            config_model.id, self.db, self.logger
+        ).get_config_async(config_model.to_config())
+        return active_configs.put(
+            price_req.client_id,
+            account,
+            config_model.id,
+            config_resp,
+            generation,
+            config_model.grid_set_id,
+        )
+
+    def _compile(
+        self,
+        config_id: int,
+        config_resp: ConfigResp,
+        grid_set_id: Union[int, None] = None,
+    ) -> PriceIndex:
+        try:
+            # Configs sharing a grid set share its validated coverage.
+            coverage = grid_coverages.coverage(grid_set_id, config_resp)
+        except GridsCoverageError as err:
+            self.logger.warning(
+                LogMsg.grids_not_tiled.value.format(
+                    config_id=config_id, detail=err.detail
+                )
+            )
+            coverage = None
+
+        price_index = PriceIndex(config_id, config_resp, coverage)
+        vol_buckets, dist_buckets = price_index.buckets()
+        self.logger.debug(
+            LogMsg.price_index_compiled.value.format(
+                config_id=config_id,
+                vol_buckets=vol_buckets,
+                dist_buckets=dist_buckets,
+                variants=len(price_index.variants),
+            )
+        )
+        return price_index
+
+    async def price(self, price_req: PriceReq) -> PriceResp:
+        """
+        Prices a single delivery for a client. The config active at `price_req.timestamp`
+        is compiled into a PriceIndex and the (volume, distance) cell is resolved with
+        two binary searches. The resolved config and its index are kept in the active
+        config cache, so repeated quotes skip the database. Workers started with a
+        shared snapshot price from it first and only query the database on a miss.
+
+        :param price_req: client ID, distance, volume and timestamp of the delivery
+        :type price_req: PriceReq
+        :return: pickup, distance, dropoff and discount amounts of the matching grid
+        """
+        snapshot = shared_snapshot.get(self.logger)
+        if snapshot is not None:
+            price_resp = snapshot.price(price_req)
+            if price_resp is not None:
+                return price_resp
+
+        entry = await self._get_entry(price_req)
+        if entry.price_index is None:
+            entry.price_index = self._compile(
+                entry.config_id, entry.config, entry.grid_set_id
+            )
+        price_index = entry.price_index
+        price_resp = price_index.price(
+            client_id=price_req.client_id,
+            volume=price_req.volume,
+            distance=price_req.distance,
+            timestamp=price_req.timestamp,
+        )
+        if price_resp is None:
+            self.logger.warn(
+                LogMsg.no_price_grid.value.format(
+                    volume=price_req.volume,
+                    distance=price_req.distance,
+                    timestamp=price_req.timestamp,
+                    config_id=entry.config_id,
+                )
+            )
+            raise PriceGridNotFoundError(
+                config_id=entry.config_id,
+                volume=price_req.volume,
+                distance=price_req.distance,
+            )
+
+        return price_resp
+
+    async def _get_config_models(
+        self, account_ids: set[int], start: datetime, end: datetime
+    ) -> list[ConfigTable]:
+        """
+        Live configs of the accounts overlapping `start`-`end`, fetched with a single
+        `account_id IN` query and ordered by `valid_from`.
+        """
+        if len(account_ids) == 0:
+            return []
+
+        result = await self.db.execute(
+            select(ConfigTable)
+            .filter(ConfigTable.account_id.in_(account_ids))
+            .filter(ConfigTable.valid_from <= end)
+            .filter(ConfigTable.valid_to > start)
+            .filter(ConfigTable.deleted_at.is_(None))
+            .order_by(ConfigTable.valid_from)
+        )
+        return result.scalars().all()
+
+    async def _resolve_groups(
+        self, grouped: dict[int, list[DeliveryPriceReq]]
+    ) -> dict[int, Union[ResolvedGroup, str]]:
+        """
+        Resolves the account of every delivery and the configs of those accounts with
+        set-based queries: one for the clients missing from the account index, one for
+        the configs and one per grid table for their grids. Each delivery gets the
+        account window covering its own `created_at`, so a row outside every window
+        fails alone instead of failing its whole client group.
+        """
+        await refresh_client_accounts_async(self.db, self.logger)
+        indexed = {client_id: client_accounts.get(client_id) for client_id in grouped}
+        indexed.update(
+            await client_accounts.load_many_async(
+                self.db,
+                [client_id for client_id, found in indexed.items() if found is None],
+            )
+        )
+
+        resolved: dict[int, Union[ResolvedGroup, str]] = {}
+        account_ids: dict[int, np.ndarray] = {}
+        for client_id, client_indexed in indexed.items():
+            if client_indexed is None:
+                err = AccountNotFoundError()
+                self.logger.warn(err.detail)
+                resolved[client_id] = err.detail
+                continue
+            account_ids[client_id] = _account_ids(
+                client_indexed,
+                _to_datetime64(
+                    [delivery.created_at for delivery in grouped[client_id]]
+                ),
+            )
+
+        timestamps = [
+            delivery.created_at
+            for client_id in account_ids
+            for delivery in grouped[client_id]
+        ]
+        config_models = (
+            await self._get_config_models(
+                {
+                    account_id
+                    for ids in account_ids.values()
+                    for account_id in ids.tolist()
+                    if account_id > 0
+                },
+                min(timestamps),
+                max(timestamps),
+            )
+            if len(timestamps) > 0
+            else []
+        )
+        config_resps = await ConfigBulkRespController(
+            config_models, self.db, self.logger
+        ).get_configs_async()
+        price_indexes: dict[int, list[PriceIndex]] = {}
+        for model, config_resp in zip(config_models, config_resps):
+            price_indexes.setdefault(model.account_id, []).append(
+                self._compile(model.id, config_resp, model.grid_set_id)
+            )
+
+        for client_id, ids in account_ids.items():
+            if not ids.all():
+                self.logger.info(LogMsg.no_account.value.format(client_id=client_id))
+            resolved[client_id] = (
+                ids,
+                {
+                    account_id: price_indexes.get(account_id, [])
+                    for account_id in np.unique(ids[ids > 0]).tolist()
+                },
+            )
+        return resolved
+
+    def _error_lines(
+        self, client_id: int, deliveries: list[DeliveryPriceReq], error: str
+    ) -> Iterator[str]:
+        for delivery in deliveries:
+            yield DeliveryPriceResp.model_construct(
+                id=delivery.id, client_id=client_id, error=error
+            ).model_dump_json() + "\n"
+
+    def _price_group(
+        self,
+        client_id: int,
+        deliveries: list[DeliveryPriceReq],
+        group: ResolvedGroup,
+    ) -> Iterator[str]:
+        timestamps = _to_datetime64([delivery.created_at for delivery in deliveries])
+        volumes = np.array([delivery.volume for delivery in deliveries])
+        distances = np.array([delivery.distance for delivery in deliveries])
+        days = timestamps.astype("datetime64[D]")
+        weekdays = (days.view(np.int64) + 3) % 7
+        hours = (timestamps - days).astype("timedelta64[h]").view(np.int64)
+
+        # Configs of all the group's accounts in one list, each row pointing at the
+        # config of its own account covering its timestamp.
+        account_ids, account_indexes = group
+        price_indexes: list[PriceIndex] = []
+        config_pos = np.full(len(deliveries), -1)
+        for account_id, indexes in account_indexes.items():
+            rows = np.flatnonzero(account_ids == account_id)
+            positions = _covering(
+                _to_datetime64([idx.config.valid_from for idx in indexes]),
+                _to_datetime64([idx.config.valid_to for idx in indexes]),
+                timestamps[rows],
+            )
+            config_pos[rows] = np.where(
+                positions >= 0, positions + len(price_indexes), -1
+            )
+            price_indexes.extend(indexes)
+
+        found = np.zeros(len(deliveries), dtype=bool)
+        amounts = {
+            field: np.zeros(len(deliveries), dtype=np.float64)
+            for field in GridAmountFields.list()
+        }
+        for position, price_index in enumerate(price_indexes):
+            rows = np.flatnonzero(config_pos == position)
+            rows_found, rows_amounts = price_index.price_many(
+                volumes[rows], distances[rows], weekdays[rows], hours[rows]
+            )
+            found[rows] = rows_found
+            for field, column in rows_amounts.items():
+                amounts[field][rows] = column
+
+        self.logger.info(
+            LogMsg.batch_priced.value.format(
+                deliveries=len(deliveries),
+                client_id=client_id,
+                configs=len(price_indexes),
+                missing=int((~found).sum()),
+            )
+        )
+
+        for start in range(0, len(deliveries), Defaults.price_batch_chunk.value):
+            end = start + Defaults.price_batch_chunk.value
+            lines: list[str] = []
+            for row, delivery in enumerate(deliveries[start:end], start=start):
+                if not found[row]:
+                    if account_ids[row] == 0:
+                        error = AccountNotFoundError(account_id=client_id).detail
+                    elif config_pos[row] < 0:
+                        error = LogMsg.no_price_config.value.format(
+                            delivery_id=delivery.id,
+                            client_id=client_id,
+                            timestamp=delivery.created_at,
+                        )
+                    else:
+                        error = PriceGridNotFoundError(
+                            config_id=price_indexes[config_pos[row]].config_id,
+                            volume=delivery.volume,
+                            distance=delivery.distance,
+                        ).detail
+                    lines.append(
+                        DeliveryPriceResp.model_construct(
+                            id=delivery.id, client_id=client_id, error=error
+                        ).model_dump_json()
+                    )
+                    continue
+
+                config = price_indexes[config_pos[row]].config
+                lines.append(
+                    DeliveryPriceResp.model_construct(
+                        id=delivery.id,
+                        client_id=client_id,
+                        account_id=config.account_id,
+                        pricing_type=config.pricing_type,
+                        config_type=config.config_type,
+                        pickup_amount=int(amounts[GridAmountFields.pickup.value][row]),
+                        distance_amount=float(
+                            amounts[GridAmountFields.distance.value][row]
+                        ),
+                        dropoff_amount=int(
+                            amounts[GridAmountFields.dropoff.value][row]
+                        ),
+                        discount_amount=int(
+                            amounts[GridAmountFields.discount.value][row]
+                        ),
+                    ).model_dump_json()
+                )
+            yield "\n".join(lines) + "\n"
+
+    def _stream(
+        self,
+        grouped: dict[int, list[DeliveryPriceReq]],
+        resolved: dict[int, Union[ResolvedGroup, str]],
+    ) -> Iterator[str]:
+        for client_id, deliveries in grouped.items():
+            group = resolved[client_id]
+            if isinstance(group, str):
+                yield from self._error_lines(client_id, deliveries, group)
+            else:
+                yield from self._price_group(client_id, deliveries, group)
+
+    async def price_batch(self, deliveries: list[DeliveryPriceReq]) -> Iterator[str]:
+        """
+        Prices a batch of deliveries. Deliveries are grouped by client ID, and the
+        accounts and configs of all the groups are resolved together with set-based
+        `IN` queries, so the number of queries does not grow with the number of
+        clients and the returned iterator does no database work. Every group is then
+        priced with vectorized lookups over the grid thresholds.
+
+        :param deliveries: deliveries with their distance and volume
+        :type deliveries: list[DeliveryPriceReq]
+        :return: iterator of NDJSON lines, one DeliveryPriceResp per delivery
+        """
+        grouped: dict[int, list[DeliveryPriceReq]] = {}
+        for delivery in deliveries:
+            grouped.setdefault(delivery.client_id, []).append(delivery)
+
+        return self._stream(grouped, await self._resolve_groups(grouped))
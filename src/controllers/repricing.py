@@ -0,0 +1,510 @@
+"""
+Historical re-pricing job: prices a file of deliveries against the configs that were
+valid when each delivery was created.
+
+Deliveries are read in chunks (CSV with a header row, or NDJSON) with the fields of
+`DeliveryPriceReq`. For every chunk the account windows of new clients and the config
+windows of new accounts inside the date range are fetched with set-based queries,
+deliveries are walked in time order per client and per account with binary searches
+over the windows, and every config prices its rows with one vectorized lookup. Results
+are appended to the output (CSV, or Parquet when pyarrow is installed) chunk by chunk,
+so memory is bounded by the chunk size and the number of distinct clients and configs.
+"""
+
+from __future__ import annotations
+
+import csv
+import json
+import os
+from datetime import datetime
+from itertools import islice
+from logging import Logger
+from time import perf_counter
+from typing import Iterator, Union
+
+import numpy as np
+from sqlalchemy import or_, select
+from sqlalchemy.orm import Session
+
+from __app_configs import Defaults, GridAmountFields, LogMsg
+from __exceptions import (
+    AccountNotFoundError,
+    GridsCoverageError,
+    PriceGridNotFoundError,
+    RepricingFileError,
+)
+from controllers.configs import ConfigBulkRespController
+from controllers.grids import grid_coverages
+from controllers.pricing import PriceIndex
+from controllers.pricing_impl import _to_datetime64
+from database.models import AccountTable, ConfigTable
+from models.repricing import RepricingResp
+from utils.cache import LRUCache
+
+_INPUT_FIELDS = ("id", "client_id", "status", "created_at", "distance", "volume")
+
+# Output column -> type, shared by the CSV header and the Parquet schema.
+_OUTPUT_FIELDS = {
+    "id": "int64",
+    "client_id": "int64",
+    "status": "string",
+    "created_at": "timestamp",
+    "account_id": "int64",
+    "config_id": "int64",
+    "pricing_type": "string",
+    "config_type": "string",
+    "pickup_amount": "int64",
+    "distance_amount": "float64",
+    "dropoff_amount": "int64",
+    "discount_amount": "int64",
+    "error": "string",
+}
+
+
+def _read_records(path: str) -> Iterator[dict]:
+    with open(path, newline="") as file:
+        if path.endswith((".ndjson", ".jsonl")):
+            for line in file:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield from csv.DictReader(file)
+
+
+def _batches(values: list, size: int) -> Iterator[list]:
+    for start in range(0, len(values), size):
+        yield values[start : start + size]
+
+
+def _windows(
+    rows: list[tuple],
+) -> tuple[np.ndarray, np.ndarray, list]:
+    """Sorts (valid_from, valid_to, value) rows into searchable window arrays."""
+    rows = sorted(rows, key=lambda row: row[0])
+    return (
+        _to_datetime64([row[0] for row in rows]),
+        _to_datetime64([row[1] for row in rows]),
+        [row[2] for row in rows],
+    )
+
+
+def _locate(
+    windows: tuple[np.ndarray, np.ndarray, list], timestamps: np.ndarray
+) -> np.ndarray:
+    """Position of the window covering each (sorted) timestamp, -1 where none does."""
+    valid_from, valid_to, _ = windows
+    if len(valid_from) == 0:
+        return np.full(len(timestamps), -1)
+    positions = np.searchsorted(valid_from, timestamps, side="right") - 1
+    covered = (positions >= 0) & (timestamps < valid_to[np.maximum(positions, 0)])
+    return np.where(covered, positions, -1)
+
+
+def _segments(keys: np.ndarray) -> Iterator[tuple[int, int, int]]:
+    """(key, start, end) of every run of equal values in sorted `keys`."""
+    values, starts = np.unique(keys, return_index=True)
+    ends = np.append(starts[1:], len(keys))
+    return zip(values.tolist(), starts.tolist(), ends.tolist())
+
+
+class CsvResultWriter:
+    """Writes to a file next to `path`, renamed over it once the job completes."""
+
+    path: str
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.file = open(f"{path}.tmp", "w", newline="")
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(_OUTPUT_FIELDS)
+
+    def write(self, columns: dict[str, list]) -> None:
+        self.writer.writerows(zip(*columns.values()))
+
+    def close(self) -> None:
+        self.file.close()
+        os.replace(self.file.name, self.path)
+
+    def discard(self) -> None:
+        self.file.close()
+        os.remove(self.file.name)
+
+
+class ParquetResultWriter:
+    """
+    Writes every chunk as one row group, renamed over `path` once the job completes.
+    pyarrow is only needed for this output.
+    """
+
+    path: str
+
+    def __init__(self, path: str) -> None:
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as err:
+            raise RepricingFileError(
+                path, "Parquet output requires pyarrow, write a .csv file instead."
+            ) from err
+
+        types = {
+            "int64": pa.int64(),
+            "float64": pa.float64(),
+            "string": pa.string(),
+            "timestamp": pa.timestamp("us"),
+        }
+        self.path = path
+        self.pa = pa
+        self.schema = pa.schema(
+            [(field, types[type]) for field, type in _OUTPUT_FIELDS.items()]
+        )
+        self.tmp_path = f"{path}.tmp"
+        self.writer = pq.ParquetWriter(self.tmp_path, self.schema)
+
+    def write(self, columns: dict[str, list]) -> None:
+        self.writer.write_table(self.pa.table(columns, schema=self.schema))
+
+    def close(self) -> None:
+        self.writer.close()
+        os.replace(self.tmp_path, self.path)
+
+    def discard(self) -> None:
+        self.writer.close()
+        os.remove(self.tmp_path)
+
+
+def open_writer(path: str) -> Union[CsvResultWriter, ParquetResultWriter]:
+    if path.endswith(".parquet"):
+        return ParquetResultWriter(path)
+    if path.endswith(".csv"):
+        return CsvResultWriter(path)
+    raise RepricingFileError(path, "Output must be a .csv or .parquet file.")
+
+
+class RepricingJob:
+    """
+    Re-prices deliveries created in [start, end) with the configs valid at their
+    creation time. A delivery resolves to the account its client belonged to at that
+    time and to the config of that account whose validity window covers it.
+    """
+
+    db: Session
+    logger: Logger
+    start: datetime
+    end: datetime
+    chunk_size: int
+
+    def __init__(
+        self,
+        db: Session,
+        logger: Logger,
+        start: datetime,
+        end: datetime,
+        chunk_size: int = Defaults.reprice_chunk.value,
+    ) -> None:
+        self.db = db
+        self.logger = logger
+        self.start = start
+        self.end = end
+        self.chunk_size = chunk_size
+        self.accounts: dict[int, tuple] = {}
+        self.configs: dict[int, tuple] = {}
+        self.config_models: dict[int, ConfigTable] = {}
+        self.price_indexes = LRUCache(
+            "reprice_indexes", Defaults.config_cache_size.value
+        )
+
+    def _load_accounts(self, client_ids: list[int]) -> None:
+        rows: dict[int, list[tuple]] = {client_id: [] for client_id in client_ids}
+        for batch in _batches(client_ids, Defaults.reprice_query_batch.value):
+            result = self.db.execute(
+                select(
+                    AccountTable.client_id,
+                    AccountTable.valid_from,
+                    AccountTable.valid_to,
+                    AccountTable.account_id,
+                )
+                .filter(AccountTable.client_id.in_(batch))
+                .filter(AccountTable.deleted_at.is_(None))
+                .filter(AccountTable.valid_from < self.end)
+                .filter(
+                    or_(
+                        AccountTable.valid_to.is_(None),
+                        AccountTable.valid_to > self.start,
+                    )
+                )
+            )
+            for client_id, *window in result:
+                rows[client_id].append(tuple(window))
+
+        for client_id, windows in rows.items():
+            self.accounts[client_id] = _windows(windows)
+
+    def _load_configs(self, account_ids: list[int]) -> None:
+        rows: dict[int, list[tuple]] = {account_id: [] for account_id in account_ids}
+        for batch in _batches(account_ids, Defaults.reprice_query_batch.value):
+            result = self.db.execute(
+                select(ConfigTable)
+                .filter(ConfigTable.account_id.in_(batch))
+                .filter(ConfigTable.deleted_at.is_(None))
+                .filter(ConfigTable.valid_from < self.end)
+                .filter(ConfigTable.valid_to > self.start)
+            )
+            for config_model in result.scalars().all():
+                self.config_models[config_model.id] = config_model
+                rows[config_model.account_id].append(
+                    (config_model.valid_from, config_model.valid_to, config_model.id)
+                )
+
+        for account_id, windows in rows.items():
+            self.configs[account_id] = _windows(windows)
+
+    def _compile(self, config_ids: list[int]) -> dict[int, PriceIndex]:
+        """PriceIndex of every config, the ones not cached yet compiled in one fetch."""
+        price_indexes = {
+            config_id: self.price_indexes.get(config_id) for config_id in config_ids
+        }
+        missing = [
+            self.config_models[config_id]
+            for config_id, price_index in price_indexes.items()
+            if price_index is None
+        ]
+        if len(missing) == 0:
+            return price_indexes
+
+        config_resps = ConfigBulkRespController(
+            missing, self.db, self.logger
+        ).get_configs()
+        for config_model, config_resp in zip(missing, config_resps):
+            try:
+                coverage = grid_coverages.coverage(
+                    config_model.grid_set_id, config_resp
+                )
+            except GridsCoverageError as err:
+                self.logger.warning(
+                    LogMsg.grids_not_tiled.value.format(
+                        config_id=config_model.id, detail=err.detail
+                    )
+                )
+                coverage = None
+            price_indexes[config_model.id] = self.price_indexes.put(
+                config_model.id, PriceIndex(config_model.id, config_resp, coverage)
+            )
+        return price_indexes
+
+    def _read(self, path: str, records: list[dict], offset: int) -> dict:
+        try:
+            created_at = [
+                (
+                    record["created_at"]
+                    if isinstance(record["created_at"], datetime)
+                    else datetime.fromisoformat(record["created_at"])
+                )
+                for record in records
+            ]
+            return {
+                "id": np.array([int(record["id"]) for record in records]),
+                "client_id": np.array([int(record["client_id"]) for record in records]),
+                "status": [record.get("status", "") for record in records],
+                "created_at": np.array(created_at, dtype="datetime64[us]"),
+                "distance": np.array([float(record["distance"]) for record in records]),
+                "volume": np.array(
+                    [int(record.get("volume") or 1) for record in records]
+                ),
+            }
+        except (KeyError, TypeError, ValueError) as err:
+            raise RepricingFileError(
+                path,
+                f"Rows {offset + 1}-{offset + len(records)} need the fields "
+                f"{', '.join(_INPUT_FIELDS)}: {err!r}",
+            ) from err
+
+    def _resolve(
+        self, client_ids: np.ndarray, timestamps: np.ndarray
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Account ID and config ID (0 when there is none) of every delivery. Deliveries
+        are sorted by (client, time) to walk the account windows of each client, then
+        by (account, time) to walk the config windows of each account.
+        """
+        new_clients = np.setdiff1d(client_ids, list(self.accounts)).tolist()
+        if len(new_clients) > 0:
+            self._load_accounts(new_clients)
+
+        account_ids = np.zeros(len(client_ids), dtype=np.int64)
+        order = np.lexsort((timestamps, client_ids))
+        for client_id, start, end in _segments(client_ids[order]):
+            windows = self.accounts[client_id]
+            rows = order[start:end]
+            positions = _locate(windows, timestamps[rows])
+            accounts = np.array(windows[2] + [0], dtype=np.int64)
+            account_ids[rows] = accounts[positions]
+
+        new_accounts = np.setdiff1d(account_ids, [0, *self.configs]).tolist()
+        if len(new_accounts) > 0:
+            self._load_configs(new_accounts)
+
+        config_ids = np.zeros(len(client_ids), dtype=np.int64)
+        order = np.lexsort((timestamps, account_ids))
+        for account_id, start, end in _segments(account_ids[order]):
+            if account_id == 0:
+                continue
+            windows = self.configs[account_id]
+            rows = order[start:end]
+            positions = _locate(windows, timestamps[rows])
+            configs = np.array(windows[2] + [0], dtype=np.int64)
+            config_ids[rows] = configs[positions]
+        return account_ids, config_ids
+
+    def _price(self, deliveries: dict) -> tuple[dict[str, list], int, int]:
+        timestamps = deliveries["created_at"]
+        volumes = deliveries["volume"]
+        distances = deliveries["distance"]
+        days = timestamps.astype("datetime64[D]")
+        weekdays = (days.view(np.int64) + 3) % 7
+        hours = (timestamps - days).astype("timedelta64[h]").view(np.int64)
+
+        account_ids, config_ids = self._resolve(deliveries["client_id"], timestamps)
+        unique_configs = np.unique(config_ids[config_ids > 0]).tolist()
+        price_indexes = self._compile(unique_configs)
+
+        size = len(timestamps)
+        found = np.zeros(size, dtype=bool)
+        amounts = {
+            field: np.zeros(size, dtype=np.float64) for field in GridAmountFields.list()
+        }
+        pricing_types: list = [None] * size
+        config_types: list = [None] * size
+        for config_id, price_index in price_indexes.items():
+            rows = np.flatnonzero(config_ids == config_id)
+            rows_found, rows_amounts = price_index.price_many(
+                volumes[rows], distances[rows], weekdays[rows], hours[rows]
+            )
+            found[rows] = rows_found
+            for field, column in rows_amounts.items():
+                amounts[field][rows] = column
+            for row in rows.tolist():
+                pricing_types[row] = price_index.config.pricing_type
+                config_types[row] = price_index.config.config_type
+
+        errors: list = [None] * size
+        for row in np.flatnonzero(~found).tolist():
+            if account_ids[row] == 0:
+                errors[row] = AccountNotFoundError(
+                    account_id=int(deliveries["client_id"][row])
+                ).detail
+            elif config_ids[row] == 0:
+                errors[row] = LogMsg.no_price_config.value.format(
+                    delivery_id=int(deliveries["id"][row]),
+                    client_id=int(deliveries["client_id"][row]),
+                    timestamp=timestamps[row].item(),
+                )
+            else:
+                errors[row] = PriceGridNotFoundError(
+                    config_id=int(config_ids[row]),
+                    volume=int(volumes[row]),
+                    distance=float(distances[row]),
+                ).detail
+
+        columns = {
+            "id": deliveries["id"].tolist(),
+            "client_id": deliveries["client_id"].tolist(),
+            "status": deliveries["status"],
+            "created_at": timestamps.tolist(),
+            "account_id": [value or None for value in account_ids.tolist()],
+            "config_id": [value or None for value in config_ids.tolist()],
+            "pricing_type": pricing_types,
+            "config_type": config_types,
+            "pickup_amount": amounts[GridAmountFields.pickup.value]
+            .astype(np.int64)
+            .tolist(),
+            "distance_amount": amounts[GridAmountFields.distance.value].tolist(),
+            "dropoff_amount": amounts[GridAmountFields.dropoff.value]
+            .astype(np.int64)
+            .tolist(),
+            "discount_amount": amounts[GridAmountFields.discount.value]
+            .astype(np.int64)
+            .tolist(),
+            "error": errors,
+        }
+        return columns, len(unique_configs), int((~found).sum())
+
+    def run(self, input_path: str, output_path: str) -> RepricingResp:
+        """
+        Re-prices the deliveries of `input_path` created inside the job's date range
+        and writes one row per delivery to `output_path`, in input order. Rows outside
+        the range are skipped. The output is written next to the target and renamed
+        over it once complete, so a failed run leaves no partial file behind.
+
+        :param input_path: .csv (with a header row) or .ndjson/.jsonl deliveries file
+        :type input_path: str
+        :param output_path: .csv or .parquet file the prices are written to
+        :type output_path: str
+        :return: counts and duration of the run
+        """
+        started = perf_counter()
+        resp = RepricingResp(
+            input_path=input_path,
+            output_path=output_path,
+            start=self.start,
+            end=self.end,
+        )
+        start = np.datetime64(self.start, "us")
+        end = np.datetime64(self.end, "us")
+
+        writer = open_writer(output_path)
+        try:
+            records = _read_records(input_path)
+            offset = 0
+            while True:
+                chunk = list(islice(records, self.chunk_size))
+                if len(chunk) == 0:
+                    break
+
+                deliveries = self._read(input_path, chunk, offset)
+                offset += len(chunk)
+                in_range = (deliveries["created_at"] >= start) & (
+                    deliveries["created_at"] < end
+                )
+                skipped = len(chunk) - int(in_range.sum())
+                if skipped > 0:
+                    deliveries = {
+                        field: (
+                            values[in_range]
+                            if isinstance(values, np.ndarray)
+                            else [
+                                value
+                                for value, keep in zip(values, in_range.tolist())
+                                if keep
+                            ]
+                        )
+                        for field, values in deliveries.items()
+                    }
+
+                resp.chunks += 1
+                resp.skipped += skipped
+                if len(deliveries["id"]) == 0:
+                    continue
+
+                columns, configs, missing = self._price(deliveries)
+                writer.write(columns)
+                resp.deliveries += len(columns["id"])
+                resp.missing += missing
+                self.logger.info(
+                    LogMsg.reprice_chunk.value.format(
+                        chunk=resp.chunks,
+                        deliveries=len(columns["id"]),
+                        configs=configs,
+                        skipped=skipped,
+                        missing=missing,
+                    )
+                )
+        except BaseException:
+            writer.discard()
+            raise
+
+        writer.close()
+        resp.configs = len(self.config_models)
+        resp.seconds = perf_counter() - started
+        self.logger.info(LogMsg.reprice_done.value.format(**resp.model_dump()))
+        return resp
@@ -0,0 +1,674 @@
+"""
+Columnar binary snapshot of the active configs, for pricing workers.
+
+Layout: the magic bytes, a little header (uint32 length + JSON) and then fixed-width
+native-endian arrays, each starting on an 8-byte boundary. The JSON header maps every
+array to its (typecode, offset, length) and holds the type names the int8 codes refer
+to. Row groups reference each other through offset tables of length n + 1:
+
+- clients:  `client_ids` (sorted) -> `client_accounts`
+- accounts: `account_ids` (sorted) -> `window_offsets` into `window_from` /
+  `window_to` and `config_offsets` into the config rows
+- configs:  `config_ids`, `config_from`, `config_to`, `pricing_types`, `config_types`
+  -> `variant_offsets` into the variant rows
+- variants: `weekday_masks`, `hour_starts`, `hour_ends` -> `vol_offsets`,
+  `dist_offsets`, `cell_offsets` into the bucket bounds and cell arrays
+- buckets:  `vol_bounds`, `dist_bounds` and the per cell `vol_limits`, `dist_limits`
+  and amount columns, laid out exactly as a GridIndex
+
+Timestamps are microseconds since the epoch, open-ended ones are stored as int64 max.
+The loader memory-maps the file read only, so every process loading the same snapshot
+shares one copy of the pages and a lookup only touches the pages it reads.
+"""
+
+from __future__ import annotations
+
+import json
+import mmap
+import os
+import sys
+from array import array
+from bisect import bisect_left
+from datetime import datetime, timedelta
+from logging import Logger
+from threading import Event, Lock, Thread
+from time import monotonic, perf_counter
+from typing import Union
+
+from sqlalchemy import func, or_, select
+from sqlalchemy.orm import Session, sessionmaker
+
+from __app_configs import (
+    BaseConfigFields,
+    Defaults,
+    Deliminator,
+    GridAmountFields,
+    GridFields,
+    LogMsg,
+    PricingImplementationTypes,
+    PricingTypes,
+    SnapshotSettings,
+)
+from __exceptions import GridsCoverageError, SnapshotFormatError
+from controllers.pricing import GridCoverage, GridIndex, PeakVariant, PriceIndex
+from database.models import (
+    AccountTable,
+    ConfigTable,
+    DiscountGridTable,
+    PeakGridTable,
+    VolumeGridTable,
+)
+from models.configs import Config
+from models.pricing import PriceReq, PriceResp
+from models.snapshot import SnapshotResp
+
+_MAGIC = b"GRIDSNP1"
+_VERSION = 1
+_ALIGN = 8
+_HEADER_LENGTH = array("I", [0]).itemsize
+_EPOCH = datetime(1970, 1, 1)
+_OPEN_END = 2**63 - 1
+_ALL_DAYS = frozenset(range(7))
+
+_SECTIONS = {
+    "client_ids": "q",
+    "client_accounts": "q",
+    "account_ids": "q",
+    "window_offsets": "q",
+    "window_from": "q",
+    "window_to": "q",
+    "config_offsets": "q",
+    "config_ids": "q",
+    "config_from": "q",
+    "config_to": "q",
+    "pricing_types": "b",
+    "config_types": "b",
+    "variant_offsets": "q",
+    "weekday_masks": "B",
+    "hour_starts": "b",
+    "hour_ends": "b",
+    "vol_offsets": "q",
+    "dist_offsets": "q",
+    "cell_offsets": "q",
+    "vol_bounds": "d",
+    "dist_bounds": "d",
+    "vol_limits": "d",
+    "dist_limits": "d",
+    **{field: "q" for field in GridAmountFields.list()},
+}
+
+_GRID_TABLES = (VolumeGridTable, PeakGridTable, DiscountGridTable)
+
+
+def _micros(timestamp: Union[datetime, None]) -> int:
+    if timestamp is None:
+        return _OPEN_END
+    return (timestamp - _EPOCH) // timedelta(microseconds=1)
+
+
+def _weekday_mask(weekdays: frozenset[int]) -> int:
+    mask = 0
+    for day in weekdays:
+        mask |= 1 << day
+    return mask
+
+
+class ConfigSnapshotWriter:
+    """
+    Exports every active account window and config, with its compiled grid index, in
+    a handful of set-based queries instead of one `ConfigRespController` round trip
+    per config.
+    """
+
+    db: Session
+    logger: Logger
+
+    def __init__(self, db: Session, logger: Logger) -> None:
+        self.db = db
+        self.logger = logger
+        self.arrays: dict[str, array] = {
+            name: array(typecode) for name, typecode in _SECTIONS.items()
+        }
+
+    def _accounts(self, now: datetime) -> dict[int, list[tuple[int, int]]]:
+        rows = self.db.execute(
+            select(
+                AccountTable.client_id,
+                AccountTable.account_id,
+                AccountTable.valid_from,
+                AccountTable.valid_to,
+            )
+            .filter(AccountTable.deleted_at.is_(None))
+            .filter(or_(AccountTable.valid_to.is_(None), AccountTable.valid_to > now))
+        ).all()
+
+        # A client resolves to the account of its latest window, as in
+        # `ClientAccountController.get_account`.
+        latest: dict[int, tuple[int, int]] = {}
+        windows: dict[int, list[tuple[int, int]]] = {}
+        for client_id, account_id, valid_from, valid_to in rows:
+            valid_to = _micros(valid_to)
+            if client_id not in latest or valid_to > latest[client_id][0]:
+                latest[client_id] = (valid_to, account_id)
+            windows.setdefault(account_id, []).append((_micros(valid_from), valid_to))
+
+        for client_id in sorted(latest):
+            self.arrays["client_ids"].append(client_id)
+            self.arrays["client_accounts"].append(latest[client_id][1])
+        return windows
+
+    def _configs(self, now: datetime) -> list:
+        return self.db.execute(
+            select(
+                ConfigTable.id,
+                ConfigTable.account_id,
+                ConfigTable.valid_from,
+                ConfigTable.valid_to,
+                ConfigTable.pricing_type,
+                ConfigTable.config_type,
+                ConfigTable.grid_set_id,
+            )
+            .filter(ConfigTable.deleted_at.is_(None))
+            .filter(ConfigTable.valid_to > now)
+            .order_by(ConfigTable.account_id, ConfigTable.valid_from)
+        ).all()
+
+    def _grids(self, now: datetime) -> dict[int, dict[str, list]]:
+        """Grid columns of the grid sets referenced by active configs, by grid set ID."""
+        active = (
+            select(ConfigTable.grid_set_id)
+            .filter(ConfigTable.deleted_at.is_(None))
+            .filter(ConfigTable.valid_to > now)
+        )
+        grids: dict[int, dict[str, list]] = {}
+        for table in _GRID_TABLES:
+            fields = [
+                column.name
+                for column in table.__table__.columns
+                if column.name
+                not in (
+                    GridFields.id.value,
+                    GridFields.config_id.value,
+                    GridFields.grid_set_id.value,
+                )
+            ]
+            result = self.db.execute(
+                select(table.grid_set_id, *(getattr(table, field) for field in fields))
+                .filter(table.grid_set_id.in_(active))
+                .order_by(table.grid_set_id, table.id)
+            )
+            for grid_set_id, *values in result:
+                columns = grids.setdefault(grid_set_id, {field: [] for field in fields})
+                for field, value in zip(fields, values):
+                    columns[field].append(value)
+
+        for columns in grids.values():
+            if "weekday_option" in columns:
+                columns["weekday_option"] = [
+                    [int(day) for day in days.split(Deliminator.comma.value)]
+                    for days in columns["weekday_option"]
+                ]
+        return grids
+
+    def _compile(
+        self, config_id: int, config_type: str, pricing_type: str, columns: dict
+    ) -> list[PeakVariant]:
+        try:
+            coverage = GridCoverage(columns, pricing_type)
+        except GridsCoverageError as err:
+            self.logger.warning(
+                LogMsg.grids_not_tiled.value.format(
+                    config_id=config_id, detail=err.detail
+                )
+            )
+            grid_type = Config._grid_type(
+                {
+                    BaseConfigFields.config_type.value: config_type,
+                    BaseConfigFields.pricing_type.value: pricing_type,
+                }
+            )
+            fields = list(columns)
+            grids = [
+                grid_type(**dict(zip(fields, values)))
+                for values in zip(*columns.values())
+            ]
+            if pricing_type == PricingTypes.peak.value:
+                return PriceIndex._compile_variants(grids)
+            return [PeakVariant(_ALL_DAYS, 0, 24, GridIndex(grids))]
+
+        if coverage.index is not None:
+            return [PeakVariant(_ALL_DAYS, 0, 24, coverage.index)]
+        return coverage.variants
+
+    def _add_variant(self, variant: PeakVariant) -> None:
+        index = variant.index
+        self.arrays["weekday_masks"].append(_weekday_mask(variant.weekdays))
+        self.arrays["hour_starts"].append(variant.hour_start)
+        self.arrays["hour_ends"].append(variant.hour_end)
+        for name, values in (
+            ("vol_bounds", index.vol_bounds),
+            ("dist_bounds", index.dist_bounds),
+            ("vol_limits", index.vol_limits),
+            ("dist_limits", index.dist_limits),
+            *index.amounts.items(),
+        ):
+            self.arrays[name].extend(values)
+        self.arrays["vol_offsets"].append(len(self.arrays["vol_bounds"]))
+        self.arrays["dist_offsets"].append(len(self.arrays["dist_bounds"]))
+        self.arrays["cell_offsets"].append(len(self.arrays["vol_limits"]))
+
+    def _write(self, path: str, created_at: datetime) -> int:
+        sections: dict[str, list] = {}
+        offset = 0
+        for name, values in self.arrays.items():
+            sections[name] = [values.typecode, offset, len(values)]
+            offset += -(-len(values) * values.itemsize // _ALIGN) * _ALIGN
+
+        header = json.dumps(
+            {
+                "version": _VERSION,
+                "byteorder": sys.byteorder,
+                "created_at": created_at.isoformat(),
+                "pricing_types": PricingTypes.list(),
+                "config_types": PricingImplementationTypes.list(),
+                "sections": sections,
+            }
+        ).encode()
+        start = len(_MAGIC) + _HEADER_LENGTH + len(header)
+        padding = -start % _ALIGN
+
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as file:
+            file.write(_MAGIC)
+            file.write(array("I", [len(header) + padding]).tobytes())
+            file.write(header + b" " * padding)
+            for values in self.arrays.values():
+                data = values.tobytes()
+                file.write(data)
+                file.write(b"\0" * (-len(data) % _ALIGN))
+            file.flush()
+            os.fsync(file.fileno())
+            size = file.tell()
+        os.replace(tmp_path, path)
+        return size
+
+    def export(self, path: str, now: Union[datetime, None] = None) -> SnapshotResp:
+        """
+        Writes the snapshot of the accounts and configs active at `now` (or later) to
+        `path`. The file is written next to the target and renamed over it, so readers
+        never see a partial snapshot.
+
+        :param path: file the snapshot is written to
+        :type path: str
+        :param now: configs and account windows ending before it are left out
+        :type now: datetime
+        :return: counts, size and duration of the export
+        """
+        start = perf_counter()
+        now = now if now is not None else datetime.now()
+        pricing_types = PricingTypes.list()
+        config_types = PricingImplementationTypes.list()
+
+        windows = self._accounts(now)
+        configs = self._configs(now)
+        grids = self._grids(now)
+
+        # Configs sharing a grid set share its compiled variants.
+        variants: dict[int, list[PeakVariant]] = {}
+        configs_by_account: dict[int, list] = {}
+        for config in configs:
+            configs_by_account.setdefault(config.account_id, []).append(config)
+
+        for name in ("window_offsets", "config_offsets", "variant_offsets"):
+            self.arrays[name].append(0)
+        for name in ("vol_offsets", "dist_offsets", "cell_offsets"):
+            self.arrays[name].append(0)
+
+        for account_id in sorted(windows.keys() | configs_by_account.keys()):
+            self.arrays["account_ids"].append(account_id)
+            for valid_from, valid_to in sorted(windows.get(account_id, [])):
+                self.arrays["window_from"].append(valid_from)
+                self.arrays["window_to"].append(valid_to)
+            self.arrays["window_offsets"].append(len(self.arrays["window_from"]))
+
+            for config in configs_by_account.get(account_id, []):
+                self.arrays["config_ids"].append(config.id)
+                self.arrays["config_from"].append(_micros(config.valid_from))
+                self.arrays["config_to"].append(_micros(config.valid_to))
+                self.arrays["pricing_types"].append(
+                    pricing_types.index(config.pricing_type)
+                )
+                self.arrays["config_types"].append(
+                    config_types.index(config.config_type)
+                )
+                columns = grids.get(config.grid_set_id)
+                if columns is not None:
+                    if config.grid_set_id not in variants:
+                        variants[config.grid_set_id] = self._compile(
+                            config.id, config.config_type, config.pricing_type, columns
+                        )
+                    for variant in variants[config.grid_set_id]:
+                        self._add_variant(variant)
+                self.arrays["variant_offsets"].append(len(self.arrays["weekday_masks"]))
+            self.arrays["config_offsets"].append(len(self.arrays["config_ids"]))
+
+        size = self._write(path, now)
+        resp = SnapshotResp(
+            path=path,
+            clients=len(self.arrays["client_ids"]),
+            accounts=len(self.arrays["account_ids"]),
+            configs=len(self.arrays["config_ids"]),
+            variants=len(self.arrays["weekday_masks"]),
+            cells=len(self.arrays["vol_limits"]),
+            size_bytes=size,
+            seconds=perf_counter() - start,
+        )
+        self.logger.info(LogMsg.snapshot_exported.value.format(**resp.model_dump()))
+        return resp
+
+
+class ConfigSnapshot:
+    """
+    Read-only view of a snapshot written by ConfigSnapshotWriter. Arrays are
+    `memoryview`s straight over the memory map, and the GridIndex of a variant wraps
+    slices of them, so loading is a header parse and nothing is copied per config.
+    """
+
+    path: str
+    created_at: datetime
+    pricing_types: list[str]
+    config_types: list[str]
+
+    def __init__(self, path: str, buffer: mmap.mmap) -> None:
+        self.path = path
+        self._mmap = buffer
+        self._indexes: dict[int, GridIndex] = {}
+
+        if buffer[: len(_MAGIC)] != _MAGIC:
+            raise SnapshotFormatError(path, "Missing snapshot magic bytes.")
+        start = len(_MAGIC)
+        header_length = memoryview(buffer)[start : start + _HEADER_LENGTH].cast("I")[0]
+        start += _HEADER_LENGTH
+        header = json.loads(bytes(buffer[start : start + header_length]))
+        if header["version"] != _VERSION or header["byteorder"] != sys.byteorder:
+            raise SnapshotFormatError(
+                path, f"Unsupported version or byte order: {header['version']}."
+            )
+
+        self.created_at = datetime.fromisoformat(header["created_at"])
+        self.pricing_types = header["pricing_types"]
+        self.config_types = header["config_types"]
+
+        data = memoryview(buffer)[start + header_length :]
+        self._views: dict[str, memoryview] = {}
+        for name, (typecode, offset, length) in header["sections"].items():
+            itemsize = array(typecode).itemsize
+            self._views[name] = data[offset : offset + length * itemsize].cast(typecode)
+
+    @classmethod
+    def load(cls, path: str) -> ConfigSnapshot:
+        with open(path, "rb") as file:
+            buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls(path, buffer)
+
+    def close(self) -> None:
+        self._indexes.clear()
+        for view in self._views.values():
+            view.release()
+        self._views.clear()
+        self._mmap.close()
+
+    def __len__(self) -> int:
+        return len(self._views["config_ids"])
+
+    def _account(self, account_id: int) -> int:
+        account_ids = self._views["account_ids"]
+        position = bisect_left(account_ids, account_id)
+        if position < len(account_ids) and account_ids[position] == account_id:
+            return position
+        return -1
+
+    def account_id(self, client_id: int, timestamp: datetime) -> Union[int, None]:
+        """Account of `client_id` with a window covering `timestamp`, if any."""
+        client_ids = self._views["client_ids"]
+        position = bisect_left(client_ids, client_id)
+        if position == len(client_ids) or client_ids[position] != client_id:
+            return None
+
+        account_id = self._views["client_accounts"][position]
+        account = self._account(account_id)
+        if account < 0:
+            return None
+        offsets = self._views["window_offsets"]
+        moment = _micros(timestamp)
+        for window in range(offsets[account], offsets[account + 1]):
+            if (
+                self._views["window_from"][window]
+                <= moment
+                < self._views["window_to"][window]
+            ):
+                return account_id
+        return None
+
+    def config(self, account_id: int, timestamp: datetime) -> int:
+        """
+        Row of the config of `account_id` active at `timestamp`, the one ending last
+        when several overlap, or -1.
+        """
+        account = self._account(account_id)
+        if account < 0:
+            return -1
+
+        offsets = self._views["config_offsets"]
+        moment = _micros(timestamp)
+        found, valid_to = -1, -1
+        for row in range(offsets[account], offsets[account + 1]):
+            if (
+                self._views["config_from"][row]
+                <= moment
+                < self._views["config_to"][row]
+                and self._views["config_to"][row] > valid_to
+            ):
+                found, valid_to = row, self._views["config_to"][row]
+        return found
+
+    def config_id(self, row: int) -> int:
+        return self._views["config_ids"][row]
+
+    def _index(self, variant: int) -> GridIndex:
+        index = self._indexes.get(variant)
+        if index is not None:
+            return index
+
+        vol_start, vol_end = self._views["vol_offsets"][variant : variant + 2]
+        dist_start, dist_end = self._views["dist_offsets"][variant : variant + 2]
+        cell_start, cell_end = self._views["cell_offsets"][variant : variant + 2]
+        index = GridIndex.from_buffers(
+            vol_bounds=self._views["vol_bounds"][vol_start:vol_end],
+            dist_bounds=self._views["dist_bounds"][dist_start:dist_end],
+            vol_limits=self._views["vol_limits"][cell_start:cell_end],
+            dist_limits=self._views["dist_limits"][cell_start:cell_end],
+            amounts={
+                field: self._views[field][cell_start:cell_end]
+                for field in GridAmountFields.list()
+            },
+        )
+        self._indexes[variant] = index
+        return index
+
+    def _variant(self, row: int, timestamp: datetime) -> int:
+        offsets = self._views["variant_offsets"]
+        weekday = 1 << timestamp.weekday()
+        for variant in range(offsets[row], offsets[row + 1]):
+            if (
+                self._views["weekday_masks"][variant] & weekday
+                and self._views["hour_starts"][variant]
+                <= timestamp.hour
+                < self._views["hour_ends"][variant]
+            ):
+                return variant
+        return -1
+
+    def price(self, price_req: PriceReq) -> Union[PriceResp, None]:
+        """
+        Prices a delivery from the snapshot alone: client -> account window -> active
+        config -> (weekdays, hours) variant -> (volume, distance) cell.
+
+        :param price_req: client ID, distance, volume and timestamp of the delivery
+        :type price_req: PriceReq
+        :return: the amounts of the matching grid, None if nothing matches
+        """
+        account_id = self.account_id(price_req.client_id, price_req.timestamp)
+        if account_id is None:
+            return None
+        row = self.config(account_id, price_req.timestamp)
+        if row < 0:
+            return None
+        variant = self._variant(row, price_req.timestamp)
+        if variant < 0:
+            return None
+
+        index = self._index(variant)
+        position = index.lookup(price_req.volume, price_req.distance)
+        if position is None:
+            return None
+        return index.price_resp(
+            position,
+            client_id=price_req.client_id,
+            account_id=account_id,
+            pricing_type=self.pricing_types[self._views["pricing_types"][row]],
+            config_type=self.config_types[self._views["config_types"][row]],
+            distance=price_req.distance,
+        )
+
+
+class SharedSnapshot:
+    """
+    Process-wide handle on the snapshot named by the `PRICING_SNAPSHOT` environment
+    variable. The coordinator replaces the file atomically, so `get` re-stats the path
+    at most every `check_s` seconds and swaps in a new map when the file changed.
+    Requests holding the previous snapshot keep using it until they finish.
+    """
+
+    path: Union[str, None]
+    check_s: float
+
+    def __init__(self, path: Union[str, None], check_s: float) -> None:
+        self.path = path
+        self.check_s = check_s
+        self._snapshot: Union[ConfigSnapshot, None] = None
+        self._stat: Union[tuple[int, int], None] = None
+        self._checked = -check_s
+        self._lock = Lock()
+
+    def get(self, logger: Logger) -> Union[ConfigSnapshot, None]:
+        if self.path is None or monotonic() - self._checked < self.check_s:
+            return self._snapshot
+
+        with self._lock:
+            if monotonic() - self._checked < self.check_s:
+                return self._snapshot
+            self._checked = monotonic()
+            try:
+                stat = os.stat(self.path)
+                if (stat.st_ino, stat.st_mtime_ns) != self._stat:
+                    self._snapshot = ConfigSnapshot.load(self.path)
+                    self._stat = (stat.st_ino, stat.st_mtime_ns)
+                    logger.info(
+                        LogMsg.snapshot_swapped.value.format(
+                            path=self.path, created_at=self._snapshot.created_at
+                        )
+                    )
+            except (OSError, ValueError, SnapshotFormatError) as err:
+                logger.warning(
+                    LogMsg.snapshot_failed.value.format(path=self.path, error=err)
+                )
+        return self._snapshot
+
+
+shared_snapshot = SharedSnapshot(
+    os.getenv(SnapshotSettings.path.value), Defaults.snapshot_check_s.value
+)
+
+
+class SnapshotCoordinator:
+    """
+    Keeps the snapshot in line with the database for a pool of pricing workers. Every
+    `poll_s` seconds it reads a cheap fingerprint of the config and account tables
+    and re-exports the snapshot when it changed; workers pick the new file up
+    through SharedSnapshot.
+    """
+
+    path: str
+    session_local: sessionmaker
+    logger: Logger
+    poll_s: float
+
+    def __init__(
+        self, path: str, session_local: sessionmaker, logger: Logger, poll_s: float
+    ) -> None:
+        self.path = path
+        self.session_local = session_local
+        self.logger = logger
+        self.poll_s = poll_s
+        self._fingerprint: Union[tuple, None] = None
+        self._stop = Event()
+
+    @staticmethod
+    def _fingerprint_of(db: Session) -> tuple:
+        """
+        A handful of aggregates, read in one statement without scanning the rows into
+        Python. Every config write inserts a config or bumps its version and
+        `updated_at` (pricing and config type, dates, grid set, soft delete), and
+        accounts only change by being inserted or soft deleted. Grid sets are never
+        changed, so new grids always come with a config write.
+        """
+        aggregates = (
+            func.count(ConfigTable.id),
+            func.max(ConfigTable.id),
+            func.max(ConfigTable.updated_at),
+            func.sum(ConfigTable.version),
+            func.count(AccountTable.id),
+            func.max(AccountTable.id),
+            func.max(AccountTable.deleted_at),
+        )
+        return tuple(
+            db.execute(
+                select(
+                    *(select(aggregate).scalar_subquery() for aggregate in aggregates)
+                )
+            ).one()
+        )
+
+    def refresh(self, force: bool = False) -> Union[SnapshotResp, None]:
+        """
+        Re-exports the snapshot if the tables changed since the last export.
+
+        :param force: export even if nothing changed
+        :type force: bool
+        :return: the export summary, None if the snapshot was current
+        """
+        with self.session_local() as db:
+            fingerprint = self._fingerprint_of(db)
+            if not force and fingerprint == self._fingerprint:
+                return None
+            if self._fingerprint is not None:
+                self.logger.info(LogMsg.snapshot_changed.value.format(path=self.path))
+            snapshot = ConfigSnapshotWriter(db, self.logger).export(self.path)
+        self._fingerprint = fingerprint
+        return snapshot
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.poll_s):
+            try:
+                self.refresh()
+            except Exception as err:
+                self.logger.error(err)
+
+    def start(self) -> Thread:
+        thread = Thread(target=self._run, name="snapshot-coordinator", daemon=True)
+        thread.start()
+        return thread
+
+    def stop(self) -> None:
+        self._stop.set()
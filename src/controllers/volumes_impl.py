@@ -1,50 +1,78 @@
 from datetime import datetime
 from logging import Logger
+from time import perf_counter
+from typing import AsyncIterator
 
 from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import func, select
 
-from __app_configs import LogMsg
+from __app_configs import Defaults, LogMsg
 from __exceptions import AccountNotFoundError, VolumesNotFoundError
-from database.main import db_dependency
-from database.models import VolumesTable
+from controllers.volumes import (
+    VolumeLineParser,
+    VolumeRollupController,
+    iter_lines,
+    period_bounds,
+)
+from database.main import async_db_dependency, db_dependency, upsert
+from database.models import VolumeRollupTable, VolumesTable
 from models.query_req import DatesReq
-from models.volume import AcctVolResp
+from models.volume import AcctVol, AcctVolResp, VolumeIngestResp
 
 
 class Getter:
     logger: Logger
-    db: db_dependency
+    db: async_db_dependency
 
-    def __init__(self, logger: Logger, db: db_dependency) -> None:
+    def __init__(self, logger: Logger, db: async_db_dependency) -> None:
         self.logger = logger
         self.db = db
 
-    def _get_total_vol(self, volumes: list[VolumesTable]) -> int:
-        return sum([vol.to_acct_vol().volume for vol in volumes])
-
-    def _get_start_date(self, volumes: list[VolumesTable]) -> datetime:
-        return min([vol.to_acct_vol().date for vol in volumes])
-
-    def _get_end_date(self, volumes: list[VolumesTable]) -> datetime:
-        return max([vol.to_acct_vol().date for vol in volumes])
-
-    def volumes_from_dates(self, id: int, dates_req: DatesReq) -> AcctVolResp:
-        daily_volumes = (
-            self.db.query(VolumesTable)
+    async def volumes_from_dates(self, id: int, dates_req: DatesReq) -> AcctVolResp:
+        result = await self.db.execute(
+            select(
+                func.sum(VolumesTable.volume),
+                func.min(VolumesTable.date),
+                func.max(VolumesTable.date),
+            )
             .filter(VolumesTable.account_id == id)
             .filter(VolumesTable.date >= dates_req.start)
             .filter(VolumesTable.date < dates_req.end)
-            .all()
         )
-        if len(daily_volumes) == 0:
+        total_vol, date_start, date_end = result.one()
+        if total_vol is None:
             raise VolumesNotFoundError(id, dates_req.to_str())
 
         return AcctVolResp(
             account_id=id,
-            total_vol=self._get_total_vol(daily_volumes),
-            date_start=self._get_start_date(daily_volumes),
-            date_end=self._get_end_date(daily_volumes),
+            total_vol=total_vol,
+            date_start=date_start,
+            date_end=date_end,
+        )
+
+    async def rolling_volume(
+        self, id: int, frequency: str, date: datetime
+    ) -> AcctVolResp:
+        """
+        Total volume of the account in the week or month containing `date`, read from
+        the maintained rollups with a single indexed lookup.
+        """
+        period_start, period_end = period_bounds(date, frequency)
+        result = await self.db.execute(
+            select(VolumeRollupTable)
+            .filter(VolumeRollupTable.account_id == id)
+            .filter(VolumeRollupTable.frequency == frequency)
+            .filter(VolumeRollupTable.period_start == period_start)
         )
+        rollup: VolumeRollupTable = result.scalars().first()
+        if rollup is None or rollup.volume <= 0:
+            raise VolumesNotFoundError(
+                id,
+                DatesReq(start=period_start, end=period_end).to_str(),
+            )
+
+        return rollup.to_acct_vol_resp()
 
 
 class Setter:
@@ -54,3 +82,133 @@ class Setter:
     def __init__(self, logger: Logger, db: db_dependency) -> None:
         self.logger = logger
         self.db = db
+
+    def _existing(self, volumes: dict[tuple[int, datetime], int]) -> dict:
+        # Locking read: a concurrent load of the same days waits for this one, so
+        # the deltas applied to the rollups are computed from the committed volumes.
+        rows = self.db.execute(
+            select(
+                VolumesTable.account_id,
+                VolumesTable.date,
+                VolumesTable.volume,
+            )
+            .filter(VolumesTable.account_id.in_({key[0] for key in volumes}))
+            .filter(VolumesTable.date.in_({key[1] for key in volumes}))
+            .with_for_update()
+        )
+        return {(account_id, date): volume for account_id, date, volume in rows}
+
+    def record_volumes(self, volumes: list[AcctVol]) -> int:
+        """
+        Writes daily volumes, replacing the volume of an existing (account_id, date), and
+        applies the changes to the weekly and monthly rollups in the same transaction.
+        The changed days are written with one upsert on the unique (account_id, date)
+        index, so overlapping or retried loads never duplicate a day. Later entries
+        win when the same (account_id, date) is sent more than once.
+
+        :param volumes: daily volumes to record
+        :type volumes: list[AcctVol]
+        :return: number of daily volumes written
+        """
+        requested: dict[tuple[int, datetime], int] = {
+            (vol.account_id, vol.date): vol.volume for vol in volumes
+        }
+        if len(requested) == 0:
+            return 0
+
+        existing = self._existing(requested)
+        rows: list[dict] = []
+        deltas: list[tuple[int, datetime, int]] = []
+        for (account_id, date), volume in requested.items():
+            old_volume = existing.get((account_id, date), 0)
+            if (account_id, date) in existing and old_volume == volume:
+                continue
+            rows.append({"account_id": account_id, "date": date, "volume": volume})
+            deltas.append((account_id, date, volume - old_volume))
+
+        if len(rows) > 0:
+            self.db.execute(
+                upsert(
+                    self.db,
+                    VolumesTable,
+                    [VolumesTable.account_id, VolumesTable.date],
+                    lambda row: {VolumesTable.volume.name: row.volume},
+                ),
+                rows,
+            )
+        rollups = VolumeRollupController(self.db, self.logger).apply(deltas)
+        self.db.commit()
+
+        self.logger.info(
+            LogMsg.volumes_recorded.value.format(
+                rows=len(requested),
+                inserted=len(requested.keys() - existing.keys()),
+                accounts=len({key[0] for key in requested}),
+                rollups=rollups,
+            )
+        )
+        return len(requested)
+
+    def _report(self, rows: int, chunks: int, start: float) -> VolumeIngestResp:
+        seconds = perf_counter() - start
+        report = VolumeIngestResp(
+            rows=rows,
+            chunks=chunks,
+            seconds=round(seconds, 3),
+            rows_per_s=round(rows / seconds if seconds > 0 else 0, 1),
+        )
+        self.logger.info(LogMsg.volumes_ingested.value.format(**report.model_dump()))
+        return report
+
+    def ingest(self, volumes: list[AcctVol]) -> VolumeIngestResp:
+        """
+        Records daily volumes in chunks of `Defaults.volume_chunk`, committing each
+        chunk with its rollups, and reports the throughput.
+
+        :param volumes: daily volumes to record
+        :type volumes: list[AcctVol]
+        :return: rows, chunks, seconds and rows per second of the load
+        """
+        start = perf_counter()
+        rows = 0
+        chunks = 0
+        for chunk_start in range(0, len(volumes), Defaults.volume_chunk.value):
+            chunk_end = chunk_start + Defaults.volume_chunk.value
+            rows += self.record_volumes(volumes[chunk_start:chunk_end])
+            chunks += 1
+        return self._report(rows, chunks, start)
+
+    async def ingest_stream(
+        self, body: AsyncIterator[bytes], media_type: str
+    ) -> VolumeIngestResp:
+        """
+        Streaming variant of `ingest` for CSV and NDJSON uploads. Lines are parsed as
+        they arrive and at most one chunk is held in memory; chunks are written in the
+        threadpool so the event loop keeps serving requests. Chunks before an invalid
+        line stay committed, and since rows are upserted the upload can be resent.
+
+        :param body: request body chunks
+        :type body: AsyncIterator[bytes]
+        :param media_type: `MediaTypes.csv` or `MediaTypes.ndjson`
+        :type media_type: str
+        :return: rows, chunks, seconds and rows per second of the load
+        """
+        start = perf_counter()
+        parser = VolumeLineParser(media_type)
+        rows = 0
+        chunks = 0
+        chunk: list[AcctVol] = []
+        async for line in iter_lines(body):
+            volume = parser.parse(line)
+            if volume is None:
+                continue
+            chunk.append(volume)
+            if len(chunk) == Defaults.volume_chunk.value:
+                rows += await run_in_threadpool(self.record_volumes, chunk)
+                chunks += 1
+                chunk = []
+
+        if len(chunk) > 0:
+            rows += await run_in_threadpool(self.record_volumes, chunk)
+            chunks += 1
+        return self._report(rows, chunks, start)
@@ -0,0 +1,338 @@
+from datetime import datetime
+from logging import Logger
+
+from sqlalchemy import (
+    Column,
+    Index,
+    Integer,
+    MetaData,
+    Table,
+    delete,
+    func,
+    inspect,
+    select,
+    text,
+    update,
+)
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+import database.models  # noqa: F401  registers the tables on Base.metadata
+from __app_configs import DbTables, Defaults, GridFields, LogMsg
+from controllers.grids import GridSetController
+from controllers.volumes import VolumeRollupController
+from database.main import Base, engine
+from database.models import (
+    ConfigTable,
+    DiscountGridTable,
+    PeakGridTable,
+    VolumeGridTable,
+    VolumeRollupTable,
+    VolumesTable,
+)
+from utils.logger import logger
+
+
+def create_missing_indexes(bind: Engine, logger: Logger) -> list[str]:
+    """
+    `Base.metadata.create_all` only creates missing tables, so indexes declared on tables
+    that already exist are never added. This creates every declared index the database
+    does not have yet, and is safe to run on every start.
+
+    :param bind: engine of the database to migrate
+    :type bind: Engine
+    :return: names of the created indexes
+    """
+    inspector = inspect(bind)
+    created: list[str] = []
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+
+        existing = {index["name"] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name in existing:
+                continue
+            index.create(bind)
+            logger.info(
+                LogMsg.index_created.value.format(index=index.name, table=table.name)
+            )
+            created.append(index.name)
+
+    return created
+
+
+# Indexes replaced by a differently declared one, e.g. made unique, by table.
+_SUPERSEDED_INDEXES = {DbTables.volumes.value: ("ix_volumes_account_date",)}
+
+
+def drop_superseded_indexes(bind: Engine, logger: Logger) -> list[str]:
+    """
+    Drops the indexes in `_SUPERSEDED_INDEXES` that the database still has. Safe to
+    run on every start.
+
+    :param bind: engine of the database to migrate
+    :type bind: Engine
+    :return: names of the dropped indexes
+    """
+    inspector = inspect(bind)
+    dropped: list[str] = []
+    for table_name, index_names in _SUPERSEDED_INDEXES.items():
+        if not inspector.has_table(table_name):
+            continue
+
+        existing = {index["name"] for index in inspector.get_indexes(table_name)}
+        for index_name in index_names:
+            if index_name not in existing:
+                continue
+            # Declared on a detached copy of the table, so the metadata, which
+            # `create_missing_indexes` reads, never holds the old index.
+            table = Table(table_name, MetaData(), Column("id", Integer))
+            Index(index_name, table.c.id).drop(bind)
+            logger.info(
+                LogMsg.index_dropped.value.format(index=index_name, table=table_name)
+            )
+            dropped.append(index_name)
+
+    return dropped
+
+
+def remove_duplicate_volumes(bind: Engine, logger: Logger) -> int:
+    """
+    Daily volumes used to be written without a unique (account_id, date) index, so
+    overlapping loads could store a day twice. This keeps the last written row of
+    every account day, deletes the others and takes their volume off the rollups, so
+    the unique index can be created. Safe to run on every start.
+
+    :param bind: engine of the database to migrate
+    :type bind: Engine
+    :return: number of deleted daily volumes
+    """
+    if not inspect(bind).has_table(VolumesTable.__tablename__):
+        return 0
+
+    with Session(bind) as db:
+        duplicated = (
+            select(VolumesTable.account_id, VolumesTable.date)
+            .group_by(VolumesTable.account_id, VolumesTable.date)
+            .having(func.count(VolumesTable.id) > 1)
+            .subquery()
+        )
+        rows = db.execute(
+            select(
+                VolumesTable.id,
+                VolumesTable.account_id,
+                VolumesTable.date,
+                VolumesTable.volume,
+            )
+            .join(
+                duplicated,
+                (VolumesTable.account_id == duplicated.c.account_id)
+                & (VolumesTable.date == duplicated.c.date),
+            )
+            .order_by(VolumesTable.id.desc())
+        ).all()
+        if len(rows) == 0:
+            return 0
+
+        kept: set[tuple[int, datetime]] = set()
+        deleted: list[int] = []
+        deltas: list[tuple[int, datetime, int]] = []
+        for id, account_id, date, volume in rows:
+            if (account_id, date) not in kept:
+                kept.add((account_id, date))
+                continue
+            deleted.append(id)
+            deltas.append((account_id, date, -(volume or 0)))
+
+        db.execute(delete(VolumesTable).filter(VolumesTable.id.in_(deleted)))
+        # An empty rollup table is built from the remaining days by
+        # `backfill_volume_rollups` instead.
+        rollups = 0
+        if db.execute(select(func.count(VolumeRollupTable.id))).scalar() > 0:
+            rollups = VolumeRollupController(db, logger).apply(deltas)
+        db.commit()
+
+    logger.info(
+        LogMsg.volume_duplicates_removed.value.format(
+            rows=len(deleted), days=len(kept), rollups=rollups
+        )
+    )
+    return len(deleted)
+
+
+def add_missing_columns(bind: Engine, logger: Logger) -> list[str]:
+    """
+    Adds the columns declared on existing tables that the database does not have yet,
+    e.g. `configs.version`. New columns get their server default, so existing rows are
+    filled in by the ALTER itself. Safe to run on every start.
+
+    :param bind: engine of the database to migrate
+    :type bind: Engine
+    :return: names of the added columns, as `table.column`
+    """
+    inspector = inspect(bind)
+    preparer = bind.dialect.identifier_preparer
+    added: list[str] = []
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            ddl = (
+                f"ALTER TABLE {preparer.format_table(table)} "
+                f"ADD COLUMN {preparer.format_column(column)} "
+                f"{column.type.compile(dialect=bind.dialect)}"
+            )
+            if column.server_default is not None:
+                ddl += f" DEFAULT {column.server_default.arg}"
+            if not column.nullable:
+                ddl += " NOT NULL"
+            with bind.begin() as connection:
+                connection.execute(text(ddl))
+            logger.info(
+                LogMsg.column_added.value.format(column=column.name, table=table.name)
+            )
+            added.append(f"{table.name}.{column.name}")
+
+    return added
+
+
+def backfill_volume_rollups(bind: Engine, logger: Logger) -> int:
+    """
+    Builds the weekly and monthly volume rollups from the daily volumes when the rollup
+    table is still empty, e.g. right after it was added to an existing database.
+
+    :param bind: engine of the database to migrate
+    :type bind: Engine
+    :return: number of rollups created
+    """
+    with Session(bind) as db:
+        if db.execute(select(func.count(VolumeRollupTable.id))).scalar() > 0:
+            return 0
+
+        rollups = 0
+        rows = 0
+        controller = VolumeRollupController(db, logger)
+        volumes = db.execute(
+            select(VolumesTable.account_id, VolumesTable.date, VolumesTable.volume)
+            .order_by(VolumesTable.account_id, VolumesTable.date)
+            .execution_options(yield_per=Defaults.volume_chunk.value)
+        )
+        for chunk in volumes.partitions():
+            rollups += controller.apply([tuple(row) for row in chunk])
+            rows += len(chunk)
+        db.commit()
+
+    if rows > 0:
+        logger.info(
+            LogMsg.volume_rollups_backfilled.value.format(rollups=rollups, rows=rows)
+        )
+    return rollups
+
+
+def backfill_grid_sets(bind: Engine, logger: Logger) -> int:
+    """
+    Moves the grids still stored per config, i.e. written before grid sets, into
+    content-addressed grid sets: configs with the same grids end up referencing one
+    set and their own copies are deleted. Configs are migrated in chunks of
+    `Defaults.grid_set_backfill_chunk`, each committed on its own, so the backfill
+    resumes where it stopped. Safe to run on every start.
+
+    :param bind: engine of the database to migrate
+    :type bind: Engine
+    :return: number of configs moved to a grid set
+    """
+    keys = (
+        GridFields.id.value,
+        GridFields.config_id.value,
+        GridFields.grid_set_id.value,
+    )
+    configs = 0
+    grid_sets: set[int] = set()
+    rows = 0
+    with Session(bind) as db:
+        controller = GridSetController(db, logger)
+        for table in (VolumeGridTable, PeakGridTable, DiscountGridTable):
+            fields = [
+                column.name
+                for column in table.__table__.columns
+                if column.name not in keys
+            ]
+            while True:
+                config_ids = (
+                    db.execute(
+                        select(table.config_id)
+                        .filter(table.config_id.is_not(None))
+                        .filter(table.grid_set_id.is_(None))
+                        .group_by(table.config_id)
+                        .order_by(table.config_id)
+                        .limit(Defaults.grid_set_backfill_chunk.value)
+                    )
+                    .scalars()
+                    .all()
+                )
+                if len(config_ids) == 0:
+                    break
+
+                grids: dict[int, list[dict]] = {}
+                for config_id, *values in db.execute(
+                    select(
+                        table.config_id, *(getattr(table, field) for field in fields)
+                    )
+                    .filter(table.config_id.in_(config_ids))
+                    .filter(table.grid_set_id.is_(None))
+                    .order_by(table.id)
+                ):
+                    grids.setdefault(config_id, []).append(dict(zip(fields, values)))
+
+                for config_id, config_grids in grids.items():
+                    grid_set_id = controller.get_or_create(table, config_grids)
+                    db.execute(
+                        update(ConfigTable)
+                        .filter(ConfigTable.id == config_id)
+                        .values(grid_set_id=grid_set_id)
+                    )
+                    grid_sets.add(grid_set_id)
+                    rows += len(config_grids)
+                db.execute(
+                    delete(table)
+                    .filter(table.config_id.in_(config_ids))
+                    .filter(table.grid_set_id.is_(None))
+                )
+                db.commit()
+                configs += len(config_ids)
+
+    if configs > 0:
+        logger.info(
+            LogMsg.grid_sets_backfilled.value.format(
+                configs=configs, grid_sets=len(grid_sets), rows=rows
+            )
+        )
+    return configs
+
+
+def migrate(bind: Engine, logger: Logger) -> None:
+    """
+    Brings the database up to the declared schema and backfills the derived tables.
+    Runs once per deploy, before the service processes start (`python -m
+    database.migrations`, or the `server.workers` parent), never from the app import:
+    the DDL and backfills must not run concurrently in every worker.
+
+    :param bind: engine of the database to migrate
+    :type bind: Engine
+    """
+    Base.metadata.create_all(bind=bind)
+    add_missing_columns(bind, logger)
+    remove_duplicate_volumes(bind, logger)
+    drop_superseded_indexes(bind, logger)
+    create_missing_indexes(bind, logger)
+    backfill_volume_rollups(bind, logger)
+    backfill_grid_sets(bind, logger)
+
+
+if __name__ == "__main__":
+    migrate(engine, logger)
@@ -1,11 +1,22 @@
-from sqlalchemy import Column, DateTime, Float, ForeignKey, Integer, Sequence, String
+from datetime import datetime
 
-from __app_configs import DbSequences, DbTables, Deliminator
+from sqlalchemy import (
+    Column,
+    DateTime,
+    Float,
+    ForeignKey,
+    Index,
+    Integer,
+    Sequence,
+    String,
+)
+
+from __app_configs import DbIndexes, DbSequences, DbTables, Deliminator
 from database.main import Base
 from models.account import Account
 from models.configs import BaseConfigResp
 from models.grids import DiscountGrid, PeakOffPeakGrid, VolumeGrid
-from models.volume import AcctVol
+from models.volume import AcctVol, AcctVolResp
 
 
 class ConfigTable(Base):
@@ -24,6 +35,20 @@ class ConfigTable(Base):
     transport_option = Column(String(255))
     frequency = Column(String(55))
     deleted_at = Column(DateTime)
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+    updated_at = Column(DateTime, default=datetime.now)
+    grid_set_id = Column(Integer, ForeignKey(DbTables.grid_set_fk.value))
+
+    __table_args__ = (
+        Index(
+            DbIndexes.configs_account_dates.value,
+            account_id,
+            deleted_at,
+            valid_to,
+            valid_from,
+        ),
+        Index(DbIndexes.configs_grid_set.value, grid_set_id),
+    )
 
     def to_config(self) -> BaseConfigResp:
         package_size_option: str = self.package_size_option
@@ -43,6 +68,20 @@ class ConfigTable(Base):
         )
 
 
+class GridSetTable(Base):
+    __tablename__ = DbTables.grid_sets.value
+
+    id = Column(
+        Integer, Sequence(DbSequences.grid_set.value), primary_key=True, index=True
+    )
+    content_hash = Column(String(64), nullable=False)
+    grid_table = Column(String(55))
+    grids = Column(Integer)
+    created_at = Column(DateTime, default=datetime.now)
+
+    __table_args__ = (Index(DbIndexes.grid_sets_hash.value, content_hash, unique=True),)
+
+
 class PeakGridTable(Base):
     __tablename__ = DbTables.peak_grids.value
 
@@ -60,6 +99,12 @@ class PeakGridTable(Base):
     pickup_amount = Column(Integer)
     distance_amount_per_unit = Column(Integer)
     dropoff_amount = Column(Integer)
+    grid_set_id = Column(Integer, ForeignKey(DbTables.grid_set_fk.value))
+
+    __table_args__ = (
+        Index(DbIndexes.peak_grids_config.value, config_id),
+        Index(DbIndexes.peak_grids_set.value, grid_set_id),
+    )
 
     def to_grid(self) -> PeakOffPeakGrid:
         weekday_option: str = self.weekday_option
@@ -94,6 +139,12 @@ class VolumeGridTable(Base):
     pickup_amount = Column(Integer)
     distance_amount_per_unit = Column(Integer)
     dropoff_amount = Column(Integer)
+    grid_set_id = Column(Integer, ForeignKey(DbTables.grid_set_fk.value))
+
+    __table_args__ = (
+        Index(DbIndexes.volume_grids_config.value, config_id),
+        Index(DbIndexes.volume_grids_set.value, grid_set_id),
+    )
 
     def to_grid(self) -> VolumeGrid:
         return VolumeGrid(
@@ -119,6 +170,12 @@ class DiscountGridTable(Base):
     min_distance_in_unit = Column(Float)
     max_distance_in_unit = Column(Float)
     discount_amount = Column(Integer)
+    grid_set_id = Column(Integer, ForeignKey(DbTables.grid_set_fk.value))
+
+    __table_args__ = (
+        Index(DbIndexes.discount_grids_config.value, config_id),
+        Index(DbIndexes.discount_grids_set.value, grid_set_id),
+    )
 
     def to_grid(self) -> DiscountGrid:
         return DiscountGrid(
@@ -143,6 +200,12 @@ class AccountTable(Base):
     valid_to = Column(DateTime)
     deleted_at = Column(DateTime)
 
+    __table_args__ = (
+        Index(DbIndexes.accounts_client_dates.value, client_id, deleted_at, valid_to),
+        Index(DbIndexes.accounts_account_dates.value, account_id, deleted_at, valid_to),
+        Index(DbIndexes.accounts_deleted_at.value, deleted_at),
+    )
+
     def to_account(self) -> Account:
         return Account(
             account_id=self.account_id,
@@ -163,6 +226,9 @@ class AccountSequenceTable(Base):
         primary_key=True,
         index=True,
     )
+    block = Column(String(32))
+
+    __table_args__ = (Index(DbIndexes.accounts_sequence_block.value, block),)
 
 
 class VolumesTable(Base):
@@ -178,5 +244,43 @@ class VolumesTable(Base):
     date = Column(DateTime)
     volume = Column(Integer)
 
+    __table_args__ = (
+        Index(DbIndexes.volumes_account_date.value, account_id, date, unique=True),
+    )
+
     def to_acct_vol(self) -> AcctVol:
         return AcctVol(account_id=self.account_id, date=self.date, volume=self.volume)
+
+
+class VolumeRollupTable(Base):
+    __tablename__ = DbTables.volume_rollups.value
+
+    id = Column(
+        Integer,
+        Sequence(DbSequences.volume_rollup.value),
+        primary_key=True,
+        index=True,
+    )
+    account_id = Column(Integer, ForeignKey(DbTables.account_fk.value))
+    frequency = Column(String(55))
+    period_start = Column(DateTime)
+    period_end = Column(DateTime)
+    volume = Column(Integer)
+
+    __table_args__ = (
+        Index(
+            DbIndexes.volume_rollups_period.value,
+            account_id,
+            frequency,
+            period_start,
+            unique=True,
+        ),
+    )
+
+    def to_acct_vol_resp(self) -> AcctVolResp:
+        return AcctVolResp(
+            account_id=self.account_id,
+            total_vol=self.volume,
+            date_start=self.period_start,
+            date_end=self.period_end,
+        )
@@ -62,3 +62,15 @@ class AccountResp(BaseModel):
         if valid_to is not None and valid_to < valid_from:
             raise DatesError(valid_from=valid_from, valid_to=valid_to)
         return values
+
+
+class AccountBulkResult(BaseModel):
+    client_ids: list[int]
+    account_id: Union[int, None] = Field(default=None)
+    error: Union[str, None] = Field(default=None)
+
+
+class AccountBulkResp(BaseModel):
+    created: int = Field(ge=0, default=0)
+    failed: int = Field(ge=0, default=0)
+    results: list[AccountBulkResult]
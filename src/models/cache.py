@@ -0,0 +1,17 @@
+from typing import Union
+
+from pydantic import BaseModel, Field
+
+
+class CacheStats(BaseModel):
+    name: str
+    size: int = Field(ge=0, default=0)
+    max_size: int = Field(gt=0)
+    ttl: Union[float, None] = Field(default=None)
+    hits: int = Field(ge=0, default=0)
+    misses: int = Field(ge=0, default=0)
+    evictions: int = Field(ge=0, default=0)
+    expirations: int = Field(ge=0, default=0)
+    invalidations: int = Field(ge=0, default=0)
+    bytes: int = Field(ge=0, default=0)
+    max_bytes: Union[int, None] = Field(default=None)
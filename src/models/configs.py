@@ -3,7 +3,7 @@ from __future__ import annotations
 from datetime import datetime, timedelta
 from typing import Union
 
-from pydantic import BaseModel, Field, model_validator
+from pydantic import BaseModel, Field, SkipValidation, model_validator
 
 from __app_configs import (
     BaseConfigFields,
@@ -151,7 +151,10 @@ class ConfigReq(BaseConfig):
 
 
 class Config(BaseConfig):
-    grids: Union[list[VolumeGrid], list[PeakOffPeakGrid], list[DiscountGrid]]
+    # Built and validated by `validate_grids`, not re-validated against the Union.
+    grids: SkipValidation[
+        Union[list[VolumeGrid], list[PeakOffPeakGrid], list[DiscountGrid]]
+    ]
 
     @model_validator(mode="before")
     def validate_grids(cls, values: dict):
@@ -177,18 +180,20 @@ class Config(BaseConfig):
         return validates_grids
 
     @staticmethod
-    def _convert_grids(
+    def _grid_fields(grid: Union[dict, BaseModel]) -> dict:
+        return grid.model_dump() if isinstance(grid, BaseModel) else grid
+
+    @staticmethod
+    def _grid_type(
         values: dict,
-    ) -> Union[list[DiscountGrid, VolumeGrid, PeakOffPeakGrid]]:
+    ) -> Union[type[VolumeGrid], type[PeakOffPeakGrid], type[DiscountGrid], None]:
         if (
             values.get(BaseConfigFields.config_type.value)
             == PricingImplementationTypes.fee.value
             and values.get(BaseConfigFields.pricing_type.value)
             == PricingTypes.peak.value
         ):
-            return [
-                PeakOffPeakGrid(**grid) for grid in values.get(ConfigField.grids.value)
-            ]
+            return PeakOffPeakGrid
 
         elif (
             values.get(BaseConfigFields.config_type.value)
@@ -196,16 +201,27 @@ class Config(BaseConfig):
             and values.get(BaseConfigFields.pricing_type.value)
             == PricingTypes.volume.value
         ):
-            return [VolumeGrid(**grid) for grid in values.get(ConfigField.grids.value)]
+            return VolumeGrid
         elif (
             values.get(BaseConfigFields.config_type.value)
             == PricingImplementationTypes.discount.value
             and values.get(BaseConfigFields.pricing_type.value)
             == PricingTypes.volume.value
         ):
-            return [
-                DiscountGrid(**grid) for grid in values.get(ConfigField.grids.value)
-            ]
+            return DiscountGrid
+
+    @staticmethod
+    def _convert_grids(
+        values: dict,
+    ) -> Union[list[DiscountGrid, VolumeGrid, PeakOffPeakGrid]]:
+        grid_type = Config._grid_type(values)
+        if grid_type is None:
+            return None
+
+        return [
+            grid_type(**Config._grid_fields(grid))
+            for grid in values.get(ConfigField.grids.value)
+        ]
 
 
 class ConfigResp(BaseConfigResp):
@@ -214,3 +230,27 @@ class ConfigResp(BaseConfigResp):
 
 class ConfigGridReq(ConfigReq):
     grids: Union[list[VolumeGridReq], list[PeakGridReq], list[DiscountGridReq]]
+
+
+class ConfigRolloutReq(BaseModel):
+    """
+    One config pushed to many targets: client IDs for an individual config, account
+    IDs for a group config, as in `POST /configs/individual/{id}` and `/group/{id}`.
+    """
+
+    config: Config
+    ids: list[int] = Field(min_length=1)
+
+
+class ConfigRolloutResult(BaseModel):
+    id: int
+    account_id: Union[int, None] = Field(default=None)
+    config_id: Union[int, None] = Field(default=None)
+    error: Union[str, None] = Field(default=None)
+
+
+class ConfigRolloutResp(BaseModel):
+    created: int = Field(ge=0, default=0)
+    expired: int = Field(ge=0, default=0)
+    failed: int = Field(ge=0, default=0)
+    results: list[ConfigRolloutResult]
@@ -2,6 +2,7 @@ from __future__ import annotations
 
 from typing import Union
 
+import numpy as np
 from pydantic import BaseModel, Field, model_validator
 
 from __app_configs import Defaults
@@ -127,3 +128,122 @@ class PeakGridReq(PeakOffPeakGrid):
             raise HoursError()
 
         return values
+
+
+class GridColumns:
+    """
+    Columnar view of a grid set, used to validate and persist large configs in one
+    pass instead of one pydantic model per grid. Every field is pulled into a list once and checked
+    with vectorized comparisons covering the same rules as the grid models' fields and
+    validators. `is_valid` reports instead of raising: callers fall back to the
+    per-grid models to raise the usual error for the offending grid.
+    """
+
+    _nullable = ("max_volume_threshold", "max_distance_in_unit")
+    _floats = ("min_distance_in_unit", "max_distance_in_unit")
+    _weekdays = "weekday_option"
+
+    grid_type: type[Grid]
+    columns: dict[str, list]
+
+    def __init__(self, grid_type: type[Grid], columns: dict[str, list]) -> None:
+        self.grid_type = grid_type
+        self.columns = columns
+
+    @classmethod
+    def from_grids(
+        cls, grids: list[Union[dict, Grid]], grid_type: type[Grid]
+    ) -> GridColumns:
+        grids = [grid if isinstance(grid, dict) else grid.__dict__ for grid in grids]
+        columns: dict[str, list] = {}
+        for field, info in grid_type.model_fields.items():
+            default = None if info.is_required() else info.default
+            columns[field] = [grid.get(field, default) for grid in grids]
+        return cls(grid_type, columns)
+
+    def __len__(self) -> int:
+        return len(self.columns["min_volume_threshold"])
+
+    def _column(self, field: str) -> Union[np.ndarray, None]:
+        try:
+            column = np.asarray(self.columns[field], dtype=np.float64)
+        except (TypeError, ValueError):
+            return None
+        if column.ndim != 1 or np.isinf(column).any():
+            return None
+        if field not in self._nullable and np.isnan(column).any():
+            return None
+        if field not in self._floats and not np.array_equal(
+            column, np.trunc(column), equal_nan=True
+        ):
+            return None
+        return column
+
+    def _weekday_masks(self) -> Union[list[int], None]:
+        masks: list[int] = []
+        for days in self.columns[self._weekdays]:
+            if not isinstance(days, list):
+                return None
+            mask = 0
+            for day in days:
+                if type(day) is not int or not 0 <= day < 7:
+                    return None
+                mask |= 1 << day
+            masks.append(mask)
+        return masks
+
+    def _normalize(self, arrays: dict[str, np.ndarray]) -> None:
+        for field, column in arrays.items():
+            nulls = np.isnan(column)
+            if field not in self._floats:
+                column = np.where(nulls, 0, column).astype(np.int64)
+            values = column.tolist()
+            if field in self._nullable:
+                values = [None if null else value for null, value in zip(nulls, values)]
+            self.columns[field] = values
+
+    def is_valid(self) -> bool:
+        """
+        Checks every grid and normalizes the columns to int / float / None. Volume
+        thresholds must be positive integers with max > min, distances non-negative
+        with max > min, fee amounts non-negative, discounts negative, peak hours in
+        [0, 24) / (0, 24] with start < end and weekdays in [0, 6].
+        """
+        arrays: dict[str, np.ndarray] = {}
+        for field in self.columns:
+            if field == self._weekdays:
+                continue
+            column = self._column(field)
+            if column is None:
+                return False
+            arrays[field] = column
+
+        min_vol = arrays["min_volume_threshold"]
+        max_vol = arrays["max_volume_threshold"]
+        min_dist = arrays["min_distance_in_unit"]
+        max_dist = arrays["max_distance_in_unit"]
+        invalid = (min_vol <= 0) | (min_dist < 0) | (max_vol <= min_vol)
+        invalid |= max_dist <= min_dist
+
+        for field in ("pickup_amount", "distance_amount_per_unit", "dropoff_amount"):
+            if field in arrays:
+                invalid |= arrays[field] < 0
+        if "discount_amount" in arrays:
+            invalid |= arrays["discount_amount"] >= 0
+
+        if self._weekdays in self.columns:
+            hour_start = arrays["hour_start"]
+            hour_end = arrays["hour_end"]
+            invalid |= (hour_start < 0) | (hour_end > 24) | (hour_start >= hour_end)
+            if self._weekday_masks() is None:
+                return False
+
+        if invalid.any():
+            return False
+
+        self._normalize(arrays)
+        return True
+
+    def rows(self) -> list[dict]:
+        fields = list(self.columns)
+        return [dict(zip(fields, values)) for values in zip(*self.columns.values())]
@@ -0,0 +1,61 @@
+from datetime import datetime
+from typing import Union
+
+from pydantic import BaseModel, Field, field_validator
+
+from models.delivery import Delivery
+
+
+def to_naive(timestamp: datetime) -> datetime:
+    """
+    Converts a timezone-aware timestamp to naive local time, as the account and config
+    datetimes it is compared with are naive. Naive timestamps are returned as is.
+    """
+    if timestamp.tzinfo is None:
+        return timestamp
+    return timestamp.astimezone().replace(tzinfo=None)
+
+
+class PriceReq(BaseModel):
+    client_id: int = Field(gt=0)
+    distance: float = Field(ge=0)
+    volume: int = Field(gt=0, default=1)
+    timestamp: datetime = Field(default_factory=datetime.now)
+
+    @field_validator("timestamp")
+    def validate_timestamp(cls, timestamp: datetime) -> datetime:
+        return to_naive(timestamp)
+
+
+class PriceResp(BaseModel):
+    client_id: int = Field(gt=0)
+    account_id: int = Field(gt=0)
+    pricing_type: str
+    config_type: str
+    pickup_amount: int = Field(default=0)
+    distance_amount: float = Field(default=0)
+    dropoff_amount: int = Field(default=0)
+    discount_amount: int = Field(default=0)
+
+
+class DeliveryPriceReq(Delivery):
+    distance: float = Field(ge=0)
+    volume: int = Field(gt=0, default=1)
+    created_at: datetime = Field(default_factory=datetime.now)
+
+    @field_validator("created_at")
+    def validate_created_at(cls, created_at: datetime) -> datetime:
+        return to_naive(created_at)
+
+
+class DeliveryPriceResp(BaseModel):
+    id: int
+    client_id: int
+    account_id: Union[int, None] = Field(default=None)
+    pricing_type: Union[str, None] = Field(default=None)
+    config_type: Union[str, None] = Field(default=None)
+    pickup_amount: int = Field(default=0)
+    distance_amount: float = Field(default=0)
+    dropoff_amount: int = Field(default=0)
+    discount_amount: int = Field(default=0)
+    error: Union[str, None] = Field(default=None)
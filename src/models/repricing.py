@@ -0,0 +1,16 @@
+from datetime import datetime
+
+from pydantic import BaseModel, Field
+
+
+class RepricingResp(BaseModel):
+    input_path: str
+    output_path: str
+    start: datetime
+    end: datetime
+    chunks: int = Field(ge=0, default=0)
+    deliveries: int = Field(ge=0, default=0)
+    skipped: int = Field(ge=0, default=0)
+    missing: int = Field(ge=0, default=0)
+    configs: int = Field(ge=0, default=0)
+    seconds: float = Field(ge=0, default=0)
@@ -0,0 +1,12 @@
+from pydantic import BaseModel, Field
+
+
+class SnapshotResp(BaseModel):
+    path: str
+    clients: int = Field(ge=0, default=0)
+    accounts: int = Field(ge=0, default=0)
+    configs: int = Field(ge=0, default=0)
+    variants: int = Field(ge=0, default=0)
+    cells: int = Field(ge=0, default=0)
+    size_bytes: int = Field(ge=0, default=0)
+    seconds: float = Field(ge=0, default=0)
@@ -11,6 +11,19 @@ class AcctVol(BaseModel):
     volume: int = Field(gt=0, default=0)
 
 
+class AcctVolReq(AcctVol):
+    account_id: int = Field(gt=0)
+    date: datetime
+    volume: int = Field(gt=0)
+
+
+class VolumeIngestResp(BaseModel):
+    rows: int = Field(ge=0, default=0)
+    chunks: int = Field(ge=0, default=0)
+    seconds: float = Field(ge=0, default=0)
+    rows_per_s: float = Field(ge=0, default=0)
+
+
 class AcctVolResp(BaseModel):
     account_id: int = Field(gt=0, default=1)
     total_vol: int = Field(gt=0, default=0)
@@ -2,8 +2,8 @@ from fastapi import APIRouter, Path, status
 
 from __app_configs import Paths
 from controllers.account import AccountDeleteController
-from controllers.account_impl import Getter, Setter
-from database.main import db_dependency
+from controllers.account_impl import BulkSetter, Getter, Setter
+from database.main import async_db_dependency, db_dependency
 from models.account import AccountBaseReq
 from utils.logger import logger
 
@@ -11,25 +11,25 @@ router = APIRouter(prefix=Paths.accounts.value, tags=[Paths.account_tag.value])
 
 
 @router.get(Paths.all_acct_by_client.value + "{id}", status_code=status.HTTP_200_OK)
-async def get_all_accounts_by_client_id(db: db_dependency, id: int = Path(gt=0)):
+async def get_all_accounts_by_client_id(db: async_db_dependency, id: int = Path(gt=0)):
     try:
-        return Getter(logger, db).all_accounts_by_client_id(id)
+        return await Getter(logger, db).all_accounts_by_client_id(id)
 
     except Exception as err:
         logger.error(err)
 
 
 @router.get(Paths.all_accounts.value + "{id}", status_code=status.HTTP_200_OK)
-async def get_all_accounts_by_id(db: db_dependency, id: int = Path(gt=0)):
+async def get_all_accounts_by_id(db: async_db_dependency, id: int = Path(gt=0)):
     try:
-        return Getter(logger, db).all_accounts_by_id(id)
+        return await Getter(logger, db).all_accounts_by_id(id)
 
     except Exception as err:
         logger.error(err)
 
 
 @router.post(Paths.root.value, status_code=status.HTTP_201_CREATED)
-async def create_account(db: db_dependency, account_req: AccountBaseReq):
+def create_account(db: db_dependency, account_req: AccountBaseReq):
     try:
         Setter(logger, db, account_req).create_account()
 
@@ -37,8 +37,17 @@ async def create_account(db: db_dependency, account_req: AccountBaseReq):
         logger.error(err)
 
 
+@router.post(Paths.batch.value, status_code=status.HTTP_201_CREATED)
+def create_accounts(db: db_dependency, account_reqs: list[AccountBaseReq]):
+    try:
+        return BulkSetter(logger, db).create_accounts(account_reqs)
+
+    except Exception as err:
+        logger.error(err)
+
+
 @router.put(Paths.delete_account.value + "{id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_account(db: db_dependency, id: int = Path(gt=0)):
+def delete_account(db: db_dependency, id: int = Path(gt=0)):
     try:
         AccountDeleteController(id, db, logger).delete()
 
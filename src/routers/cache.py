@@ -0,0 +1,25 @@
+from fastapi import APIRouter, status
+
+from __app_configs import Paths, return_elements
+from controllers.config_cache import active_configs, config_json
+from controllers.config_windows import config_windows
+from controllers.grids import grid_coverages, grid_etags
+from utils.logger import logger
+
+router = APIRouter(prefix=Paths.cache.value, tags=[Paths.cache_tag.value])
+
+
+@router.get(Paths.root.value, status_code=status.HTTP_200_OK)
+async def get_cache_stats():
+    try:
+        return return_elements(
+            [
+                active_configs.stats(),
+                config_windows.stats(),
+                grid_etags.stats(),
+                grid_coverages.stats(),
+                config_json.stats(),
+            ]
+        )
+    except Exception as err:
+        logger.error(err)
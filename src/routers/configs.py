@@ -1,13 +1,15 @@
 from datetime import datetime
+from typing import Union
 
-from fastapi import APIRouter, Path, Query, status
+from fastapi import APIRouter, Header, Path, Query, Response, status
 
-from __app_configs import Paths
+from __app_configs import Headers, MediaTypes, Paths
 from controllers.config_impl import Getter, Setter
 from controllers.query_req import DateReqController
-from database.main import db_dependency
-from models.configs import BaseConfig, Config
+from database.main import async_db_dependency, db_dependency
+from models.configs import BaseConfig, Config, ConfigRolloutReq
 from models.query_req import DatesReq
+from utils.etags import matches, not_modified
 from utils.logger import logger
 
 router = APIRouter(prefix=Paths.configs.value, tags=[Paths.config_tag.value])
@@ -15,28 +17,44 @@ router = APIRouter(prefix=Paths.configs.value, tags=[Paths.config_tag.value])
 
 @router.get(Paths.dates.value + "{client_id}", status_code=status.HTTP_200_OK)
 async def get_config_by_client_date(
-    db: db_dependency,
+    db: async_db_dependency,
     client_id: int = Path(gt=0),
     start: datetime = Query(None),
     end: datetime = Query(None),
 ):
     dates_req: DatesReq = DateReqController(start, end).format()
     try:
-        return Getter(logger, db).config_by_client_id_date(dates_req, client_id)
+        return Response(
+            await Getter(logger, db).config_by_client_id_date(dates_req, client_id),
+            media_type=MediaTypes.json.value,
+        )
     except Exception as err:
         logger.error(err)
 
 
 @router.get(Paths.all_config.value + "{client_id}", status_code=status.HTTP_200_OK)
-async def get_configs_by_client_id(db: db_dependency, client_id: int = Path(gt=0)):
+async def get_configs_by_client_id(
+    db: async_db_dependency,
+    client_id: int = Path(gt=0),
+    if_none_match: Union[str, None] = Header(None),
+):
     try:
-        return Getter(logger, db).all_config_by_client_id(client_id)
+        getter = Getter(logger, db)
+        etag, config_models = await getter.all_configs_etag(client_id)
+        if matches(if_none_match, etag):
+            return not_modified(etag)
+
+        return Response(
+            await getter.all_config_by_client_id(client_id, config_models),
+            media_type=MediaTypes.json.value,
+            headers={Headers.etag.value: etag},
+        )
     except Exception as err:
         logger.error(err)
 
 
 @router.post(Paths.ind.value + "{id}", status_code=status.HTTP_201_CREATED)
-async def create_ind_config(db: db_dependency, req: Config, id: int = Path(gt=0)):
+def create_ind_config(db: db_dependency, req: Config, id: int = Path(gt=0)):
     try:
         Setter(logger, db).create_ind_config(req, id)
     except Exception as err:
@@ -44,15 +62,23 @@ async def create_ind_config(db: db_dependency, req: Config, id: int = Path(gt=0)
 
 
 @router.post(Paths.group.value + "{id}", status_code=status.HTTP_201_CREATED)
-async def create_group_config(db: db_dependency, req: Config, id: int = Path(gt=0)):
+def create_group_config(db: db_dependency, req: Config, id: int = Path(gt=0)):
     try:
         Setter(logger, db).create_group_config(req, id)
     except Exception as err:
         logger.error(err)
 
 
+@router.post(Paths.batch.value, status_code=status.HTTP_201_CREATED)
+def rollout_config(db: db_dependency, rollout_req: ConfigRolloutReq):
+    try:
+        return Setter(logger, db).rollout_config(rollout_req)
+    except Exception as err:
+        logger.error(err)
+
+
 @router.put(Paths.root.value + "{id}", status_code=status.HTTP_204_NO_CONTENT)
-async def update_last_config(db: db_dependency, req: BaseConfig, id: int = Path(gt=0)):
+def update_last_config(db: db_dependency, req: BaseConfig, id: int = Path(gt=0)):
     try:
         Setter(logger, db).update_last_config(req, id)
     except Exception as err:
@@ -60,7 +86,7 @@ async def update_last_config(db: db_dependency, req: BaseConfig, id: int = Path(
 
 
 @router.put(Paths.del_all_config.value + "{id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_all_config(db: db_dependency, id: int = Path(gt=0)):
+def delete_all_config(db: db_dependency, id: int = Path(gt=0)):
     try:
         Setter(logger, db).delete_all(id)
     except Exception as err:
@@ -70,7 +96,7 @@ async def delete_all_config(db: db_dependency, id: int = Path(gt=0)):
 @router.put(
     Paths.del_last_config.value + "{id}", status_code=status.HTTP_204_NO_CONTENT
 )
-async def delete_last_config(db: db_dependency, id: int = Path(gt=0)):
+def delete_last_config(db: db_dependency, id: int = Path(gt=0)):
     try:
         Setter(logger, db).delete_last(id)
     except Exception as err:
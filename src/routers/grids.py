@@ -1,36 +1,62 @@
-from fastapi import APIRouter, Path, status
+from typing import Union
 
-from __app_configs import Paths, return_elements
+from fastapi import APIRouter, Header, Path, Response, status
+
+from __app_configs import Headers, Paths, return_elements
+from controllers.grids import grid_etags
 from database.main import db_dependency
 from database.models import DiscountGridTable, PeakGridTable, VolumeGridTable
-from models.grids import DiscountGrid, PeakOffPeakGrid, VolumeGrid
+from utils.etags import matches, not_modified
 
 router = APIRouter(prefix=Paths.grids.value, tags=[Paths.grids_tag.value])
 
 
+def _get_grids(
+    db: db_dependency,
+    response: Response,
+    table: type,
+    id: int,
+    if_none_match: Union[str, None],
+):
+    etag = grid_etags.etag(table, id)
+    if etag is not None and matches(if_none_match, etag):
+        return not_modified(etag)
+
+    grids_models = db.query(table).filter(table.id == id).all()
+    etag = grid_etags.put(table, id, grids_models)
+    if etag is not None:
+        if matches(if_none_match, etag):
+            return not_modified(etag)
+        response.headers[Headers.etag.value] = etag
+    return return_elements([grid.to_grid() for grid in grids_models])
+
+
 # Getting grids by grid_id
 @router.get(Paths.volume.value + "/{id}", status_code=status.HTTP_200_OK)
-async def get_volume_grid_by_id(db: db_dependency, id: int = Path(gt=0)) -> None:
-    grids_models: list[VolumeGridTable] = (
-        db.query(VolumeGridTable).filter(VolumeGridTable.id == id).all()
-    )
-    grids: list[VolumeGrid] = [grid.to_grid() for grid in grids_models]
-    return return_elements(grids)
+def get_volume_grid_by_id(
+    db: db_dependency,
+    response: Response,
+    id: int = Path(gt=0),
+    if_none_match: Union[str, None] = Header(None),
+) -> None:
+    return _get_grids(db, response, VolumeGridTable, id, if_none_match)
 
 
 @router.get(Paths.peak.value + "/{id}", status_code=status.HTTP_200_OK)
-async def get_peak_grids_by_id(db: db_dependency, id: int = Path(gt=0)) -> None:
-    grids_models: list[PeakGridTable] = (
-        db.query(PeakGridTable).filter(PeakGridTable.id == id).all()
-    )
-    grids: list[PeakOffPeakGrid] = [grid.to_grid() for grid in grids_models]
-    return return_elements(grids)
+def get_peak_grids_by_id(
+    db: db_dependency,
+    response: Response,
+    id: int = Path(gt=0),
+    if_none_match: Union[str, None] = Header(None),
+) -> None:
+    return _get_grids(db, response, PeakGridTable, id, if_none_match)
 
 
 @router.get(Paths.discount.value + "/{id}", status_code=status.HTTP_200_OK)
-async def get_discount_grids_by_id(db: db_dependency, id: int = Path(gt=0)) -> None:
-    grids_models: list[DiscountGridTable] = (
-        db.query(DiscountGridTable).filter(DiscountGridTable.id == id).all()
-    )
-    grids: list[DiscountGrid] = [grid.to_grid() for grid in grids_models]
-    return return_elements(grids)
+def get_discount_grids_by_id(
+    db: db_dependency,
+    response: Response,
+    id: int = Path(gt=0),
+    if_none_match: Union[str, None] = Header(None),
+) -> None:
+    return _get_grids(db, response, DiscountGridTable, id, if_none_match)
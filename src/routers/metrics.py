@@ -0,0 +1,14 @@
+from fastapi import APIRouter, status
+from fastapi.responses import PlainTextResponse
+
+from __app_configs import MediaTypes, Paths
+from utils.metrics import request_metrics
+
+router = APIRouter(prefix=Paths.metrics.value, tags=[Paths.metrics_tag.value])
+
+
+@router.get(Paths.root.value, status_code=status.HTTP_200_OK)
+async def get_metrics():
+    return PlainTextResponse(
+        request_metrics.render(), media_type=MediaTypes.prometheus.value
+    )
@@ -0,0 +1,43 @@
+from datetime import datetime
+
+from fastapi import APIRouter, Path, Query, status
+from fastapi.responses import StreamingResponse
+
+from __app_configs import MediaTypes, Paths
+from controllers.pricing_impl import Getter
+from database.main import async_db_dependency
+from models.pricing import DeliveryPriceReq, PriceReq
+from utils.logger import logger
+
+router = APIRouter(prefix=Paths.price.value, tags=[Paths.price_tag.value])
+
+
+@router.get(Paths.root.value + "{client_id}", status_code=status.HTTP_200_OK)
+async def get_price(
+    db: async_db_dependency,
+    client_id: int = Path(gt=0),
+    distance: float = Query(ge=0),
+    volume: int = Query(gt=0),
+    timestamp: datetime = Query(None),
+):
+    price_req = PriceReq(
+        client_id=client_id,
+        distance=distance,
+        volume=volume,
+        timestamp=timestamp if timestamp is not None else datetime.now(),
+    )
+    try:
+        return await Getter(logger, db).price(price_req)
+    except Exception as err:
+        logger.error(err)
+
+
+@router.post(Paths.batch.value, status_code=status.HTTP_200_OK)
+async def get_batch_price(db: async_db_dependency, deliveries: list[DeliveryPriceReq]):
+    try:
+        return StreamingResponse(
+            await Getter(logger, db).price_batch(deliveries),
+            media_type=MediaTypes.ndjson.value,
+        )
+    except Exception as err:
+        logger.error(err)
@@ -1,12 +1,13 @@
 from datetime import datetime
 
-from fastapi import APIRouter, Path, Query, status
+from fastapi import APIRouter, Path, Query, Request, status
 
-from __app_configs import Paths
+from __app_configs import Frequency, Headers, MediaTypes, Paths
 from controllers.query_req import DateReqController
-from controllers.volumes_impl import Getter
-from database.main import db_dependency
+from controllers.volumes_impl import Getter, Setter
+from database.main import async_db_dependency, db_dependency
 from models.query_req import DatesReq
+from models.volume import AcctVolReq
 from utils.logger import logger
 
 router = APIRouter(prefix=Paths.volumes.value, tags=[Paths.volumes_tag.value])
@@ -14,13 +15,49 @@ router = APIRouter(prefix=Paths.volumes.value, tags=[Paths.volumes_tag.value])
 
 @router.get(Paths.dates.value + "{id}", status_code=status.HTTP_200_OK)
 async def get_volume_from_dates(
-    db: db_dependency,
+    db: async_db_dependency,
     id: int = Path(gt=0),
     start: datetime = Query(None),
     end: datetime = Query(None),
 ):
     dates_req: DatesReq = DateReqController(start, end).format()
     try:
-        return Getter(logger, db).volumes_from_dates(id, dates_req)
+        return await Getter(logger, db).volumes_from_dates(id, dates_req)
+    except Exception as err:
+        logger.error(err)
+
+
+@router.get(Paths.rollup.value + "{id}", status_code=status.HTTP_200_OK)
+async def get_rolling_volume(
+    db: async_db_dependency,
+    id: int = Path(gt=0),
+    frequency: Frequency = Query(Frequency.month),
+    date: datetime = Query(None),
+):
+    try:
+        return await Getter(logger, db).rolling_volume(
+            id, frequency.value, date if date is not None else datetime.now()
+        )
+    except Exception as err:
+        logger.error(err)
+
+
+@router.post(Paths.root.value, status_code=status.HTTP_201_CREATED)
+def ingest_volumes(db: db_dependency, volumes: list[AcctVolReq]):
+    try:
+        return Setter(logger, db).ingest(volumes)
+    except Exception as err:
+        logger.error(err)
+
+
+@router.post(Paths.upload.value, status_code=status.HTTP_201_CREATED)
+async def upload_volumes(db: db_dependency, request: Request):
+    media_type = request.headers.get(
+        Headers.content_type.value, MediaTypes.ndjson.value
+    )
+    try:
+        return await Setter(logger, db).ingest_stream(
+            request.stream(), media_type.split(";")[0].strip()
+        )
     except Exception as err:
         logger.error(err)
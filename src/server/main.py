@@ -1,13 +1,62 @@
-from fastapi import FastAPI
+from time import perf_counter
 
-from database.main import Base, engine
-from routers import account, configs, grids, volumes
+from fastapi import FastAPI, Request
+
+from __app_configs import Defaults, Headers, LogMsg, Paths
+from controllers.account_index import client_accounts
+from database.main import Base, QueryCounter, engine
+from routers import account, cache, configs, grids, metrics, pricing, volumes
+from utils.logger import logger
+from utils.metrics import request_metrics
 
 app = FastAPI()
 
+# Schema changes and backfills run once per deploy in `database.migrations`, not in
+# every process importing the app.
 Base.metadata.create_all(bind=engine)
+client_accounts.build(engine, logger)
 
 app.include_router(account.router)
 app.include_router(configs.router)
 app.include_router(grids.router)
 app.include_router(volumes.router)
+app.include_router(pricing.router)
+app.include_router(cache.router)
+app.include_router(metrics.router)
+
+
+@app.middleware("http")
+async def instrument_queries(request: Request, call_next):
+    start = perf_counter()
+    with QueryCounter() as counter:
+        response = await call_next(request)
+    seconds = perf_counter() - start
+
+    route = request.scope.get("route")
+    path = route.path if route is not None else Paths.unmatched.value
+    request_metrics.observe(request.method, path, seconds, counter)
+
+    response.headers[Headers.query_count.value] = str(counter.count)
+    response.headers[Headers.db_time.value] = f"{counter.seconds * 1000:.3f}"
+    response.headers[Headers.db_rows.value] = str(counter.rows)
+
+    stats = {
+        "method": request.method,
+        "route": path,
+        "status": response.status_code,
+        "ms": seconds * 1000,
+        "queries": counter.count,
+        "db_ms": counter.seconds * 1000,
+        "rows": counter.rows,
+    }
+    if stats["ms"] >= Defaults.slow_request_ms.value:
+        logger.warning(
+            LogMsg.slow_request.value.format(
+                slowest_ms=counter.slowest_seconds * 1000,
+                statement=" ".join(str(counter.slowest_statement).split()),
+                **stats,
+            )
+        )
+    else:
+        logger.debug(LogMsg.request_stats.value.format(**stats))
+    return response
@@ -0,0 +1,44 @@
+"""
+Historical re-pricing job: prices every delivery of a file with the configs that were
+valid when it was created and writes the results as CSV or Parquet.
+
+Run from `src`:
+
+    python -m server.reprice --start 2024-01-01 --end 2024-02-01 \
+        --input deliveries.csv --output prices.parquet
+"""
+
+from __future__ import annotations
+
+import argparse
+from datetime import datetime
+
+from __app_configs import Defaults
+from controllers.repricing import RepricingJob
+from database.main import SessionLocal
+from utils.logger import logger
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--start", type=datetime.fromisoformat, required=True)
+    parser.add_argument(
+        "--end",
+        type=datetime.fromisoformat,
+        required=True,
+        help="exclusive end of the range",
+    )
+    parser.add_argument("--input", required=True)
+    parser.add_argument("--output", required=True)
+    parser.add_argument("--chunk-size", type=int, default=Defaults.reprice_chunk.value)
+    args = parser.parse_args()
+
+    with SessionLocal() as db:
+        resp = RepricingJob(db, logger, args.start, args.end, args.chunk_size).run(
+            args.input, args.output
+        )
+    print(resp.model_dump_json(indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,31 @@
+"""
+Config snapshot export job: writes every active config and its compiled grids to a
+columnar binary file pricing workers memory-map with `ConfigSnapshot.load`.
+
+Run from `src`, e.g. from cron or after config changes:
+
+    python -m server.snapshot --path grids_snapshot.bin
+"""
+
+from __future__ import annotations
+
+import argparse
+
+from __app_configs import Defaults
+from controllers.snapshot import ConfigSnapshotWriter
+from database.main import SessionLocal
+from utils.logger import logger
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--path", default=Defaults.snapshot_path.value)
+    args = parser.parse_args()
+
+    with SessionLocal() as db:
+        snapshot = ConfigSnapshotWriter(db, logger).export(args.path)
+    print(snapshot.model_dump_json(indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Multi-process pricing mode: runs the service in several uvicorn worker processes that
+share one read-only pricing snapshot through shared memory (`/dev/shm` when present).
+This process migrates the database and exports the snapshot before the workers start,
+then coordinates it, re-exporting and atomically swapping the file whenever configs
+change.
+
+Run from `src`:
+
+    python -m server.workers --workers 4 --host 0.0.0.0 --port 8000
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import tempfile
+
+import uvicorn
+
+import database.models  # noqa: F401  registers the tables on Base.metadata
+from __app_configs import Defaults, LogMsg, SnapshotSettings
+from controllers.snapshot import SnapshotCoordinator
+from database.main import SessionLocal, engine
+from database.migrations import migrate
+from utils.logger import logger
+
+
+def _snapshot_path() -> str:
+    directory = Defaults.snapshot_shm_dir.value
+    if not os.path.isdir(directory):
+        directory = tempfile.gettempdir()
+    return os.path.join(directory, Defaults.snapshot_path.value)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--snapshot", default=_snapshot_path())
+    parser.add_argument("--poll-s", type=float, default=Defaults.snapshot_poll_s.value)
+    args = parser.parse_args()
+
+    # Once, here, so the workers never run DDL and the export reads the current schema.
+    migrate(engine, logger)
+    coordinator = SnapshotCoordinator(args.snapshot, SessionLocal, logger, args.poll_s)
+    coordinator.refresh(force=True)
+    coordinator.start()
+
+    # Read by `shared_snapshot` when the workers import the app.
+    os.environ[SnapshotSettings.path.value] = args.snapshot
+    logger.info(
+        LogMsg.workers_started.value.format(
+            workers=args.workers, host=args.host, port=args.port, path=args.snapshot
+        )
+    )
+    try:
+        uvicorn.run(
+            "server.main:app", host=args.host, port=args.port, workers=args.workers
+        )
+    finally:
+        coordinator.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+from threading import Lock
+from time import monotonic
+from typing import Any, Callable, Hashable, Union
+
+from models.cache import CacheStats
+
+
+class LRUCache:
+    """
+    Process-local LRU cache with an optional TTL per entry. Counts hits, misses,
+    evictions (size and TTL) and explicit invalidations. With `sizeof`, entries are
+    also evicted once their total size goes over `max_bytes`. `on_evict` is called
+    with the key and value of every entry evicted or expired, after the cache lock is
+    released, so owners keeping their own index of the keys can prune it.
+    """
+
+    name: str
+    max_size: int
+    ttl: Union[float, None]
+    max_bytes: Union[int, None]
+
+    def __init__(
+        self,
+        name: str,
+        max_size: int,
+        ttl: Union[float, None] = None,
+        max_bytes: Union[int, None] = None,
+        sizeof: Union[Callable[[Any], int], None] = None,
+        on_evict: Union[Callable[[Hashable, Any], None], None] = None,
+    ) -> None:
+        self.name = name
+        self.max_size = max_size
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.on_evict = on_evict
+        self.bytes = 0
+        self._entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def _evicted(self, items: list[tuple[Hashable, Any]]) -> None:
+        if self.on_evict is not None:
+            for key, value in items:
+                self.on_evict(key, value)
+
+    def get(
+        self, key: Hashable, is_valid: Union[Callable[[Any], bool], None] = None
+    ) -> Any:
+        expired: list[tuple[Hashable, Any]] = []
+        with self._lock:
+            value = self._get(key, is_valid, expired)
+        self._evicted(expired)
+        return value
+
+    def _get(
+        self,
+        key: Hashable,
+        is_valid: Union[Callable[[Any], bool], None],
+        expired: list[tuple[Hashable, Any]],
+    ) -> Any:
+        item = self._entries.get(key)
+        if item is None:
+            self.misses += 1
+            return None
+
+        expires_at, value = item
+        if expires_at < monotonic():
+            self._remove(key)
+            expired.append((key, value))
+            self.expirations += 1
+            self.misses += 1
+            return None
+
+        if is_valid is not None and not is_valid(value):
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def _remove(self, key: Hashable) -> Any:
+        item = self._entries.pop(key, None)
+        if item is not None and self.sizeof is not None:
+            self.bytes -= self.sizeof(item[1])
+        return item
+
+    def _over_budget(self) -> bool:
+        return len(self._entries) > self.max_size or (
+            self.max_bytes is not None and self.bytes > self.max_bytes
+        )
+
+    def put(self, key: Hashable, value: Any) -> Any:
+        expires_at = monotonic() + self.ttl if self.ttl is not None else float("inf")
+        evicted: list[tuple[Hashable, Any]] = []
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (expires_at, value)
+            if self.sizeof is not None:
+                self.bytes += self.sizeof(value)
+            while self._over_budget():
+                oldest = next(iter(self._entries))
+                evicted.append((oldest, self._remove(oldest)[1]))
+                self.evictions += 1
+        self._evicted(evicted)
+        return value
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            return key in self._entries
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            if self._remove(key) is not None:
+                self.invalidations += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+            self.bytes = 0
+
+    def stats(self) -> CacheStats:
+        return CacheStats(
+            name=self.name,
+            size=len(self._entries),
+            max_size=self.max_size,
+            ttl=self.ttl,
+            hits=self.hits,
+            misses=self.misses,
+            evictions=self.evictions,
+            expirations=self.expirations,
+            invalidations=self.invalidations,
+            bytes=self.bytes,
+            max_bytes=self.max_bytes,
+        )
@@ -0,0 +1,32 @@
+from hashlib import sha1
+from typing import Hashable, Union
+
+from fastapi import Response, status
+
+from __app_configs import Deliminator, Headers
+
+
+def etag_of(*parts: Hashable) -> str:
+    """Weak ETag of the given parts, e.g. the (config ID, version) pairs of a read."""
+    digest = sha1(repr(parts).encode()).hexdigest()
+    return f'W/"{digest}"'
+
+
+def matches(if_none_match: Union[str, None], etag: str) -> bool:
+    """Weak comparison of `etag` with an If-None-Match header, as GET requests use."""
+    if if_none_match is None:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+
+    opaque = etag.removeprefix("W/")
+    return any(
+        candidate.strip().removeprefix("W/") == opaque
+        for candidate in if_none_match.split(Deliminator.comma.value.strip())
+    )
+
+
+def not_modified(etag: str) -> Response:
+    return Response(
+        status_code=status.HTTP_304_NOT_MODIFIED, headers={Headers.etag.value: etag}
+    )
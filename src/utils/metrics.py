@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+from bisect import bisect_left
+from threading import Lock
+
+from database.main import QueryCounter
+
+_SECONDS_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+_QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+class Histogram:
+    """Cumulative-bucket histogram rendered in the Prometheus text format."""
+
+    buckets: tuple[float, ...]
+
+    def __init__(self, buckets: tuple[float, ...]) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def render(self, name: str, labels: str) -> list[str]:
+        lines: list[str] = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {self.count}')
+        lines.append(f"{name}_sum{{{labels}}} {self.sum}")
+        lines.append(f"{name}_count{{{labels}}} {self.count}")
+        return lines
+
+
+class RequestMetrics:
+    """Per-route histograms of request time, database time and statement count."""
+
+    _metrics = {
+        "grids_request_duration_seconds": ("Request latency", _SECONDS_BUCKETS),
+        "grids_request_db_seconds": ("Time spent in SQL statements", _SECONDS_BUCKETS),
+        "grids_request_queries": ("SQL statements per request", _QUERY_BUCKETS),
+    }
+
+    def __init__(self) -> None:
+        self._routes: dict[tuple[str, str], dict[str, Histogram]] = {}
+        self._lock = Lock()
+
+    def observe(
+        self, method: str, route: str, seconds: float, counter: QueryCounter
+    ) -> None:
+        values = (seconds, counter.seconds, counter.count)
+        with self._lock:
+            histograms = self._routes.get((method, route))
+            if histograms is None:
+                histograms = {
+                    name: Histogram(buckets)
+                    for name, (_, buckets) in self._metrics.items()
+                }
+                self._routes[(method, route)] = histograms
+            for histogram, value in zip(histograms.values(), values):
+                histogram.observe(value)
+
+    def render(self) -> str:
+        lines: list[str] = []
+        with self._lock:
+            for name, (help, _) in self._metrics.items():
+                lines.append(f"# HELP {name} {help}")
+                lines.append(f"# TYPE {name} histogram")
+                for (method, route), histograms in sorted(self._routes.items()):
+                    labels = f'method="{method}",route="{route}"'
+                    lines.extend(histograms[name].render(name, labels))
+        return "\n".join(lines) + "\n"
+
+
+request_metrics = RequestMetrics()